@@ -0,0 +1,59 @@
+"""
+NBT decode scaling benchmark
+
+    python -m benchmarks.bench_nbt [--sizes 1,10,50,100]
+
+Times ``NBTHandler.Resolve`` on synthetic payloads from 1 MB to 100 MB (uncompressed). A linear
+parser keeps the MB/s column flat, the old deepcopy-per-tag reader did not finish 10 MB.
+
+``--raw`` reads long arrays as ``array.array``; the default keeps the legacy list-of-strings shape,
+whose cost is dominated by allocating one python string per long.
+"""
+import argparse
+import gc
+import json
+import time
+
+from t3dlitematica.litematicadecoder import NBTHandler
+
+from .synthetic import random_nbt
+
+
+def bench(sizes_mb, repeat: int = 3, raw_arrays: bool = False) -> list:
+    results = []
+    for mb in sizes_mb:
+        binSource = random_nbt(int(mb * 1024 * 1024))
+        best = None
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            NBTHandler.Resolve(binSource, raw_arrays=raw_arrays)
+            took = time.perf_counter() - start
+            best = took if best is None else min(best, took)
+        results.append(
+            {
+                "size_mb": round(len(binSource) / 1024 / 1024, 2),
+                "seconds": round(best, 4),
+                "mb_per_s": round(len(binSource) / 1024 / 1024 / best, 2),
+            }
+        )
+        del binSource
+    base = results[0]["seconds"] / results[0]["size_mb"]
+    for i in results:
+        # 1.0 means exactly linear relative to the smallest file
+        i["relative_cost_per_mb"] = round(i["seconds"] / i["size_mb"] / base, 2)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1,5,10,25,50,100", help="sizes in MB, comma separated")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--raw", action="store_true", help="read long arrays as array.array")
+    args = parser.parse_args()
+    sizes = [float(i) for i in args.sizes.split(",")]
+    print(json.dumps(bench(sizes, args.repeat, args.raw), indent=4))
+
+
+if __name__ == "__main__":
+    main()
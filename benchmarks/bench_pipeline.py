@@ -0,0 +1,228 @@
+"""
+Decode + mesh pipeline benchmark
+
+    python -m benchmarks.bench_pipeline [--sizes 16,32,64] [--bits 2,8,16] [--mixes solid,sparse,model]
+
+Generates synthetic ``.litematic`` files (see :mod:`benchmarks.synthetic`) and a matching
+resource pack, then times every stage on its own: gunzip, ``NBTHandler.Resolve``,
+``decode_BlockVolume``, ``region_offsets``, ``Objhandel.main`` (meshing and writing the OBJ) and
+``writeobj`` (MTL and textures). Seconds are the best of ``--repeat`` runs; peak memory comes from
+one extra run under ``tracemalloc`` (skip it with ``--no-memory``). The report is JSON, write it
+with ``--output`` and diff it between commits to catch regressions.
+
+Sizes are cube edges (``32``) or ``XxYxZ``. Litematica stores at least 2 bits per entry, so
+``--bits 1`` is the two entry palette stored at 2 bits.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from t3dlitematica.litematicadecoder import LitematicaHandler, NBTHandler, Utilities
+from t3dlitematica.litematicadecoder.bitstack import np
+from t3dlitematica.objbuilder.toobj import Objhandel, region_offsets
+from t3dlitematica.texturepackexport import convert_texturepack
+
+from . import synthetic
+
+STAGES = ("gzip", "NBTHandler.Resolve", "decode_BlockVolume", "region_offsets", "Objhandel.main", "writeobj")
+
+
+class Recorder:
+    """seconds and, while ``tracemalloc`` is tracing, peak bytes allocated of each stage"""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, Optional[float]]] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tracing = tracemalloc.is_tracing()
+        base = 0
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - base if tracing else None
+            self.stages[name] = {"seconds": seconds, "peak_bytes": peak}
+
+
+class TimedObjhandel(Objhandel):
+    """``Objhandel`` with ``main`` and ``writeobj`` recorded as separate stages"""
+
+    def __init__(self, recorder: Recorder, *args, **kwargs) -> None:
+        self.recorder = recorder
+        self.deferred = False
+        super().__init__(*args, **kwargs)
+
+    def main(self, data, size):
+        # writeobj 會在 main 裡被呼叫, 先略過再單獨計時
+        self.deferred = True
+        with self.recorder.stage("Objhandel.main"):
+            super().main(data, size)
+        self.deferred = False
+        if self.format == "obj":
+            with self.recorder.stage("writeobj"):
+                self.writeobj()
+
+    def writeobj(self) -> None:
+        if not self.deferred:
+            super().writeobj()
+
+
+def parse_size(text: str) -> Tuple[int, int, int]:
+    parts = [int(i) for i in text.lower().split("x")]
+    if len(parts) == 1:
+        parts *= 3
+    if len(parts) != 3 or min(parts) < 1:
+        raise argparse.ArgumentTypeError(f"bad size {text!r}, expected N or XxYxZ")
+    return parts[0], parts[1], parts[2]
+
+
+def run_once(path: str, texturefolder: str, output: str, recorder: Recorder, jobs: int = 1) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        compressed = f.read()
+    with recorder.stage("gzip"):
+        binSource = Utilities.GZipUnzip(compressed)
+    with recorder.stage("NBTHandler.Resolve"):
+        data = NBTHandler.Resolve(binSource, raw_arrays=("BlockStates",))
+    data = LitematicaHandler.to_human(data)
+    with recorder.stage("decode_BlockVolume"):
+        data = LitematicaHandler.decode_BlockVolume(data)
+    with recorder.stage("region_offsets"):
+        regions = region_offsets(data)
+    size = tuple(int(data["Metadata"]["EnclosingSize"][i]) for i in "xyz")
+    name = data["Metadata"]["Name"]
+    handel = TimedObjhandel(recorder, name, regions, size, texturefolder, output, jobs=jobs)
+    return {
+        "nbt_bytes": len(binSource),
+        "obj_bytes": handel.writer.bytes_written,
+        "output_bytes": os.path.getsize(str(handel)),
+    }
+
+
+def bench_case(
+    size: Tuple[int, int, int], bits: int, mix: str, texturefolder: str, workdir: str,
+    repeat: int = 3, memory: bool = True, jobs: int = 1,
+) -> Dict[str, Any]:
+    path = os.path.join(workdir, f"bench_{size[0]}x{size[1]}x{size[2]}_{bits}_{mix}.litematic")
+    synthetic.write_litematic(path, size, bits, mix)
+    output = os.path.join(workdir, "out")
+    os.makedirs(output, exist_ok=True)
+    volume = size[0] * size[1] * size[2]
+
+    best: Dict[str, float] = {}
+    info: Dict[str, Any] = {}
+    for _ in range(repeat):
+        gc.collect()
+        recorder = Recorder()
+        info = run_once(path, texturefolder, output, recorder, jobs)
+        for stage, result in recorder.stages.items():
+            best[stage] = min(best.get(stage, result["seconds"]), result["seconds"])
+    peaks: Dict[str, Optional[int]] = {}
+    if memory:
+        gc.collect()
+        recorder = Recorder()
+        tracemalloc.start()
+        try:
+            run_once(path, texturefolder, output, recorder, jobs)
+        finally:
+            tracemalloc.stop()
+        peaks = {stage: result["peak_bytes"] for stage, result in recorder.stages.items()}
+
+    stages = {}
+    for stage in STAGES:
+        if stage not in best:
+            continue
+        seconds = best[stage]
+        stages[stage] = {
+            "seconds": round(seconds, 5),
+            "blocks_per_s": round(volume / seconds) if seconds else None,
+            "peak_bytes": peaks.get(stage),
+        }
+        if stage in ("gzip", "NBTHandler.Resolve"):
+            stages[stage]["mb_per_s"] = round(info["nbt_bytes"] / 1024 / 1024 / seconds, 2) if seconds else None
+    total = sum(best.values())
+    return {
+        "size": list(size),
+        "blocks": volume,
+        "bits": bits,
+        "palette": synthetic.palette_length(bits),
+        "mix": mix,
+        "file_bytes": os.path.getsize(path),
+        **info,
+        "seconds": round(total, 5),
+        "blocks_per_s": round(volume / total) if total else None,
+        "stages": stages,
+    }
+
+
+def bench(
+    sizes: List[Tuple[int, int, int]], bits: List[int], mixes: List[str], repeat: int = 3,
+    memory: bool = True, texturefolder: Optional[str] = None, jobs: int = 1,
+) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="3dlitematica-bench-")
+    try:
+        if texturefolder is None:
+            texturefolder = os.path.join(workdir, "texture")
+            convert_texturepack(synthetic.write_pack(os.path.join(workdir, "pack")), texturefolder)
+        results = [
+            bench_case(size, b, mix, texturefolder, workdir, repeat, memory, jobs)
+            for size in sizes
+            for b in bits
+            for mix in mixes
+        ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "environment": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "numpy": np.__version__ if np is not None else None,
+            "cpu_count": os.cpu_count(),
+            "jobs": jobs,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="16,32,64", help="cube edges or XxYxZ, comma separated")
+    parser.add_argument("--bits", default="2,4,8,12,16", help="bits per palette entry (1-16), comma separated")
+    parser.add_argument("--mixes", default=",".join(synthetic.MIXES), help="block mixes: " + ", ".join(synthetic.MIXES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1, help="meshing processes, as obj -j")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--texturepack", default=None, help="converted texture folder, a synthetic pack by default")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    sizes = [parse_size(i) for i in args.sizes.split(",")]
+    bits = [int(i) for i in args.bits.split(",")]
+    mixes = args.mixes.split(",")
+    for mix in mixes:
+        if mix not in synthetic.MIXES:
+            parser.error(f"unknown mix {mix!r}")
+    report = bench(sizes, bits, mixes, args.repeat, not args.no_memory, args.texturepack, args.jobs)
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
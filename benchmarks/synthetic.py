@@ -0,0 +1,328 @@
+"""
+Synthetic .litematic writer used by the benchmarks.
+
+Only the tags the decoder reads are written, the files open fine in Litematica anyway.
+:func:`write_pack` writes a small resource pack with every block the generated files use, so
+the meshing stages can run without a Minecraft install.
+"""
+import gzip
+import json
+import os
+import random
+import struct
+import zlib
+from array import array
+from typing import Any, Dict, List, Tuple
+
+from t3dlitematica.litematicadecoder import NBTHandler as nbt
+from t3dlitematica.litematicadecoder import bitstack
+
+# solid: 整個填滿, sparse: 約 5% 是方塊, model: 鐵軌 / 柵欄 / 紅石等非完整方塊為主
+MIXES = ("solid", "sparse", "model")
+SPARSE_FILL = 0.05
+SOLID_BLOCKS = ("stone", "dirt", "glass", "oak_log", "sea_lantern")
+MODEL_BLOCKS = ("rail", "oak_fence", "redstone_wire", "oak_sapling")
+
+
+class Tag:
+    """A typed NBT value, plain python values are typed by :func:`write_payload`."""
+
+    def __init__(self, tagType: int, value: Any) -> None:
+        self.tagType = tagType
+        self.value = value
+
+
+def Int(value: int) -> Tag:
+    return Tag(nbt.TAG_Int, value)
+
+
+def Long(value: int) -> Tag:
+    return Tag(nbt.TAG_Long, value)
+
+
+def LongArray(value: bytes) -> Tag:
+    """``value`` is the already big-endian packed array body"""
+    return Tag(nbt.TAG_Long_Array, value)
+
+
+def tag_type(value: Any) -> int:
+    if isinstance(value, Tag):
+        return value.tagType
+    if isinstance(value, str):
+        return nbt.TAG_String
+    if isinstance(value, dict):
+        return nbt.TAG_Compound
+    if isinstance(value, list):
+        return nbt.TAG_List
+    if isinstance(value, float):
+        return nbt.TAG_Double
+    if isinstance(value, int):
+        return nbt.TAG_Int
+    raise TypeError(f"can not write {type(value)} as NBT")
+
+
+def write_string(out: List[bytes], value: str) -> None:
+    data = value.encode("utf8")
+    out.append(struct.pack(">H", len(data)))
+    out.append(data)
+
+
+def write_payload(out: List[bytes], value: Any) -> None:
+    tagType = tag_type(value)
+    if isinstance(value, Tag):
+        value = value.value
+    if tagType == nbt.TAG_Int:
+        out.append(struct.pack(">i", value))
+    elif tagType == nbt.TAG_Long:
+        out.append(struct.pack(">q", value))
+    elif tagType == nbt.TAG_Double:
+        out.append(struct.pack(">d", value))
+    elif tagType == nbt.TAG_String:
+        write_string(out, value)
+    elif tagType == nbt.TAG_Long_Array:
+        out.append(struct.pack(">i", len(value) // 8))
+        out.append(value)
+    elif tagType == nbt.TAG_List:
+        out.append(struct.pack(">bi", tag_type(value[0]) if value else nbt.TAG_End, len(value)))
+        for i in value:
+            write_payload(out, i)
+    elif tagType == nbt.TAG_Compound:
+        for name, i in value.items():
+            out.append(struct.pack(">b", tag_type(i)))
+            write_string(out, name)
+            write_payload(out, i)
+        out.append(b"\x00")
+
+
+def dumps(root: Dict[str, Any]) -> bytes:
+    out = [struct.pack(">b", nbt.TAG_Compound)]
+    write_string(out, "")
+    write_payload(out, root)
+    return b"".join(out)
+
+
+def xyz(x: int, y: int, z: int) -> Dict[str, Tag]:
+    return {"x": Int(x), "y": Int(y), "z": Int(z)}
+
+
+def litematic(
+    size: Tuple[int, int, int], palette: List[Dict[str, Any]], blockstates: bytes, name: str = "bench"
+) -> Dict[str, Any]:
+    volume = size[0] * size[1] * size[2]
+    region = {
+        "Position": xyz(0, 0, 0),
+        "Size": xyz(*size),
+        "BlockStatePalette": palette,
+        "BlockStates": LongArray(blockstates),
+        "TileEntities": [],
+        "Entities": [],
+        "PendingBlockTicks": [],
+        "PendingFluidTicks": [],
+    }
+    return {
+        "MinecraftDataVersion": Int(3465),
+        "Version": Int(6),
+        "Metadata": {
+            "Name": name,
+            "Author": "benchmarks",
+            "Description": "",
+            "EnclosingSize": xyz(*size),
+            "RegionCount": Int(1),
+            "TotalBlocks": Int(volume),
+            "TotalVolume": Int(volume),
+            "TimeCreated": Long(0),
+            "TimeModified": Long(0),
+        },
+        "Regions": {name: region},
+    }
+
+
+def random_nbt(target_bytes: int) -> bytes:
+    """
+    Build an uncompressed litematic payload of roughly ``target_bytes``.
+
+    16 palette entries at 4 bits per block means every random long is a valid BlockStates word.
+    """
+    longs = max(target_bytes // 8 // 4096, 1) * 4096
+    size = (256, longs * 16 // (256 * 256), 256)
+    palette = [{"Name": "minecraft:air"}] + [
+        {"Name": f"minecraft:block_{i}", "Properties": {"facing": "north"}} for i in range(15)
+    ]
+    return dumps(litematic(size, palette, os.urandom(longs * 8)))
+
+
+def write_random(path: str, target_bytes: int) -> None:
+    with gzip.open(path, "wb", compresslevel=1) as f:
+        f.write(random_nbt(target_bytes))
+
+
+def palette_length(bits: int) -> int:
+    """
+    palette size stored with exactly ``bits`` bits per entry; Litematica never uses fewer than 2,
+    so 1 gives the smallest palette (air + one block) which is stored at 2 bits
+    """
+    if not 1 <= bits <= 16:
+        raise ValueError("bits must be between 1 and 16")
+    return 2 if bits == 1 else 2 ** (bits - 1) + 1
+
+
+def block(mix: str, i: int) -> Dict[str, Any]:
+    """palette entry ``i`` (from 1) of a mix, a ``bench`` property keeps wide palettes distinct"""
+    if mix == "model":
+        name = MODEL_BLOCKS[i % len(MODEL_BLOCKS)]
+        properties = {
+            "rail": lambda: {"shape": ("north_south", "east_west")[i // 4 % 2]},
+            "oak_fence": lambda: {d: str(bool(i >> k & 1)).lower() for k, d in enumerate(("north", "east", "south", "west"))},
+            "redstone_wire": lambda: {"north": ("side", "none")[i % 2], "east": ("side", "none")[i // 8 % 2], "south": "none", "west": "none"},
+            "oak_sapling": lambda: {"stage": str(i % 2)},
+        }[name]()
+    else:
+        name = SOLID_BLOCKS[i % len(SOLID_BLOCKS)]
+        properties = {"axis": "xyz"[i % 3]} if name == "oak_log" else {}
+    properties["bench"] = str(i)
+    return {"Name": "minecraft:" + name, "Properties": properties}
+
+
+def block_indices(volume: int, palette: int, mix: str, seed: int = 0) -> List[int]:
+    rnd = random.Random(seed)
+    if mix == "sparse":
+        return [rnd.randrange(1, palette) if rnd.random() < SPARSE_FILL else 0 for _ in range(volume)]
+    if mix == "model":
+        # 約一半是完整方塊, 讓 culling 與非完整模型都有工作
+        solid = max(1, (palette - 1) // 2)
+        return [rnd.randrange(1, palette) if rnd.random() < 0.5 else rnd.randrange(1, solid + 1) for _ in range(volume)]
+    return [rnd.randrange(1, palette) for _ in range(volume)]
+
+
+def generate(size: Tuple[int, int, int], bits: int, mix: str = "solid", seed: int = 0, name: str = "bench") -> bytes:
+    """
+    Uncompressed litematic payload of one ``size`` region whose palette needs ``bits`` bits per
+    entry, filled according to ``mix`` (see ``MIXES``)
+    """
+    if mix not in MIXES:
+        raise ValueError(f"unknown mix {mix!r}, expected one of {MIXES}")
+    length = palette_length(bits)
+    if mix == "model":
+        # 前半 palette 是完整方塊, 後半是模型
+        half = (length - 1) // 2
+        palette = [{"Name": "minecraft:air"}] + [block("solid", i) for i in range(1, half + 1)]
+        palette += [block("model", i) for i in range(half + 1, length)]
+    else:
+        palette = [{"Name": "minecraft:air"}] + [block(mix, i) for i in range(1, length)]
+    indices = block_indices(size[0] * size[1] * size[2], length, mix, seed)
+    longs = bitstack.pack(indices, bitstack.bits_per_entry(length))
+    if isinstance(longs, array):
+        longs = array("q", longs)
+        longs.byteswap()
+        blockstates = longs.tobytes()
+    else:
+        blockstates = longs.astype(">i8").tobytes()
+    return dumps(litematic(size, palette, blockstates, name))
+
+
+def write_litematic(path: str, size: Tuple[int, int, int], bits: int, mix: str = "solid", seed: int = 0) -> int:
+    """write :func:`generate` gzipped to ``path``, returns the uncompressed size"""
+    data = generate(size, bits, mix, seed, os.path.splitext(os.path.basename(path))[0])
+    with gzip.open(path, "wb", compresslevel=6) as f:
+        f.write(data)
+    return len(data)
+
+
+def write_png(path: str, rgba: Tuple[int, int, int, int], size: int = 16) -> None:
+    rows = b"".join(b"\x00" + bytes(rgba) * size for _ in range(size))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(
+            b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows))
+            + chunk(b"IEND", b"")
+        )
+
+
+def write_pack(root: str) -> str:
+    """
+    Write a resource pack (``root/assets/minecraft``) with every block used by :func:`generate`,
+    ready for ``convert_texturepack``. Returns ``root``.
+    """
+    mc = os.path.join(root, "assets", "minecraft")
+
+    def put(rel: str, data: Dict[str, Any]) -> None:
+        path = os.path.join(mc, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(data, f)
+
+    def texture(name: str, rgba: Tuple[int, int, int, int]) -> None:
+        os.makedirs(os.path.join(mc, "textures", "block"), exist_ok=True)
+        write_png(os.path.join(mc, "textures", "block", name + ".png"), rgba)
+
+    put("atlases/blocks.json", {"sources": [{"type": "directory", "source": "block", "prefix": "block/"}]})
+    faces = {d: {"texture": "#" + d, "cullface": d} for d in ("down", "up", "north", "south", "west", "east")}
+    put("models/block/block.json", {"gui_light": "side"})
+    put("models/block/cube.json", {"parent": "block/block", "elements": [{"from": [0, 0, 0], "to": [16, 16, 16], "faces": faces}]})
+    put("models/block/cube_all.json", {"parent": "block/cube", "textures": {"particle": "#all", **{d: "#all" for d in faces}}})
+    put("models/block/cube_column.json", {"parent": "block/cube", "textures": {
+        "particle": "#side", "down": "#end", "up": "#end", "north": "#side", "south": "#side", "west": "#side", "east": "#side"}})
+    for name, rgba in (("stone", (128, 128, 128, 255)), ("dirt", (120, 80, 40, 255)), ("glass", (200, 220, 255, 80)), ("sea_lantern", (180, 230, 220, 255))):
+        put(f"models/block/{name}.json", {"parent": "minecraft:block/cube_all", "textures": {"all": f"minecraft:block/{name}"}})
+        put(f"blockstates/{name}.json", {"variants": {"": {"model": f"minecraft:block/{name}"}}})
+        texture(name, rgba)
+    put("models/block/oak_log.json", {"parent": "minecraft:block/cube_column", "textures": {"end": "minecraft:block/oak_log_top", "side": "minecraft:block/oak_log"}})
+    put("blockstates/oak_log.json", {"variants": {
+        "axis=x": {"model": "minecraft:block/oak_log", "x": 90, "y": 90},
+        "axis=y": {"model": "minecraft:block/oak_log"},
+        "axis=z": {"model": "minecraft:block/oak_log", "x": 90}}})
+    texture("oak_log", (100, 70, 30, 255))
+    texture("oak_log_top", (160, 130, 80, 255))
+
+    put("models/block/rail_flat.json", {"textures": {"particle": "#rail"}, "elements": [{"from": [0, 1, 0], "to": [16, 1, 16], "faces": {
+        "up": {"uv": [0, 0, 16, 16], "texture": "#rail"}, "down": {"uv": [0, 16, 16, 0], "texture": "#rail"}}}]})
+    put("models/block/rail.json", {"parent": "minecraft:block/rail_flat", "textures": {"rail": "minecraft:block/rail"}})
+    put("blockstates/rail.json", {"variants": {
+        "shape=north_south": {"model": "minecraft:block/rail"},
+        "shape=east_west": {"model": "minecraft:block/rail", "y": 90}}})
+    texture("rail", (90, 90, 90, 255))
+
+    side = {"uv": [6, 0, 10, 16], "texture": "#texture"}
+    put("models/block/fence_post.json", {"textures": {"particle": "#texture"}, "elements": [{"from": [6, 0, 6], "to": [10, 16, 10], "faces": {
+        "down": {"uv": [6, 6, 10, 10], "texture": "#texture", "cullface": "down"},
+        "up": {"uv": [6, 6, 10, 10], "texture": "#texture", "cullface": "up"},
+        "north": side, "south": side, "west": side, "east": side}}]})
+    bar = {"down": {"uv": [7, 0, 9, 9], "texture": "#texture"}, "up": {"uv": [7, 0, 9, 9], "texture": "#texture"},
+           "north": {"uv": [7, 1, 9, 4], "texture": "#texture", "cullface": "north"},
+           "west": {"uv": [0, 1, 9, 4], "texture": "#texture"}, "east": {"uv": [0, 1, 9, 4], "texture": "#texture"}}
+    put("models/block/fence_side.json", {"textures": {"particle": "#texture"}, "elements": [
+        {"from": [7, 12, 0], "to": [9, 15, 9], "faces": bar}, {"from": [7, 6, 0], "to": [9, 9, 9], "faces": bar}]})
+    put("models/block/oak_fence_post.json", {"parent": "minecraft:block/fence_post", "textures": {"texture": "minecraft:block/oak_planks"}})
+    put("models/block/oak_fence_side.json", {"parent": "minecraft:block/fence_side", "textures": {"texture": "minecraft:block/oak_planks"}})
+    put("blockstates/oak_fence.json", {"multipart": [{"apply": {"model": "minecraft:block/oak_fence_post"}}] + [
+        {"when": {d: "true"}, "apply": {"model": "minecraft:block/oak_fence_side", "y": y, "uvlock": True}}
+        for d, y in (("north", 0), ("east", 90), ("south", 180), ("west", 270))]})
+    texture("oak_planks", (180, 140, 90, 255))
+
+    put("models/block/cross.json", {"textures": {"particle": "#cross"}, "elements": [
+        {"from": [0.8, 0, 8], "to": [15.2, 16, 8], "rotation": {"origin": [8, 8, 8], "axis": "y", "angle": 45, "rescale": True},
+         "faces": {"north": {"uv": [0, 0, 16, 16], "texture": "#cross"}, "south": {"uv": [0, 0, 16, 16], "texture": "#cross"}}},
+        {"from": [8, 0, 0.8], "to": [8, 16, 15.2], "rotation": {"origin": [8, 8, 8], "axis": "y", "angle": 45, "rescale": True},
+         "faces": {"west": {"uv": [0, 0, 16, 16], "texture": "#cross"}, "east": {"uv": [0, 0, 16, 16], "texture": "#cross"}}}]})
+    put("models/block/oak_sapling.json", {"parent": "minecraft:block/cross", "textures": {"cross": "minecraft:block/oak_sapling"}})
+    put("blockstates/oak_sapling.json", {"variants": {
+        "stage=0": {"model": "minecraft:block/oak_sapling"}, "stage=1": {"model": "minecraft:block/oak_sapling"}}})
+    texture("oak_sapling", (40, 160, 40, 255))
+
+    flat = {"up": {"uv": [0, 0, 16, 16], "texture": "#line"}, "down": {"uv": [0, 16, 16, 0], "texture": "#line"}}
+    put("models/block/redstone_dust_dot.json", {"textures": {"particle": "block/redstone_dust_dot", "line": "block/redstone_dust_dot"},
+        "elements": [{"from": [0, 0.25, 0], "to": [16, 0.25, 16], "faces": flat}]})
+    put("models/block/redstone_dust_side0.json", {"textures": {"particle": "block/redstone_dust_dot", "line": "block/redstone_dust_line0"},
+        "elements": [{"from": [0, 0.25, 0], "to": [16, 0.25, 8], "faces": flat}]})
+    put("blockstates/redstone_wire.json", {"multipart": [
+        {"apply": {"model": "minecraft:block/redstone_dust_dot"}},
+        {"when": {"north": "side|up"}, "apply": {"model": "minecraft:block/redstone_dust_side0"}},
+        {"when": {"east": "side|up"}, "apply": {"model": "minecraft:block/redstone_dust_side0", "y": 90}}]})
+    texture("redstone_dust_dot", (200, 0, 0, 255))
+    texture("redstone_dust_line0", (200, 0, 0, 255))
+    return root
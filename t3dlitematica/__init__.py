@@ -1,4 +1,12 @@
 from t3dlitematica.litematicadecoder import Resolve
+from t3dlitematica.litematicadecoder import ResolveLazy
+from t3dlitematica.litematicadecoder import BlockVolume
+from t3dlitematica.litematicadecoder import DecodeCache
 from t3dlitematica.objbuilder import LitimaticaToObj
+from t3dlitematica.objbuilder import TexturePackIndex
+from t3dlitematica.objbuilder import MeshCache
 from t3dlitematica.texturepackexport import convert_texturepack
-from t3dlitematica.texturepackexport import multiload
\ No newline at end of file
+from t3dlitematica.texturepackexport import multiload
+from t3dlitematica.batch import run_batch
+from t3dlitematica.aio import resolve_async
+from t3dlitematica.aio import to_obj_async
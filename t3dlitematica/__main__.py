@@ -3,9 +3,11 @@ from pathlib import Path
 import click
 import json
 from alive_progress import alive_bar
-from .litematicadecoder import Resolve
+from .litematicadecoder import Resolve, container
 from .objbuilder import LitimaticaToObj
 from .texturepackexport import convert_texturepack
+from .batch import run_batch
+from .server import ConversionService, make_server
 
 
 class Litematica(click.ParamType):
@@ -25,11 +27,18 @@ class LitematicaOrJson(click.ParamType):
     def convert(self, value, param, ctx):
         if not os.path.exists(value):
             self.fail(f"{value} does not exist.")
-        if not value.endswith(".litematic") and not value.endswith(".json"):
-            self.fail(f"{value} is not a litematica or json file.")
+        if not value.endswith((".litematic", ".json", container.SUFFIX)):
+            self.fail(f"{value} is not a litematica, json or {container.SUFFIX} file.")
         return value
 
 
+def write_progress(bar):
+    def progress(written: int) -> None:
+        bar.text = f"{written / 1024 / 1024:.1f} MB written"
+
+    return progress
+
+
 @click.group()
 @click.option("--debug", default=False)
 def cli(debug):
@@ -40,15 +49,24 @@ def cli(debug):
 @cli.command()
 @click.argument("litematica", type=Litematica())
 @click.option("-o", "--output", "output", default="./", help="Output file path")
-@click.option("-f", "--filename", "filename", default="output.json", help="Output file name")
-def Decode(litematica, output, filename):
+@click.option("-f", "--filename", "filename", default=None, help="Output file name, output.json / output.3dlm by default")
+@click.option("--format", "format", type=click.Choice(["json", "container"]), default="json", help="Indented json or compact binary container")
+@click.option("--cache-dir", "cache_dir", default=None, help="Reuse decoded schematics stored in this folder")
+@click.option("--stream", "stream", is_flag=True, default=False, help="Decode while reading the file, lower peak memory")
+def Decode(litematica, output, filename, format, cache_dir, stream):
     """
     Decode a litematica file to json file
     """
     path = Path(output).absolute()
+    if format == "container":
+        # metadata json + 每個區域的 palette 與 little-endian index 陣列, obj 指令可直接 mmap
+        with alive_bar(bar="bubbles", spinner="wait"):
+            data = Resolve(litematica, blockvolume=True, cache=cache_dir, stream=stream)
+            container.dump(data, os.path.join(path, filename or "output" + container.SUFFIX))
+        return
     with alive_bar(bar="bubbles", spinner="wait"):
-        data = Resolve(litematica)
-    with open(os.path.join(path,filename), "w", encoding="utf8") as f:
+        data = Resolve(litematica, cache=cache_dir, stream=stream)
+    with open(os.path.join(path,filename or "output.json"), "w", encoding="utf8") as f:
         json.dump(data, f, indent=4)
 
 
@@ -56,34 +74,148 @@ def Decode(litematica, output, filename):
 @click.argument("json_or_litematica", type=LitematicaOrJson())
 @click.argument("texturefolder", type=click.Path(exists=True))
 @click.option("-o", "--output", "output", default="./", help="Output file path")
-def Obj(json_or_litematica, texturefolder, output):
+@click.option("--cull/--no-cull", "cull", default=True, help="Drop faces hidden by neighbouring full blocks")
+@click.option("--greedy", "greedy", is_flag=True, default=False, help="Merge flat faces of full blocks")
+@click.option("--format", "format", type=click.Choice(["obj", "glb"]), default="obj", help="Output model format")
+@click.option(
+    "--embed-textures/--external-textures",
+    "embed_textures",
+    default=True,
+    help="glb: pack textures into the .glb or write them to a textures folder",
+)
+@click.option("-j", "--jobs", "jobs", type=click.IntRange(min=0), default=1, help="Worker processes, 0 = all cores")
+@click.option("--cache-dir", "cache_dir", default=None, help="Reuse decoded schematics stored in this folder")
+@click.option("--stream", "stream", is_flag=True, default=False, help="Decode while reading the file, lower peak memory")
+@click.option("--atlas", "atlas", is_flag=True, default=False, help="Pack the used textures into atlas images")
+@click.option("--atlas-size", "atlas_size", type=click.IntRange(min=16), default=4096, help="Largest atlas side in pixels")
+@click.option("--groups", "groups", type=click.Choice(["g", "o"]), default=None, help="obj: one group / object per block type")
+@click.option("--compress-level", "compresslevel", type=click.IntRange(0, 9), default=6, help="Zip deflate level, 0 = store uncompressed")
+@click.option("--folder", "folder", is_flag=True, default=False, help="Write a folder instead of a zip")
+def Obj(json_or_litematica, texturefolder, output, cull, greedy, format, embed_textures, jobs, cache_dir, stream, atlas, atlas_size, groups, compresslevel, folder):
     """
     Convert a litematica file to obj file
     """
     json_or_litematica = Path(json_or_litematica).absolute()
     TextureFolder = Path(texturefolder).absolute()
     output = Path(output).absolute()
-    with alive_bar(bar="bubbles", spinner="wait"):
+    with alive_bar(bar="bubbles", spinner="wait") as bar:
         if str(json_or_litematica).endswith(".litematic"):
-            litematica = Resolve(json_or_litematica)
+            litematica = Resolve(json_or_litematica, blockvolume=True, cache=cache_dir, stream=stream)
+        elif container.is_container(json_or_litematica):
+            litematica = container.load(str(json_or_litematica))
         else:
             print(json_or_litematica)
             with open(json_or_litematica, "r", encoding="utf8") as f:
                 litematica = json.load(f)
-        LitimaticaToObj(litematica, TextureFolder, output)
+        LitimaticaToObj(
+            litematica,
+            TextureFolder,
+            output,
+            cull=cull,
+            greedy=greedy,
+            progress=write_progress(bar),
+            format=format,
+            embed_textures=embed_textures,
+            jobs=jobs,
+            atlas=atlas,
+            atlas_size=atlas_size,
+            groups=groups,
+            compresslevel=compresslevel,
+            folder=folder,
+        )
+
+
+@cli.command()
+@click.argument("source", type=click.Path(exists=True))
+@click.argument("texturefolder", type=click.Path(exists=True))
+@click.option("-o", "--output", "output", default="./", help="Output folder")
+@click.option("-j", "--jobs", "jobs", type=click.IntRange(min=0), default=0, help="Worker processes, 0 = all cores")
+@click.option("--report", "report", default=None, help="JSON lines report, default OUTPUT/report.jsonl")
+@click.option("--skip-existing", "skip_existing", is_flag=True, default=False, help="Skip files whose zip (or folder) already exists")
+@click.option("--cull/--no-cull", "cull", default=True, help="Drop faces hidden by neighbouring full blocks")
+@click.option("--greedy", "greedy", is_flag=True, default=False, help="Merge flat faces of full blocks")
+@click.option("--format", "format", type=click.Choice(["obj", "glb"]), default="obj", help="Output model format")
+@click.option("--atlas", "atlas", is_flag=True, default=False, help="Pack the used textures into atlas images")
+@click.option("--groups", "groups", type=click.Choice(["g", "o"]), default=None, help="obj: one group / object per block type")
+@click.option("--compress-level", "compresslevel", type=click.IntRange(0, 9), default=6, help="Zip deflate level, 0 = store uncompressed")
+@click.option("--folder", "folder", is_flag=True, default=False, help="Write a folder per file instead of a zip")
+@click.option("--cache-dir", "cache_dir", default=None, help="Reuse decoded schematics stored in this folder")
+@click.option("--stream", "stream", is_flag=True, default=False, help="Decode while reading the file, lower peak memory")
+def Batch(source, texturefolder, output, jobs, report, skip_existing, cull, greedy, format, atlas, groups, compresslevel, folder, cache_dir, stream):
+    """
+    Convert a folder (or a manifest listing files) of litematica files
+    """
+    output = Path(output).absolute()
+    with alive_bar(bar="bubbles", spinner="wait") as bar:
+
+        def progress(result):
+            bar()
+            bar.text = os.path.basename(result["input"]) + " " + result["status"]
+
+        counts = run_batch(
+            str(Path(source).absolute()),
+            str(Path(texturefolder).absolute()),
+            str(output),
+            jobs=jobs,
+            report=report,
+            skip_existing=skip_existing,
+            progress=progress,
+            cull=cull,
+            greedy=greedy,
+            format=format,
+            atlas=atlas,
+            groups=groups,
+            compresslevel=compresslevel,
+            folder=folder,
+            cache_dir=cache_dir,
+            stream=stream,
+        )
+    click.echo(f"{counts['ok']} converted, {counts['error']} failed, {counts['skipped']} skipped")
+    if counts["error"]:
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.argument("texturefolders", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--host", "host", default="127.0.0.1", help="Address to listen on")
+@click.option("--port", "port", type=click.IntRange(min=0, max=65535), default=8765, help="Port, 0 = any free port")
+@click.option("-j", "--workers", "workers", type=click.IntRange(min=1), default=2, help="Conversions running at once")
+@click.option("--queue-size", "queue_size", type=click.IntRange(min=1), default=16, help="Jobs waiting at most")
+@click.option("--threads", "threads", is_flag=True, default=False, help="Convert in this process instead of worker processes")
+@click.option("--work-dir", "work_dir", default=None, help="Folder for uploads and results, a temp folder by default")
+@click.option("-v", "--verbose", "verbose", is_flag=True, default=False, help="Log every request")
+def Serve(texturefolders, host, port, workers, queue_size, threads, work_dir, verbose):
+    """
+    Run a local HTTP conversion service
+    """
+    # 材質包以資料夾名稱選擇, 第一個是預設
+    packs = {}
+    for folder in texturefolders:
+        packs.setdefault(Path(folder).absolute().name, str(Path(folder).absolute()))
+    with ConversionService(packs, workers, queue_size, work_dir, processes=not threads) as service:
+        server = make_server(service, host, port, quiet=not verbose)
+        click.echo(f"serving {', '.join(packs)} on http://{server.server_address[0]}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
 
 
 @cli.command()
 @click.argument("texturepack", type=click.Path(exists=True))
 @click.option("-o", "--output", "output", default="./temp", help="Output file path")
-def Texture(texturepack, output):
+@click.option("-j", "--jobs", "jobs", type=click.IntRange(min=0), default=0, help="Worker threads, 0 = default")
+@click.option("--full", "full", is_flag=True, default=False, help="Ignore the manifest of the last run and convert everything")
+def Texture(texturepack, output, jobs, full):
     """
     Convert texture pack for 3d litematica
     """
     texturepack = Path(texturepack).absolute()
     output = Path(output).absolute()
     with alive_bar(bar="bubbles", spinner="wait"):
-        convert_texturepack(texturepack, output)
+        convert_texturepack(texturepack, output, jobs=jobs or None, incremental=not full)
 
 
 if __name__ == "__main__":
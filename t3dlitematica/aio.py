@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
+
+from .litematicadecoder import NBTHandler, Utilities
+from .litematicadecoder.LitematicaHandler import (
+    Resolve,
+    decode_BlockStates,
+    decode_BlockVolume,
+    read_nbt,
+    to_human,
+)
+from .litematicadecoder.cache import DecodeCache
+from .objbuilder import TexturePackIndex
+from .objbuilder.toobj import Objhandel, region_offsets
+
+# 同時進行的轉換數上限 (每個 event loop 各自計算)
+MAX_CONCURRENT = os.cpu_count() or 1
+
+_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def default_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(MAX_CONCURRENT, thread_name_prefix="3dlitematica-aio")
+        return _executor
+
+
+def default_limit() -> asyncio.Semaphore:
+    """semaphore shared by every call on the running loop that passes no ``limit``"""
+    loop = asyncio.get_running_loop()
+    limit = _limits.get(loop)
+    if limit is None:
+        limit = _limits[loop] = asyncio.Semaphore(MAX_CONCURRENT)
+    return limit
+
+
+async def run_stage(
+    executor: Optional[Executor], fn: Callable[..., Any], *args: Any, cleanup: Optional[Callable[[Any], Any]] = None
+) -> Any:
+    """
+    ``fn(*args)`` in ``executor`` (``default_executor()`` when None). When the caller is cancelled
+    a stage that has not started is dropped, a running one cannot be interrupted and finishes in
+    the background; ``cleanup`` runs once nothing of the stage is left running, with the result
+    of the stage (None if it did not run or failed).
+    """
+    future = (executor or default_executor()).submit(fn, *args)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        if future.cancel():
+            if cleanup is not None:
+                cleanup(None)
+        elif cleanup is not None:
+            future.add_done_callback(lambda f: cleanup(None if f.exception() is not None else f.result()))
+        raise
+
+
+def read_file(fPath: str) -> bytes:
+    with open(fPath, "rb") as f:
+        return f.read()
+
+
+def decode(Resolve_data: dict, blockvolume: bool) -> dict:
+    Resolve_data = to_human(Resolve_data)
+    if blockvolume:
+        return decode_BlockVolume(Resolve_data)
+    return decode_BlockStates(Resolve_data)
+
+
+async def resolve_async(
+    fPath: str,
+    blockvolume: bool = False,
+    cache: Optional[Union[str, DecodeCache]] = None,
+    stream: bool = False,
+    executor: Optional[Executor] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> dict:
+    """
+    ``Resolve`` without blocking the event loop: reading, gunzip, NBT parsing and decoding each
+    run in ``executor`` (a thread or process pool, ``default_executor()`` when None) and cancelling the
+    task stops it before the next stage. At most ``limit`` (``default_limit()``, ``MAX_CONCURRENT``
+    per loop) resolves / conversions run at once.
+    """
+    async with limit or default_limit():
+        if cache is not None:
+            # 快取命中只是 mmap, 不再拆成多個階段
+            return await run_stage(executor, Resolve, fPath, blockvolume, cache, stream)
+        if stream:
+            Resolve_data = await run_stage(executor, read_nbt, fPath, True)
+        else:
+            compressed = await run_stage(executor, read_file, fPath)
+            binSource = await run_stage(executor, Utilities.GZipUnzip, compressed)
+            del compressed
+            parse = functools.partial(NBTHandler.Resolve, raw_arrays=("BlockStates",))
+            Resolve_data = await run_stage(executor, parse, binSource)
+            del binSource
+        return await run_stage(executor, decode, Resolve_data, blockvolume)
+
+
+async def to_obj_async(
+    litematica: dict,
+    TextureFolder: Union[str, TexturePackIndex],
+    output: str = "./",
+    executor: Optional[Executor] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+    **options: Any,
+) -> Objhandel:
+    """
+    ``LitimaticaToObj`` without blocking the event loop. Loading the texture pack, building the
+    region volumes, creating the ``Objhandel`` (which opens the output), meshing and writing, and
+    finishing the zip are separate stages run in ``executor``, which must be a thread pool
+    (``default_executor()`` when None) since the stages share one ``Objhandel``. Cancelling the
+    task stops it before the next stage and removes what was written so far, only a zip that was
+    already being finished is kept; ``options`` are the keyword arguments of ``LitimaticaToObj``.
+    """
+    async with limit or default_limit():
+        texturepack = await run_stage(executor, TexturePackIndex.of, TextureFolder)
+        regions = await run_stage(executor, region_offsets, litematica)
+        size = tuple(int(litematica["Metadata"]["EnclosingSize"][i]) for i in "xyz")
+        name = litematica["Metadata"]["Name"]
+        create = functools.partial(Objhandel, name, regions, size, texturepack, output, run=False, **options)
+        handel = await run_stage(executor, create, cleanup=lambda handel: handel is not None and handel.discard())
+        try:
+            await run_stage(executor, handel.main, regions, size, cleanup=lambda _: handel.discard())
+            await run_stage(executor, handel.archive, cleanup=lambda _: handel.discard())
+        except Exception:
+            handel.discard()
+            raise
+        return handel
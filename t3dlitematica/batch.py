@@ -0,0 +1,164 @@
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .litematicadecoder import Resolve
+from .objbuilder import LitimaticaToObj, MeshCache, TexturePackIndex
+
+# 每個 worker 的材質包與模型快取, 由 init_worker 建立
+_worker: Optional[Tuple[TexturePackIndex, MeshCache, Dict[str, Any]]] = None
+
+
+def find_inputs(source: str) -> List[Tuple[str, str]]:
+    """
+    ``(litematic path, output name)`` of every job. ``source`` is a folder (searched recursively
+    for ``.litematic`` files) or a manifest: one path per line, or JSON lines with ``"input"`` and
+    an optional ``"output"`` name, relative paths are relative to the manifest. Output names are
+    the path relative to the folder / manifest without the extension.
+    """
+    source = os.path.abspath(source)
+    jobs = []
+    if os.path.isdir(source):
+        for folder, _, names in os.walk(source):
+            for name in names:
+                if name.endswith(".litematic"):
+                    path = os.path.join(folder, name)
+                    jobs.append((path, os.path.splitext(os.path.relpath(path, source))[0]))
+        return sorted(jobs)
+    base = os.path.dirname(source)
+    with open(source, "r", encoding="utf8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                path = os.path.join(base, entry["input"])
+                name = entry.get("output") or os.path.splitext(os.path.relpath(path, base))[0]
+            else:
+                path = os.path.join(base, line)
+                name = os.path.splitext(os.path.relpath(path, base))[0]
+            jobs.append((os.path.normpath(path), name))
+    return jobs
+
+
+def init_worker(texturefolder: str, options: Dict[str, Any]) -> None:
+    global _worker
+    # fork 時直接沿用父行程已載入的 TexturePackIndex
+    _worker = (TexturePackIndex.load(texturefolder), MeshCache(options.get("meshcache_size", 4096)), options)
+
+
+def convert(job: Tuple[str, str, str]) -> Dict[str, Any]:
+    """convert one schematic in the current worker, the result line for the report"""
+    path, name, output = job
+    texturepack, meshcache, options = _worker
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"input": path, "output": None}
+    try:
+        litematica = Resolve(path, blockvolume=True, cache=options.get("cache_dir"), stream=options.get("stream", False))
+        result["name"] = litematica["Metadata"]["Name"]
+        result["size"] = [int(litematica["Metadata"]["EnclosingSize"][i]) for i in "xyz"]
+        # 用檔名當輸出名稱, 玩家取的名字可能重複或含有路徑字元
+        litematica["Metadata"]["Name"] = os.path.basename(name)
+        folder = os.path.join(output, os.path.dirname(name))
+        os.makedirs(folder, exist_ok=True)
+        handel = LitimaticaToObj(
+            litematica,
+            texturepack,
+            folder,
+            meshcache=meshcache,
+            cull=options.get("cull", True),
+            greedy=options.get("greedy", False),
+            format=options.get("format", "obj"),
+            embed_textures=options.get("embed_textures", True),
+            atlas=options.get("atlas", False),
+            groups=options.get("groups"),
+            compresslevel=options.get("compresslevel", 6),
+            folder=options.get("folder", False),
+        )
+        result["output"] = str(handel)
+        result["bytes"] = output_size(str(handel))
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{e.__class__.__name__}: {e}"
+        result["traceback"] = traceback.format_exc(limit=-3)
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    result["pid"] = os.getpid()
+    return result
+
+
+def output_path(output: str, name: str, folder: bool = False) -> str:
+    return os.path.join(output, name if folder else name + ".zip")
+
+
+def output_size(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, i)) for root, _, names in os.walk(path) for i in names)
+
+
+def run_batch(
+    source: str,
+    texturefolder: str,
+    output: str,
+    jobs: int = 0,
+    report: Optional[str] = None,
+    skip_existing: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **options: Any,
+) -> Dict[str, int]:
+    """
+    Convert every schematic of ``source`` (see :func:`find_inputs`) into ``output``.
+
+    The texture pack is loaded once; ``jobs`` worker processes (0 for one per cpu, 1 converts in
+    this process) each keep the loaded :class:`TexturePackIndex` and a :class:`MeshCache` for all
+    the files they convert. One JSON line per file, with the error for failed ones, goes to
+    ``report`` (``output/report.jsonl`` by default) as soon as it finishes; ``progress`` is called
+    with the same dict. ``options`` are passed on to ``LitimaticaToObj`` (``cull``, ``greedy``,
+    ``format``, ``embed_textures``, ``atlas``, ``groups``, ``compresslevel``, ``folder``) and ``Resolve``
+    (``cache_dir``, ``stream``). Returns the number of ``ok`` / ``error`` / ``skipped`` files.
+    """
+    output = os.path.abspath(output)
+    texturefolder = os.path.abspath(texturefolder)
+    os.makedirs(output, exist_ok=True)
+    report = report or os.path.join(output, "report.jsonl")
+    TexturePackIndex.load(texturefolder)
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    todo = []
+    for path, name in find_inputs(source):
+        if skip_existing and os.path.exists(output_path(output, name, options.get("folder", False))):
+            counts["skipped"] += 1
+            continue
+        todo.append((path, name, output))
+    jobs = jobs or os.cpu_count() or 1
+
+    with open(report, "a", encoding="utf8") as f:
+        for result in _run(todo, texturefolder, options, jobs):
+            counts[result["status"]] += 1
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            f.flush()
+            if progress is not None:
+                progress(result)
+    return counts
+
+
+def _run(todo: List[Tuple[str, str, str]], texturefolder: str, options: Dict[str, Any], jobs: int) -> Iterator[Dict[str, Any]]:
+    if jobs == 1 or len(todo) <= 1:
+        init_worker(texturefolder, options)
+        for job in todo:
+            yield convert(job)
+        return
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(todo)), initializer=init_worker, initargs=(texturefolder, options)
+    ) as pool:
+        futures = {pool.submit(convert, job): job for job in todo}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # worker 整個掛掉 (例如記憶體不足被砍)
+                yield {"input": futures[future][0], "output": None, "status": "error", "error": f"{e.__class__.__name__}: {e}"}
@@ -1,34 +1,104 @@
+import gzip
+from array import array
 from . import NBTHandler
 from . import Utilities
 from . import bitstack
-import math
+from .blockvolume import BlockVolume
+from .cache import DecodeCache
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
 
-def Resolve(fPath:str):
-    litematic = open(fPath, "rb")
-    binSource = Utilities.GZipUnzip(litematic.read())
-    return decode_BlockStates(to_human(NBTHandler.Resolve(binSource)))
+# ResolveLazy 預設延後讀取的 tag
+LAZY_TAGS = ("BlockStates", "TileEntities", "Entities", "PendingBlockTicks", "PendingFluidTicks")
+
+def Resolve(fPath:str, blockvolume:bool = False, cache:Optional[Union[str, DecodeCache]] = None, stream:bool = False):
+    """
+    blockvolume: store each region as ``region["BlockVolume"]`` (a :class:`BlockVolume` palette
+    index array) instead of the per-block ``decode_BlockStates`` list
+    cache: folder (or :class:`DecodeCache`) keeping decoded schematics by content hash, a hit
+    memory-maps the stored index arrays instead of decoding again
+    stream: decompress and parse the file incrementally and unpack ``BlockStates`` while it is
+    read, neither the whole decompressed file nor the packed longs are kept in memory
+    """
+    if cache is None:
+        Resolve_data = to_human(read_nbt(fPath, stream))
+        if blockvolume:
+            return decode_BlockVolume(Resolve_data)
+        return decode_BlockStates(Resolve_data)
+
+    cache = DecodeCache.of(cache)
+    key = cache.key(fPath)
+    Resolve_data = cache.get(key)
+    if Resolve_data is None:
+        # 快取裡只存 BlockVolume, 需要 BlockStates 時由 decode_BlockStates 重新打包
+        Resolve_data = decode_BlockVolume(to_human(read_nbt(fPath, stream)))
+        cache.put(key, Resolve_data)
+    if blockvolume:
+        return Resolve_data
+    return decode_BlockStates(Resolve_data)
+
+
+def read_nbt(fPath:str, stream:bool = False) -> dict:
+    if stream:
+        with gzip.open(fPath, "rb") as litematic:
+            return NBTHandler.NBTStreamReader(
+                litematic, raw_arrays=("BlockStates",), array_handler=stream_BlockStates
+            ).read_root()
+    with open(fPath, "rb") as litematic:
+        binSource = Utilities.GZipUnzip(litematic.read())
+    return NBTHandler.Resolve(binSource, raw_arrays=("BlockStates",))
+
+
+def stream_BlockStates(region:dict, name:str, length:int, chunks:Iterator[array]) -> Optional[array]:
+    """
+    ``array_handler`` of the streaming reader: when the palette was read before ``BlockStates``
+    the longs are unpacked chunk by chunk into ``region["BlockIndices"]``, otherwise they are kept.
+    """
+    if "BlockStatePalette" not in region:
+        longs = array("q")
+        for chunk in chunks:
+            longs.extend(chunk)
+        return longs
+    bits = bitstack.bits_per_entry(len(region["BlockStatePalette"]))
+    unpacker = bitstack.Unpacker(bits, length * 64 // bits)
+    for chunk in chunks:
+        unpacker.feed(chunk)
+    region["BlockIndices"] = unpacker.result()
+    return None
+
+
+def ResolveLazy(fPath:str, lazy:Iterable[str] = LAZY_TAGS) -> dict:
+    """
+    Parse a litematica file without decoding the bulky tags: ``Metadata`` and each region's
+    ``Position`` / ``Size`` / ``BlockStatePalette`` are read at once, the tags named in ``lazy``
+    (``BlockStates``, ``TileEntities``, entity and tick lists by default) are kept as offsets
+    into the decompressed buffer and decoded on first access. ``to_BlockVolume(name, region)``
+    works on the returned regions.
+    """
+    with open(fPath, "rb") as litematic:
+        binSource = Utilities.GZipUnzip(litematic.read())
+    return NBTHandler.NBTLazyReader(binSource, lazy, raw_arrays=("BlockStates",)).read_root()
 
 
 def to_human(Resolve_data:dict) -> dict:
+    # NBTHandler reads big-endian numbers directly, the old ``/ 16777216`` correction for
+    # little-endian reads is gone and values are only normalised to int strings here.
     for i in Resolve_data["Metadata"]["EnclosingSize"]:
         Resolve_data["Metadata"]["EnclosingSize"][i] = str(
-            int(int(Resolve_data["Metadata"]["EnclosingSize"][i]) / 16777216)
+            int(Resolve_data["Metadata"]["EnclosingSize"][i])
         )
     for i in Resolve_data["Regions"]:
         for y in Resolve_data["Regions"][i]["Size"]:
-            Resolve_data["Regions"][i]["Size"][y] = str(
-                math.floor(float(Resolve_data["Regions"][i]["Size"][y]) / 16777216)
-            )
+            Resolve_data["Regions"][i]["Size"][y] = str(int(Resolve_data["Regions"][i]["Size"][y]))
 
         for y in Resolve_data["Regions"][i]["Position"]:
             Resolve_data["Regions"][i]["Position"][y] = str(
-                int(int(Resolve_data["Regions"][i]["Position"][y]) / 16777216)
+                int(Resolve_data["Regions"][i]["Position"][y])
             )
         for y, z in enumerate(Resolve_data["Regions"][i]["TileEntities"]):
             for hh in Resolve_data["Regions"][i]["TileEntities"][y]:
                 if hh == "x" or hh == "y" or hh == "z":
                     Resolve_data["Regions"][i]["TileEntities"][y][hh] = str(
-                        int(int(Resolve_data["Regions"][i]["TileEntities"][y][hh]) / 16777216)
+                        int(Resolve_data["Regions"][i]["TileEntities"][y][hh])
                     )
 
     return Resolve_data
@@ -53,13 +123,48 @@ def decode_BlockStates(Resolve_data:dict) -> dict:
     # (last) (0001) 00001 00001 00010 00010 00010 00010 00010 00001 00001 00001 00000 00000 (first)
 
     for i in Resolve_data["Regions"]:
-        Resolve_data["Regions"][i]["decode_BlockStates"] = []
-        bitlist = bitstack.bitstack(
-            len(Resolve_data["Regions"][i]["BlockStatePalette"]),
-            Resolve_data["Regions"][i]["BlockStatePalette"],
-        )
-        for y in Resolve_data["Regions"][i]["BlockStates"]:
-            bitlist.add(y)
-        Resolve_data["Regions"][i]["decode_BlockStates"] = bitlist.calc()
-        print("decode success")
+        region = Resolve_data["Regions"][i]
+        indices, palette = region_indices(region)
+        # 舊格式: 每個方塊一個 palette dict, 順序反轉
+        region["decode_BlockStates"] = [palette[y] for y in reversed(indices.tolist())]
+        if "BlockStates" not in region:
+            region["BlockStates"] = bitstack.pack(indices, bitstack.bits_per_entry(len(palette)))
+        if not isinstance(region["BlockStates"], list):
+            region["BlockStates"] = [str(y) for y in region["BlockStates"]]
     return Resolve_data
+
+
+def decode_BlockVolume(Resolve_data:dict) -> dict:
+    for i in Resolve_data["Regions"]:
+        region = Resolve_data["Regions"][i]
+        region["BlockVolume"] = to_BlockVolume(i, region)
+        region.pop("BlockStates", None)
+    return Resolve_data
+
+
+def region_indices(region:dict) -> Tuple[Any, List[dict]]:
+    """
+    ``(index array, palette)`` of a region, taken from its ``BlockVolume``, the indices unpacked
+    while streaming, or by unpacking ``BlockStates``
+    """
+    if "BlockVolume" in region:
+        volume = region.pop("BlockVolume")
+        return volume.indices[: len(volume)], volume.palette
+    if "BlockIndices" in region:
+        return region.pop("BlockIndices")[: region_volume(region)], region["BlockStatePalette"]
+    return bitstack.decode(region["BlockStates"], region["BlockStatePalette"], region_volume(region))
+
+
+def to_BlockVolume(name:str, region:dict) -> BlockVolume:
+    indices, palette = region_indices(region)
+    size = (int(region["Size"]["x"]), int(region["Size"]["y"]), int(region["Size"]["z"]))
+    position = (
+        int(region["Position"]["x"]),
+        int(region["Position"]["y"]),
+        int(region["Position"]["z"]),
+    )
+    return BlockVolume(size, palette, indices, name, position)
+
+
+def region_volume(region: dict) -> int:
+    return abs(int(region["Size"]["x"]) * int(region["Size"]["y"]) * int(region["Size"]["z"]))
@@ -1,239 +1,476 @@
 import struct
-from . import Utilities
-import copy
-from typing import Union
-
-
-def Resolve(binSource:bytes , indentationWhiteSpace:int = 2) -> dict:
-    jsonLines , _ = ReadCompoundTag(binSource , indentationWhiteSpace)
-    return jsonLines
-
-def ReadCompoundTag(binSource:bytes , indentationWhiteSpace:int = 2 , pointer:int = 0 , defaultIndentation:int = 0 , readName:bool = False) -> tuple[Union[dict , str] , int]:
-    indentation = defaultIndentation
-    name = ""
-    if readName:
-        name , pointer = ReadTagName(binSource , pointer)
+import sys
+from array import array
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+# NBT tag ids
+TAG_End = 0
+TAG_Byte = 1
+TAG_Short = 2
+TAG_Int = 3
+TAG_Long = 4
+TAG_Float = 5
+TAG_Double = 6
+TAG_Byte_Array = 7
+TAG_String = 8
+TAG_List = 9
+TAG_Compound = 10
+TAG_Int_Array = 11
+TAG_Long_Array = 12
+
+# NBT is big-endian, unpackers are compiled once and reused for every tag
+_BYTE = struct.Struct(">b")
+_SHORT = struct.Struct(">h")
+_USHORT = struct.Struct(">H")
+_INT = struct.Struct(">i")
+_LONG = struct.Struct(">q")
+_FLOAT = struct.Struct(">f")
+_DOUBLE = struct.Struct(">d")
+
+
+def Resolve(
+    binSource: bytes, indentationWhiteSpace: int = 2, raw_arrays: Union[bool, Iterable[str]] = False
+) -> dict:
+    """
+    解析 NBT 資料 (已解壓縮)
+
+    indentationWhiteSpace is kept for backward compatibility and is ignored.
+    raw_arrays: return TAG_Int_Array / TAG_Long_Array as native ``array.array`` instead of
+    lists of strings, either for every array or only for the given tag names.
+    """
+    return NBTReader(binSource, raw_arrays=raw_arrays).read_root()
+
+
+class NBTReader:
+    """
+    Single pass NBT reader.
+
+    The whole payload is wrapped in one ``memoryview`` and read with a cursor, nothing is copied
+    while walking the tree, so decoding time grows linearly with the file size.
+
+    Values keep the shape the old reader produced:
+    TAG_Byte -> int, TAG_Short / TAG_Int / TAG_Long -> str, TAG_Float / TAG_Double -> float,
+    arrays -> list, nested TAG_List -> {"name": "SubList", "value": [...]}.
+
+    With ``raw_arrays`` the int and long arrays are returned as ``array.array("i" / "q")`` in
+    native byte order, which skips creating one python string per element. Passing tag names
+    (e.g. ``("BlockStates",)``) limits that to the named arrays.
+    """
+
+    def __init__(
+        self,
+        binSource: Union[bytes, bytearray, memoryview],
+        pointer: int = 0,
+        raw_arrays: Union[bool, Iterable[str]] = False,
+    ) -> None:
+        self.buf = memoryview(binSource)
+        self.pointer = pointer
+        self.raw_arrays = raw_arrays is True
+        self.raw_names = frozenset() if isinstance(raw_arrays, bool) else frozenset(raw_arrays)
+        self.payloads: Dict[int, Callable[[], Any]] = {
+            TAG_Byte: self.read_byte,
+            TAG_Short: self.read_short,
+            TAG_Int: self.read_int,
+            TAG_Long: self.read_long,
+            TAG_Float: self.read_float,
+            TAG_Double: self.read_double,
+            TAG_Byte_Array: self.read_byte_array,
+            TAG_String: self.read_string,
+            TAG_List: self.read_list,
+            TAG_Compound: self.read_compound,
+            TAG_Int_Array: self.read_int_array,
+            TAG_Long_Array: self.read_long_array,
+        }
+
+    def read_root(self) -> dict:
+        tagType = self.buf[self.pointer]
+        self.pointer += 1
+        if tagType != TAG_Compound:
+            raise ValueError(f"root tag must be TAG_Compound, got {tagType}")
+        self.read_string()  # root name, always empty in litematica files
+        return self.read_compound()
+
+    def read_name(self) -> str:
+        name = self.read_string()
+        return name if name else "Unknow Name"
+
+    def read_payload(self, tagType: int) -> Any:
+        try:
+            reader = self.payloads[tagType]
+        except KeyError:
+            raise ValueError(f"unknown NBT tag {tagType} at {self.pointer}") from None
+        return reader()
+
+    def read_compound(self) -> dict:
+        buf = self.buf
+        payloads = self.payloads
         litematicdata = {}
-        returnlitematicdata = {"name": name, "value": ""}
-    else:
-        pointer += 3
+        while True:
+            tagType = buf[self.pointer]
+            self.pointer += 1
+            if tagType == TAG_End:
+                return litematicdata
+            name = self.read_name()
+            try:
+                reader = payloads[tagType]
+            except KeyError:
+                raise ValueError(f"unknown NBT tag {tagType} at {self.pointer - 1}") from None
+            if name in self.raw_names and tagType == TAG_Long_Array:
+                litematicdata[name] = self.read_native_array("q", 8)
+            elif name in self.raw_names and tagType == TAG_Int_Array:
+                litematicdata[name] = self.read_native_array("i", 4)
+            else:
+                litematicdata[name] = reader()
+
+    def read_list(self) -> list:
+        buf = self.buf
+        contentType = buf[self.pointer]
+        (contentCount,) = _INT.unpack_from(buf, self.pointer + 1)
+        self.pointer += 5
+        if contentType == TAG_End or contentCount <= 0:
+            return []
+        if contentType == TAG_Byte:
+            return list(self.read_raw(">", "b", 1, contentCount))
+        if contentType in (TAG_Short, TAG_Int, TAG_Long):
+            fmt, size = {TAG_Short: ("h", 2), TAG_Int: ("i", 4), TAG_Long: ("q", 8)}[contentType]
+            return [str(i) for i in self.read_raw(">", fmt, size, contentCount)]
+        if contentType == TAG_Float:
+            return list(self.read_raw(">", "f", 4, contentCount))
+        if contentType == TAG_Double:
+            return list(self.read_raw(">", "d", 8, contentCount))
+        if contentType == TAG_List:
+            return [{"name": "SubList", "value": self.read_list()} for _ in range(contentCount)]
+        reader = self.payloads.get(contentType)
+        if reader is None:
+            raise ValueError(f"unknown NBT list type {contentType} at {self.pointer - 5}")
+        return [reader() for _ in range(contentCount)]
+
+    def read_raw(self, order: str, fmt: str, size: int, count: int) -> tuple:
+        values = struct.unpack_from(f"{order}{count}{fmt}", self.buf, self.pointer)
+        self.pointer += size * count
+        return values
+
+    def read_byte(self) -> int:
+        (value,) = _BYTE.unpack_from(self.buf, self.pointer)
+        self.pointer += 1
+        return value
+
+    def read_short(self) -> str:
+        (value,) = _SHORT.unpack_from(self.buf, self.pointer)
+        self.pointer += 2
+        return str(value)
+
+    def read_int(self) -> str:
+        (value,) = _INT.unpack_from(self.buf, self.pointer)
+        self.pointer += 4
+        return str(value)
+
+    def read_long(self) -> str:
+        (value,) = _LONG.unpack_from(self.buf, self.pointer)
+        self.pointer += 8
+        return str(value)
+
+    def read_float(self) -> float:
+        (value,) = _FLOAT.unpack_from(self.buf, self.pointer)
+        self.pointer += 4
+        return value
+
+    def read_double(self) -> float:
+        (value,) = _DOUBLE.unpack_from(self.buf, self.pointer)
+        self.pointer += 8
+        return value
+
+    def read_string(self) -> str:
+        (length,) = _USHORT.unpack_from(self.buf, self.pointer)
+        start = self.pointer + 2
+        self.pointer = start + length
+        # NBT uses modified UTF-8, plain UTF-8 covers everything litematica writes
+        return str(self.buf[start : self.pointer], "utf8", "replace")
+
+    def read_array_length(self) -> int:
+        (length,) = _INT.unpack_from(self.buf, self.pointer)
+        self.pointer += 4
+        return max(length, 0)
+
+    def read_byte_array(self) -> List[int]:
+        return list(self.read_raw(">", "b", 1, self.read_array_length()))
+
+    def read_native_array(self, typecode: str, size: int) -> array:
+        length = self.read_array_length()
+        values = array(typecode)
+        values.frombytes(self.buf[self.pointer : self.pointer + size * length])
+        if sys.byteorder == "little":
+            values.byteswap()
+        self.pointer += size * length
+        return values
+
+    def read_int_array(self) -> Union[List[str], array]:
+        if self.raw_arrays:
+            return self.read_native_array("i", 4)
+        return [str(i) for i in self.read_raw(">", "i", 4, self.read_array_length())]
+
+    def read_long_array(self) -> Union[List[str], array]:
+        if self.raw_arrays:
+            return self.read_native_array("q", 8)
+        return [str(i) for i in self.read_raw(">", "q", 8, self.read_array_length())]
+
+
+# 串流讀取時每次讀入的陣列大小 (bytes)
+STREAM_CHUNK = 1 << 20
+
+ArrayHandler = Callable[[dict, str, int, Iterator[array]], Any]
+
+
+class NBTStreamReader(NBTReader):
+    """
+    :class:`NBTReader` over a file object (e.g. ``gzip.open``), reading only as much as the
+    current tag needs, so the decompressed payload never exists as a whole.
+
+    Int / long arrays are read ``STREAM_CHUNK`` bytes at a time. For the arrays selected by
+    ``raw_arrays``, ``array_handler(compound, name, length, chunks)`` may consume the native
+    ``array.array`` chunks itself, ``compound`` being the tags read so far next to the array; its
+    return value is stored under ``name`` (nothing is stored for None).
+    """
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        raw_arrays: Union[bool, Iterable[str]] = False,
+        array_handler: Optional[ArrayHandler] = None,
+    ) -> None:
+        super().__init__(b"", 0, raw_arrays)
+        self.file = fileobj
+        self.array_handler = array_handler
+
+    def take(self, size: int) -> bytes:
+        data = self.file.read(size)
+        if len(data) != size:
+            raise EOFError(f"NBT data ends at {self.pointer + len(data)}, {size} bytes expected")
+        self.pointer += size
+        return data
+
+    def read_root(self) -> dict:
+        tagType = self.take(1)[0]
+        if tagType != TAG_Compound:
+            raise ValueError(f"root tag must be TAG_Compound, got {tagType}")
+        self.read_string()
+        return self.read_compound()
+
+    def read_compound(self) -> dict:
+        payloads = self.payloads
         litematicdata = {}
-
-    while True:
-        if binSource[pointer] == 0:
-            indentation -= indentationWhiteSpace
-            pointer += 1
-            if indentation < defaultIndentation:
-                break
-        if   binSource[pointer] == 1:  # TAG_Byte
-            jsonLine , pointer = ReadByteTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonLine["name"]] = jsonLine["value"]
-        elif binSource[pointer] == 2:  # TAG_Short
-            jsonLine , pointer = ReadShortTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonLine["name"]] = jsonLine["value"]
-        elif binSource[pointer] == 3:  # TAG_Int
-            jsonLine , pointer = ReadIntTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonLine["name"]] = jsonLine["value"]
-        elif binSource[pointer] == 4:  # TAG_Long
-            jsonLine , pointer = ReadLongTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonLine["name"]] = jsonLine["value"]
-        elif binSource[pointer] == 5:  # TAG_Float
-            jsonLine , pointer = ReadFloatTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonLine["name"]] = jsonLine["value"]
-        elif binSource[pointer] == 6:  # TAG_Double
-            jsonLine , pointer = ReadDoubleTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonLine["name"]] = jsonLine["value"]
-        elif binSource[pointer] == 7:  # TAG_Byte_Array
-            jsonSubLines , pointer = ReadByteArrayTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonSubLines["name"]] = jsonSubLines["value"]
-        elif binSource[pointer] == 8:  # TAG_String
-            jsonLine , pointer = ReadStringTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonLine["name"]] = jsonLine["value"]
-        elif binSource[pointer] == 9:  # TAG_List
-            jsonSubLines , pointer = ReadListTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonSubLines["name"]] = jsonSubLines["value"]
-        elif binSource[pointer] == 10: # TAG_Compound
-            jsonSubLines , pointer = ReadCompoundTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2 , True)
-            litematicdata[jsonSubLines["name"]] = jsonSubLines["value"]
-        elif binSource[pointer] == 11: # TAG_Int_Array
-            jsonSubLines , pointer = ReadIntArrayTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonSubLines["name"]] = jsonSubLines["value"]
-        elif binSource[pointer] == 12: # TAG_Long_Array
-            jsonSubLines , pointer = ReadLongArrayTag(copy.deepcopy(binSource) , indentationWhiteSpace , pointer , indentation + 2)
-            litematicdata[jsonSubLines["name"]] = jsonSubLines["value"]
-        else:
-            break
-    if readName:
-        returnlitematicdata["value"] = litematicdata
-        return returnlitematicdata , pointer
-    else:
-        return litematicdata , pointer
-
-
-def ReadByteTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    tagContent , pointer = ReadByte(binSource , pointer)
-    jsonLine = {"name": tagName, "value": tagContent}
-    return jsonLine , pointer
-
-
-def ReadShortTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    tagContent = str(struct.unpack("h" , binSource[pointer : pointer + 2]))[1 : -2]
-    jsonLine = {"name": tagName, "value": tagContent}
-    return jsonLine , pointer + 2
-
-
-def ReadIntTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    tagContent = str(struct.unpack("i" , binSource[pointer : pointer + 4]))[1 : -2]
-    jsonLine = {"name": tagName, "value": tagContent}
-    return jsonLine , pointer + 4
-
-
-def ReadLongTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    tagContent = str(struct.unpack("q" , binSource[pointer : pointer + 8]))[1 : -2]
-    jsonLine = {"name": tagName, "value": tagContent}
-    return jsonLine , pointer + 8
-
-
-def ReadFloatTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    tagContent = ReadFloat(binSource , pointer)
-    jsonLine = {"name": tagName, "value": tagContent}
-    return jsonLine , pointer + 4
-
-
-def ReadDoubleTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    tagContent = ReadDouble(binSource , pointer)
-    jsonLine = {"name": tagName, "value": tagContent}
-    return jsonLine , pointer + 8
-
-
-def ReadByteArrayTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    length = Utilities.BigEndiannessForInt(binSource , pointer)
-    jsonLines = {"name": tagName, "value": []}
-    pointer += 4
-    for _ in range(length):
-        tagContent , pointer = ReadByte(binSource , pointer)
-        jsonLines["value"].append(tagContent)
-
-    return jsonLines , pointer
-
-
-def ReadStringTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    tagContent , pointer = ReadString(binSource , pointer + 1)
-    jsonLine = {"name": tagName, "value": tagContent}
-    return jsonLine , pointer
-
-
-def ReadListTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation , callByList = False):
-    if callByList:
-        tagName = "SubList"
-    else:
-        tagName , pointer = ReadTagName(binSource , pointer)
-    jsonLines = {"name": tagName, "value": []}
-    contentType = binSource[pointer]
-    contentCount = Utilities.BigEndiannessForInt(binSource , pointer + 1)
-    pointer += 5
-    if contentType != 0:
-        if contentType == 1:    # TAG_Bytes
-            for _ in range(contentCount):
-                tagContent , pointer = ReadByte(binSource , pointer)
-                jsonLines["value"].append(tagContent)
-        elif 1 < contentType < 5: #TAG_Short , TAG_Int , TAG_Long
-            unpackFormat = None
-            if   contentType == 2:
-                unpackFormat = "h"
-            elif contentType == 3:
-                unpackFormat = "i"
+        while True:
+            tagType = self.take(1)[0]
+            if tagType == TAG_End:
+                return litematicdata
+            name = self.read_name()
+            try:
+                reader = payloads[tagType]
+            except KeyError:
+                raise ValueError(f"unknown NBT tag {tagType} at {self.pointer - 1}") from None
+            if name in self.raw_names and tagType in (TAG_Long_Array, TAG_Int_Array):
+                typecode, size = ("q", 8) if tagType == TAG_Long_Array else ("i", 4)
+                length = self.read_array_length()
+                chunks = self.array_chunks(typecode, size, length)
+                if self.array_handler is not None:
+                    value = self.array_handler(litematicdata, name, length, chunks)
+                else:
+                    value = array(typecode)
+                    for chunk in chunks:
+                        value.extend(chunk)
+                # handler 沒讀完的部分要跳過, 否則後面的 tag 會錯位
+                for _ in chunks:
+                    pass
+                if value is not None:
+                    litematicdata[name] = value
             else:
-                unpackFormat = "q"
-            size = (1 << contentType) >> 1
-            for _ in range(contentCount):
-                tagContent = str(struct.unpack(unpackFormat , binSource[pointer : pointer + size]))[1 : -2]
-                jsonLines["value"].append(tagContent)
-        elif contentType == 5: # TAG_Float
-            for _ in range(contentCount):
-                tagContent , pointer = ReadFloat(binSource , pointer)
-                jsonLines["value"].append(tagContent)
-        elif contentType == 6: # TAG_Double
-            for _ in range(contentCount):
-                tagContent , pointer = ReadDouble(binSource , pointer)
-                jsonLines["value"].append(tagContent)
-        elif contentType == 8:    # TAG_String
-            for _ in range(contentCount):
-                pointer += 1
-                tagContent , pointer = ReadString(binSource , pointer)
-                jsonLines["value"].append(tagContent)
-        elif contentType == 9:    # TAG_List
-            for _ in range(contentCount):
-                jsonSubLines , pointer = ReadListTag(binSource , indentationWhiteSpace , pointer , defaultIndentation + 2 , True)
-                jsonLines["value"].append(jsonSubLines)
-        elif contentType == 10:   # TAG_Compound
-            for _ in range(contentCount):
-                jsonSubLines , pointer = ReadCompoundTag(binSource , indentationWhiteSpace , pointer - 3 , defaultIndentation + 2 , False)
-                jsonLines["value"].append(jsonSubLines)
-        elif contentType == 7 or 10 < binSource[pointer] < 13:  # TAG_Byte_Array , TAG_Int_Array , TAG_Long_Array
-            pass
-    return jsonLines , pointer
-
-
-def ReadIntArrayTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    length = Utilities.BigEndiannessForInt(binSource , pointer)
-    jsonLines = {"name": tagName, "value": []}
-    pointer += 4
-    for _ in range(length):
-        binSource = binSource.ljust(pointer + 4 , b"\x00")
-        tagContent = str(struct.unpack("i" , binSource[pointer : pointer + 4]))[1 : -2]
-        jsonLines["value"].append(tagContent)
-        pointer += 4
-    return jsonLines , pointer
-
-
-def ReadLongArrayTag(binSource:bytes , indentationWhiteSpace , pointer , defaultIndentation):
-    tagName , pointer = ReadTagName(binSource , pointer)
-    length = Utilities.BigEndiannessForInt(binSource , pointer)
-    jsonLines = {"name": tagName, "value": []}
-    pointer += 4
-    for _ in range(length):
-        tagContent = str(struct.unpack("q" , binSource[pointer : pointer + 8]))[1 : -2]
-        jsonLines["value"].append(tagContent)
-        pointer += 8
-
-    return jsonLines , pointer
-
-
-def ReadString(binSource:bytes , pointer):
-    string = ""
-    for _ in range(binSource[pointer]):
-        pointer += 1
-        string += chr(binSource[pointer])
-    return string , pointer + 1
-
-
-def ReadFloat(binSource:bytes , pointer):
-    return float(str(struct.unpack(">f" , bytearray(binSource[pointer : pointer + 4])))[1:-2]) , pointer + 4
-
-
-def ReadDouble(binSource:bytes , pointer):
-    return float(str(struct.unpack(">d" , binSource[pointer : pointer + 8]))[1:-2]) , pointer + 8
-
-
-def ReadByte(binSource:bytes , pointer):
-    binary = binSource[pointer]
-    if (binary & 0b1000_0000) > 0:
-        binary = -((~binary + 1) & 0b1111_1111)
-    return binary , pointer + 1
-
-
-def ReadTagName(binSource:bytes , pointer):
-    pointer += 2
-    if binSource[pointer] == 0:
-        return "Unknow Name" , pointer + 1
-    return ReadString(binSource , pointer)
\ No newline at end of file
+                litematicdata[name] = reader()
+
+    def read_list(self) -> list:
+        header = self.take(5)
+        contentType = header[0]
+        (contentCount,) = _INT.unpack_from(header, 1)
+        if contentType == TAG_End or contentCount <= 0:
+            return []
+        if contentType == TAG_Byte:
+            return list(self.read_raw(">", "b", 1, contentCount))
+        if contentType in (TAG_Short, TAG_Int, TAG_Long):
+            fmt, size = {TAG_Short: ("h", 2), TAG_Int: ("i", 4), TAG_Long: ("q", 8)}[contentType]
+            return [str(i) for i in self.read_raw(">", fmt, size, contentCount)]
+        if contentType == TAG_Float:
+            return list(self.read_raw(">", "f", 4, contentCount))
+        if contentType == TAG_Double:
+            return list(self.read_raw(">", "d", 8, contentCount))
+        if contentType == TAG_List:
+            return [{"name": "SubList", "value": self.read_list()} for _ in range(contentCount)]
+        reader = self.payloads.get(contentType)
+        if reader is None:
+            raise ValueError(f"unknown NBT list type {contentType} at {self.pointer - 5}")
+        return [reader() for _ in range(contentCount)]
+
+    def read_raw(self, order: str, fmt: str, size: int, count: int) -> tuple:
+        return struct.unpack(f"{order}{count}{fmt}", self.take(size * count))
+
+    def read_byte(self) -> int:
+        return _BYTE.unpack(self.take(1))[0]
+
+    def read_short(self) -> str:
+        return str(_SHORT.unpack(self.take(2))[0])
+
+    def read_int(self) -> str:
+        return str(_INT.unpack(self.take(4))[0])
+
+    def read_long(self) -> str:
+        return str(_LONG.unpack(self.take(8))[0])
+
+    def read_float(self) -> float:
+        return _FLOAT.unpack(self.take(4))[0]
+
+    def read_double(self) -> float:
+        return _DOUBLE.unpack(self.take(8))[0]
+
+    def read_string(self) -> str:
+        (length,) = _USHORT.unpack(self.take(2))
+        return str(self.take(length), "utf8", "replace")
+
+    def read_array_length(self) -> int:
+        return max(_INT.unpack(self.take(4))[0], 0)
+
+    def array_chunks(self, typecode: str, size: int, length: int) -> Iterator[array]:
+        """the next ``length`` big-endian values as native arrays of at most ``STREAM_CHUNK`` bytes"""
+        step = max(STREAM_CHUNK // size, 1)
+        for start in range(0, length, step):
+            values = array(typecode)
+            values.frombytes(self.take(size * min(step, length - start)))
+            if sys.byteorder == "little":
+                values.byteswap()
+            yield values
+
+    def read_native_array(self, typecode: str, size: int) -> array:
+        values = array(typecode)
+        for chunk in self.array_chunks(typecode, size, self.read_array_length()):
+            values.extend(chunk)
+        return values
+
+
+# payload 長度固定的 tag
+_FIXED_SIZES = {TAG_Byte: 1, TAG_Short: 2, TAG_Int: 4, TAG_Long: 8, TAG_Float: 4, TAG_Double: 8}
+# 陣列 tag 每個元素的長度
+_ARRAY_SIZES = {TAG_Byte_Array: 1, TAG_Int_Array: 4, TAG_Long_Array: 8}
+
+
+class LazyTag:
+    """An unread tag payload: its type and offset in the buffer it was found in."""
+
+    __slots__ = ("buf", "tagType", "pointer", "raw_arrays")
+
+    def __init__(self, buf: memoryview, tagType: int, pointer: int, raw_arrays: Union[bool, Iterable[str]]) -> None:
+        self.buf = buf
+        self.tagType = tagType
+        self.pointer = pointer
+        self.raw_arrays = raw_arrays
+
+    def __repr__(self) -> str:
+        return f"<LazyTag type={self.tagType} at={self.pointer}>"
+
+    def read(self) -> Any:
+        return NBTReader(self.buf, self.pointer, self.raw_arrays).read_payload(self.tagType)
+
+
+class LazyCompound(dict):
+    """
+    Compound whose :class:`LazyTag` values are read on first access (``[]``, ``get``, ``items``,
+    ``values``, ``pop``) and then replaced by the value. ``loaded(name)`` tells whether a tag was
+    read already; iterating the keys never reads anything.
+    """
+
+    def __getitem__(self, name: str) -> Any:
+        value = dict.__getitem__(self, name)
+        if isinstance(value, LazyTag):
+            value = value.read()
+            dict.__setitem__(self, name, value)
+        return value
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self[name] if name in self else default
+
+    def pop(self, name: str, *default: Any) -> Any:
+        if name in self:
+            value = self[name]
+            del self[name]
+            return value
+        return dict.pop(self, name, *default)
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def loaded(self, name: str) -> bool:
+        return not isinstance(dict.__getitem__(self, name), LazyTag)
+
+
+class NBTLazyReader(NBTReader):
+    """
+    :class:`NBTReader` that leaves the tags named in ``lazy`` unread: they are skipped over and
+    kept as :class:`LazyTag` offsets inside :class:`LazyCompound` dicts, so reading the rest costs
+    only its own size plus a walk over the skipped tag headers.
+    """
+
+    def __init__(
+        self,
+        binSource: Union[bytes, bytearray, memoryview],
+        lazy: Iterable[str],
+        raw_arrays: Union[bool, Iterable[str]] = False,
+    ) -> None:
+        super().__init__(binSource, 0, raw_arrays)
+        self.lazy = frozenset(lazy)
+
+    def read_compound(self) -> dict:
+        buf = self.buf
+        litematicdata = LazyCompound()
+        while True:
+            tagType = buf[self.pointer]
+            self.pointer += 1
+            if tagType == TAG_End:
+                return litematicdata
+            name = self.read_name()
+            if name in self.lazy:
+                dict.__setitem__(litematicdata, name, LazyTag(buf, tagType, self.pointer, self.raw_arrays or self.raw_names))
+                self.skip(tagType)
+            elif name in self.raw_names and tagType == TAG_Long_Array:
+                litematicdata[name] = self.read_native_array("q", 8)
+            elif name in self.raw_names and tagType == TAG_Int_Array:
+                litematicdata[name] = self.read_native_array("i", 4)
+            else:
+                litematicdata[name] = self.read_payload(tagType)
+
+    def skip(self, tagType: int) -> None:
+        """move the cursor past a payload of ``tagType`` without building it"""
+        buf = self.buf
+        if tagType in _FIXED_SIZES:
+            self.pointer += _FIXED_SIZES[tagType]
+        elif tagType in _ARRAY_SIZES:
+            self.pointer += 4 + _ARRAY_SIZES[tagType] * max(_INT.unpack_from(buf, self.pointer)[0], 0)
+        elif tagType == TAG_String:
+            self.pointer += 2 + _USHORT.unpack_from(buf, self.pointer)[0]
+        elif tagType == TAG_List:
+            contentType = buf[self.pointer]
+            (contentCount,) = _INT.unpack_from(buf, self.pointer + 1)
+            self.pointer += 5
+            if contentType in _FIXED_SIZES:
+                self.pointer += _FIXED_SIZES[contentType] * max(contentCount, 0)
+            elif contentType != TAG_End:
+                for _ in range(contentCount):
+                    self.skip(contentType)
+        elif tagType == TAG_Compound:
+            while True:
+                contentType = buf[self.pointer]
+                self.pointer += 1
+                if contentType == TAG_End:
+                    return
+                self.pointer += 2 + _USHORT.unpack_from(buf, self.pointer)[0]
+                self.skip(contentType)
+        else:
+            raise ValueError(f"unknown NBT tag {tagType} at {self.pointer}")
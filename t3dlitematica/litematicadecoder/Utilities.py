@@ -1,5 +1,4 @@
 import gzip
-import io
 
 
 def BigEndiannessForInt(source: bytes, index: int) -> int:
@@ -25,4 +24,4 @@ def SmallEndiannessForInt(source: bytes, index: int) -> int:
 
 
 def GZipUnzip(source:bytes) -> bytes:
-    return gzip.GzipFile(fileobj=io.BytesIO(source)).read()
+    return gzip.decompress(source)
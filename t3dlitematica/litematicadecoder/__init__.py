@@ -1 +1,4 @@
 from .LitematicaHandler import Resolve as Resolve
+from .LitematicaHandler import ResolveLazy as ResolveLazy
+from .blockvolume import BlockVolume as BlockVolume
+from .cache import DecodeCache as DecodeCache
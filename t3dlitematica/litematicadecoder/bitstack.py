@@ -1,33 +1,183 @@
-from typing import List, Any
+from array import array
+from typing import Any, Iterable, List, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the pure python path below is used instead
+    np = None
+
+# indices are unpacked in blocks of this many entries to bound temporary numpy memory
+CHUNK_ENTRIES = 1 << 16
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def bits_per_entry(palette_length: int) -> int:
+    """Litematica stores at least 2 bits per entry"""
+    return max(2, (palette_length - 1).bit_length())
+
+
+def to_longs(BlockStates: Union[Sequence[Any], array, "np.ndarray"]) -> Union[array, "np.ndarray"]:
+    """
+    Convert the ``BlockStates`` tag (list of int strings, ``array.array("q")`` or ndarray)
+    to an int64 ndarray, or to ``array.array("q")`` when numpy is not installed.
+    """
+    if np is not None:
+        if isinstance(BlockStates, np.ndarray):
+            return BlockStates.astype(np.int64, copy=False)
+        if isinstance(BlockStates, array):
+            return np.frombuffer(BlockStates, dtype=np.int64)
+        return np.array(BlockStates, dtype=np.int64)
+    if isinstance(BlockStates, array) and BlockStates.typecode == "q":
+        return BlockStates
+    return array("q", (int(i) for i in BlockStates))
+
+
+def unpack(longs: Union[Sequence[int], array, "np.ndarray"], bits: int, count: int):
+    """
+    Extract ``count`` packed palette indices of ``bits`` bits each.
+
+    Entries are packed from the least significant bit of the first long onwards and may span two
+    longs, as written by Litematica's ``LitematicaBitArray``.
+
+    Returns a uint16 / uint32 ndarray, or ``array.array("H" / "I")`` without numpy.
+    """
+    unpacker = Unpacker(bits, min(count, len(longs) * 64 // bits))
+    unpacker.feed(longs)
+    return unpacker.result()
+
+
+class Unpacker:
+    """
+    Incremental :func:`unpack`: ``feed`` the longs in chunks as they are read and take the index
+    array from ``result``. Only the partly used last long is kept between chunks.
+    """
+
+    def __init__(self, bits: int, count: int) -> None:
+        self.bits = bits
+        self.count = count
+        self.done = 0
+        typecode = "H" if bits <= 16 else "I"
+        if np is not None:
+            self.out = np.empty(count, dtype=np.uint16 if typecode == "H" else np.uint32)
+            # 還沒用完的 long 與它在整個陣列中的位置
+            self.pending = np.empty(0, dtype=np.uint64)
+            self.base = 0
+        else:
+            self.out = array(typecode)
+            self.acc = 0
+            self.accbits = 0
+
+    def feed(self, longs: Union[Sequence[int], array, "np.ndarray"]) -> None:
+        if np is not None:
+            words = to_longs(longs).view(np.uint64)
+            if len(self.pending):
+                words = np.concatenate((self.pending, words))
+            stop = min(self.count, (self.base + len(words)) * 64 // self.bits)
+            if stop > self.done:
+                _unpack_numpy(words, self.bits, self.done, stop, self.base, self.out)
+                self.done = stop
+            first = min(self.done * self.bits // 64 - self.base, len(words))
+            self.pending = words[first:].copy()
+            self.base += first
+            return
+        out = self.out
+        bits = self.bits
+        mask = (1 << bits) - 1
+        acc = self.acc
+        accbits = self.accbits
+        for word in longs:
+            acc |= (int(word) & MASK64) << accbits
+            accbits += 64
+            while accbits >= bits and len(out) < self.count:
+                out.append(acc & mask)
+                acc >>= bits
+                accbits -= bits
+        self.acc = acc
+        self.accbits = accbits
+        self.done = len(out)
+
+    def result(self):
+        return self.out[: self.done]
+
+
+def _unpack_numpy(words: "np.ndarray", bits: int, start: int, stop: int, base: int, out: "np.ndarray") -> None:
+    """entries ``start`` to ``stop`` into ``out``, ``words[0]`` is long number ``base`` of the array"""
+    mask = np.uint64((1 << bits) - 1)
+    last = len(words) - 1
+    for begin in range(start, stop, CHUNK_ENTRIES):
+        end = min(begin + CHUNK_ENTRIES, stop)
+        bitpos = np.arange(begin, end, dtype=np.uint64) * np.uint64(bits)
+        word = (bitpos >> np.uint64(6)).astype(np.intp) - base
+        offset = bitpos & np.uint64(63)
+        value = words[word] >> offset
+        # entries crossing into the next long take their high bits from it
+        spans = (offset + np.uint64(bits)) > np.uint64(64)
+        if spans.any():
+            nextword = words[np.minimum(word + 1, last)]
+            high = nextword << ((np.uint64(64) - offset) & np.uint64(63))
+            value |= np.where(spans, high, np.uint64(0))
+        out[begin:end] = value & mask
+
+
+def pack(indices: Union[Sequence[int], array, "np.ndarray"], bits: int) -> Union[array, "np.ndarray"]:
+    """Inverse of :func:`unpack`, the longs as an int64 ndarray or ``array.array("q")``"""
+    count = len(indices)
+    length = (count * bits + 63) // 64
+    if np is not None:
+        words = np.zeros(length + 1, dtype=np.uint64)
+        values = np.asarray(indices, dtype=np.uint64)
+        for begin in range(0, count, CHUNK_ENTRIES):
+            end = min(begin + CHUNK_ENTRIES, count)
+            bitpos = np.arange(begin, end, dtype=np.uint64) * np.uint64(bits)
+            word = (bitpos >> np.uint64(6)).astype(np.intp)
+            offset = bitpos & np.uint64(63)
+            value = values[begin:end]
+            np.bitwise_or.at(words, word, value << offset)
+            spans = (offset + np.uint64(bits)) > np.uint64(64)
+            np.bitwise_or.at(words, word[spans] + 1, value[spans] >> (np.uint64(64) - offset[spans]))
+        return words[:length].view(np.int64)
+    out = array("q")
+    acc = 0
+    accbits = 0
+    for value in indices:
+        acc |= int(value) << accbits
+        accbits += bits
+        if accbits >= 64:
+            word = acc & MASK64
+            out.append(word - (1 << 64) if word >> 63 else word)
+            acc >>= 64
+            accbits -= 64
+    if accbits:
+        out.append(acc - (1 << 64) if acc >> 63 else acc)
+    return out
+
+
+def decode(BlockStates, palette: List[Any], count: int) -> Tuple[Any, List[Any]]:
+    """Unpack a region's ``BlockStates`` into ``(index array, palette)``"""
+    return unpack(BlockStates, bits_per_entry(len(palette)), count), palette
+
+
 class bitstack:
-    def __init__(self, bytelong:int, Resolve_data: List[Any]) -> None:
-        self.bites = ""
-        long = 1
-        while bytelong > 2**long:
-            long += 1
-        self.bytelong = long
+    """
+    Legacy accumulator kept for callers of the old API, :func:`unpack` does the work now.
+    """
+
+    def __init__(self, bytelong: int, Resolve_data: List[Any]) -> None:
+        self.longs: List[int] = []
+        self.bytelong = bits_per_entry(bytelong)
         self.Resolve_data = Resolve_data
 
     def add(self, bite: int) -> None:
-        bite = int(bite)
-        bite = bin(bite & 0xFFFFFFFFFFFFFFFF)[2:].zfill(64)
-        bite = [j for j in [bite[i : i + 8] for i in range(0, len(bite), 8)][::-1]]
-        bite = "".join(bite)
-        self.bites += bite[::-1]
-
-    def get(self, length: int) -> str:
-        bite = self.bites[:length]
-        self.bites = self.bites[length:]
-        return bite
-
-    def calc(self) -> List[Any]:
-        stepbytes = self.bites
-        stepbytes = [
-            stepbytes[i : i + self.bytelong][::-1] for i in range(0, len(self.bites), self.bytelong)
-        ]  # self.bytelong位一組
-        stepbytes = stepbytes[::-1]
-        stepbytes = [int(i, 2) for i in stepbytes]  # 二進位轉十進位
-        decode_BlockStates = []
-        for z in stepbytes:
-            decode_BlockStates.append(self.Resolve_data[z])
-        return decode_BlockStates
+        self.longs.append(int(bite))
+
+    def extend(self, bites: Iterable[int]) -> None:
+        self.longs.extend(int(i) for i in bites)
+
+    def calc(self, count: int = -1) -> List[Any]:
+        """palette entries in reversed block order, as the old string decoder returned them"""
+        if count < 0:
+            count = len(self.longs) * 64 // self.bytelong
+        indices = unpack(self.longs, self.bytelong, count)
+        palette = self.Resolve_data
+        return [palette[i] for i in reversed(indices.tolist())]
@@ -0,0 +1,142 @@
+import json
+from array import array
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .bitstack import np
+
+AIR = frozenset(("minecraft:air", "minecraft:cave_air", "minecraft:void_air"))
+
+
+class BlockVolume:
+    """
+    Palette indices of one region.
+
+    ``indices`` is a flat typed array (uint16 / uint32 ndarray, or ``array.array`` without numpy)
+    in Litematica order: x changes fastest, then z, then y. ``blocks`` exposes it as a 3D
+    (x, y, z) numpy view without copying. ``position`` is the region ``Position``, ``origin`` its
+    lowest corner (Litematica regions may have a negative ``Size``).
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int, int],
+        palette: List[Dict[str, Any]],
+        indices: Any,
+        name: str = "",
+        position: Tuple[int, int, int] = (0, 0, 0),
+    ) -> None:
+        self.size = tuple(abs(int(i)) for i in size)
+        self.palette = palette
+        self.indices = indices
+        self.name = name
+        self.position = tuple(int(i) for i in position)
+        self.origin = tuple(p + s + 1 if s < 0 else p for p, s in zip(self.position, map(int, size)))
+        self.air = frozenset(i for i, state in enumerate(palette) if state["Name"] in AIR)
+        volume = self.size[0] * self.size[1] * self.size[2]
+        if len(indices) < volume:
+            raise ValueError(f"BlockVolume needs {volume} indices, got {len(indices)}")
+
+    def __len__(self) -> int:
+        return self.size[0] * self.size[1] * self.size[2]
+
+    def __repr__(self) -> str:
+        return f"<BlockVolume {self.name!r} size={self.size} palette={len(self.palette)}>"
+
+    @property
+    def blocks(self) -> Optional["np.ndarray"]:
+        """(x, y, z) view of ``indices``, None without numpy"""
+        if np is None:
+            return None
+        x, y, z = self.size
+        return np.asarray(self.indices)[: x * y * z].reshape(y, z, x).transpose(2, 0, 1)
+
+    def offset(self, x: int, y: int, z: int) -> int:
+        return (y * self.size[2] + z) * self.size[0] + x
+
+    def index(self, x: int, y: int, z: int) -> int:
+        """palette index at (x, y, z)"""
+        return int(self.indices[(y * self.size[2] + z) * self.size[0] + x])
+
+    def get(self, x: int, y: int, z: int) -> Dict[str, Any]:
+        """palette entry at (x, y, z)"""
+        return self.palette[self.indices[(y * self.size[2] + z) * self.size[0] + x]]
+
+    def contains(self, x: int, y: int, z: int) -> bool:
+        return 0 <= x < self.size[0] and 0 <= y < self.size[1] and 0 <= z < self.size[2]
+
+    def iter_non_air(
+        self, bounds: Optional[Tuple[Tuple[int, int, int], Tuple[int, int, int]]] = None
+    ) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        Yield ``(x, y, z, palette index)`` of every non-air block in y, z, x order, only inside
+        ``bounds = ((x0, y0, z0), (x1, y1, z1))`` (end exclusive) when given.
+        """
+        sx, sy, sz = self.size
+        (x0, y0, z0), (x1, y1, z1) = bounds if bounds is not None else ((0, 0, 0), self.size)
+        layer = sx * sz
+        air = self.air
+        if np is not None:
+            flat = np.asarray(self.indices)
+            airlist = np.fromiter(air, dtype=flat.dtype, count=len(air))
+            width = x1 - x0
+            for y in range(y0, y1):
+                values = flat[y * layer : (y + 1) * layer].reshape(sz, sx)[z0:z1, x0:x1].ravel()
+                solid = np.flatnonzero(~np.isin(values, airlist))
+                for n, index in zip(solid.tolist(), values[solid].tolist()):
+                    z, x = divmod(n, width)
+                    yield x0 + x, y, z0 + z, index
+            return
+        indices = self.indices
+        for y in range(y0, y1):
+            for z in range(z0, z1):
+                count = (y * sz + z) * sx
+                for x in range(x0, x1):
+                    index = indices[count + x]
+                    if index not in air:
+                        yield x, y, z, index
+
+    @classmethod
+    def from_states(
+        cls,
+        states: Iterable[Dict[str, Any]],
+        size: Tuple[int, int, int],
+        name: str = "",
+        position: Tuple[int, int, int] = (0, 0, 0),
+    ) -> "BlockVolume":
+        """
+        Build a volume from one palette dict per block in natural order, e.g.
+        ``reversed(region["decode_BlockStates"])`` of a decoded json file.
+        """
+        palette: List[Dict[str, Any]] = []
+        lookup: Dict[Any, int] = {}
+        # decode_BlockStates 的每個方塊共用 palette 的 dict, 先用 id 找; 只記錄 palette 裡的
+        # dict, 它們一直存活, id 不會被重複使用
+        identity: Dict[int, int] = {}
+        indices = array("I")
+        volume = abs(size[0] * size[1] * size[2])
+        for state in islice(states, volume):
+            index = identity.get(id(state))
+            if index is None:
+                key = state_key(state)
+                index = lookup.get(key)
+                if index is None:
+                    index = lookup[key] = len(palette)
+                    identity[id(state)] = index
+                    palette.append(state)
+            indices.append(index)
+        if len(palette) <= 0x10000:
+            indices = array("H", indices)
+        if np is not None:
+            indices = np.frombuffer(indices, dtype=np.uint16 if indices.typecode == "H" else np.uint32)
+        return cls(size, palette, indices, name, position)
+
+
+def state_key(state: Dict[str, Any]) -> Any:
+    """hashable key of a palette entry, equal entries give equal keys"""
+    try:
+        key = state["Name"], tuple(sorted(state.get("Properties", {}).items()))
+        hash(key)
+        return key
+    except (KeyError, TypeError, AttributeError):
+        return json.dumps(state, sort_keys=True)
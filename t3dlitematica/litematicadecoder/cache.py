@@ -0,0 +1,116 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from typing import Any, Dict, Optional, Union
+
+from . import container
+
+# 解碼結果改變時要加一, 舊的快取就不會再被使用
+DECODER_VERSION = 2
+
+SUFFIX = ".3dlm"
+READ_BLOCK = 1 << 20
+
+
+class DecodeCache:
+    """
+    Opt-in on-disk cache of decoded schematics, see ``Resolve(..., cache=...)``.
+
+    Entries are :mod:`container` files named by the sha256 of the ``.litematic`` bytes and
+    ``DECODER_VERSION``, so a hit is a memory map instead of gunzip + NBT + bit unpacking. The
+    folder is kept under ``max_bytes`` by evicting the least recently used entries (by mtime,
+    refreshed on every hit).
+    """
+
+    def __init__(self, folder: Union[str, "os.PathLike[str]"], max_bytes: int = 1 << 30) -> None:
+        self.folder = str(folder)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f"<DecodeCache {self.folder!r} max_bytes={self.max_bytes}>"
+
+    @classmethod
+    def of(cls, cache: Union[str, "os.PathLike[str]", "DecodeCache"]) -> "DecodeCache":
+        if isinstance(cache, DecodeCache):
+            return cache
+        return cls(cache)
+
+    @staticmethod
+    def key(fPath: Union[str, "os.PathLike[str]"]) -> str:
+        """sha256 of ``DECODER_VERSION`` and the file bytes, read in blocks"""
+        digest = hashlib.sha256(str(DECODER_VERSION).encode() + b"\0")
+        with open(fPath, "rb") as f:
+            for block in iter(lambda: f.read(READ_BLOCK), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, key + SUFFIX)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """cached ``Resolve_data`` or None, a broken entry counts as a miss and is removed"""
+        path = self.path(key)
+        try:
+            data = container.load(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, KeyError, IndexError, TypeError):
+            # 寫一半或損壞的檔案
+            self.remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, Resolve_data: Dict[str, Any]) -> None:
+        # 先寫到暫存檔再改名, 其他 process 不會讀到寫一半的檔案
+        fd, temp = tempfile.mkstemp(suffix=".tmp", dir=self.folder)
+        os.close(fd)
+        try:
+            container.dump(Resolve_data, temp)
+            os.replace(temp, self.path(key))
+        except BaseException:
+            self.remove(temp)
+            raise
+        self.evict(keep=self.path(key))
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """remove the oldest entries until the folder fits in ``max_bytes``"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.folder):
+                if name.endswith(SUFFIX):
+                    path = os.path.join(self.folder, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(i[1] for i in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                if self.remove(path):
+                    total -= size
+
+    def clear(self) -> None:
+        for name in os.listdir(self.folder):
+            if name.endswith(SUFFIX):
+                self.remove(os.path.join(self.folder, name))
+
+    @staticmethod
+    def remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            # 例如 Windows 上仍被 mmap 開著
+            return False
@@ -0,0 +1,141 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List
+
+from .bitstack import np
+from .blockvolume import BlockVolume
+
+# 檔案格式:
+#   magic (4 bytes) | version | 陣列表長度 | header 長度 (uint32 LE) | 陣列表 json | header json
+#   之後是 8 byte 對齊的 little-endian 陣列, 陣列表記錄每個陣列的 offset / typecode / count
+MAGIC = b"3DLM"
+VERSION = 1
+# decode --format container 的副檔名
+SUFFIX = ".3dlm"
+PREFIX = struct.Struct("<4sIII")
+
+# array typecode -> little-endian numpy dtype
+DTYPES = {"B": "<u1", "b": "<i1", "H": "<u2", "h": "<i2", "I": "<u4", "i": "<i4", "Q": "<u8", "q": "<i8"}
+# (unsigned, itemsize) -> typecode
+TYPECODES = {(typecode.isupper(), int(dtype[2])): typecode for typecode, dtype in DTYPES.items()}
+
+
+def typecode_of(values: Any) -> str:
+    if isinstance(values, array):
+        return TYPECODES[(values.typecode.isupper(), values.itemsize)]
+    return TYPECODES[(values.dtype.kind == "u", values.dtype.itemsize)]
+
+
+def little_endian(values: Any, typecode: str) -> bytes:
+    if np is not None and isinstance(values, np.ndarray):
+        return np.ascontiguousarray(values, dtype=DTYPES[typecode]).tobytes()
+    if values.typecode != typecode or sys.byteorder == "big":
+        values = array(typecode, values)
+        if sys.byteorder == "big":
+            values.byteswap()
+    return values.tobytes()
+
+
+def dump(Resolve_data: Dict[str, Any], path: str) -> None:
+    """
+    Write ``Resolve_data`` to ``path``: everything json-able goes to the header, every
+    :class:`BlockVolume` and typed array (``array.array`` / ndarray) is stored raw so
+    :func:`load` can map it without parsing.
+    """
+    arrays: List[Any] = []
+    entries: List[Dict[str, Any]] = []
+
+    def register(values: Any) -> int:
+        typecode = typecode_of(values)
+        entries.append({"typecode": typecode, "count": len(values)})
+        arrays.append((values, typecode))
+        return len(entries) - 1
+
+    def default(obj: Any) -> Any:
+        if isinstance(obj, BlockVolume):
+            count = obj.size[0] * obj.size[1] * obj.size[2]
+            return {
+                "__blockvolume__": {
+                    # 負的 size 讓 origin 在 position 之前
+                    "size": [s if o == p else -s for s, p, o in zip(obj.size, obj.position, obj.origin)],
+                    "palette": obj.palette,
+                    "indices": register(obj.indices[:count]),
+                    "name": obj.name,
+                    "position": obj.position,
+                }
+            }
+        if isinstance(obj, array) or (np is not None and isinstance(obj, np.ndarray)):
+            return {"__array__": register(obj)}
+        raise TypeError(f"{type(obj).__name__} can not be stored")
+
+    header = json.dumps(Resolve_data, default=default, separators=(",", ":")).encode("utf8")
+    offset = 0
+    for entry, (values, typecode) in zip(entries, arrays):
+        entry["offset"] = offset
+        offset += -(-len(values) * int(DTYPES[typecode][2]) // 8) * 8
+    table = json.dumps(entries, separators=(",", ":")).encode("utf8")
+    header += b" " * (-(PREFIX.size + len(table) + len(header)) % 8)
+    with open(path, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, len(table), len(header)))
+        f.write(table)
+        f.write(header)
+        for values, typecode in arrays:
+            data = little_endian(values, typecode)
+            f.write(data)
+            f.write(b"\x00" * (-len(data) % 8))
+
+
+def is_container(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load(path: str) -> Dict[str, Any]:
+    """
+    Read a file written by :func:`dump`. Arrays are read-only views of a memory map of the file
+    (copies on big-endian hosts), BlockVolumes are rebuilt around them.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mm) < PREFIX.size:
+        raise ValueError(f"{path} is truncated")
+    magic, version, tablelength, length = PREFIX.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a 3dlitematica container")
+    if version != VERSION:
+        raise ValueError(f"{path} has container version {version}, expected {VERSION}")
+    if PREFIX.size + tablelength + length > len(mm):
+        raise ValueError(f"{path} is truncated")
+    table = json.loads(bytes(mm[PREFIX.size : PREFIX.size + tablelength]).decode("utf8"))
+    start = PREFIX.size + tablelength
+    end = start + length
+    for i in table:
+        if end + i["offset"] + int(DTYPES[i["typecode"]][2]) * i["count"] > len(mm):
+            raise ValueError(f"{path} is truncated")
+    arrays = [view(mm, end + i["offset"], i["typecode"], i["count"]) for i in table]
+
+    def object_hook(obj: Dict[str, Any]) -> Any:
+        if "__array__" in obj:
+            return arrays[obj["__array__"]]
+        if "__blockvolume__" in obj:
+            volume = obj["__blockvolume__"]
+            return BlockVolume(
+                volume["size"], volume["palette"], arrays[volume["indices"]], volume["name"], volume["position"]
+            )
+        return obj
+
+    return json.loads(bytes(mm[start:end]).decode("utf8"), object_hook=object_hook)
+
+
+def view(mm: mmap.mmap, offset: int, typecode: str, count: int) -> Any:
+    size = int(DTYPES[typecode][2]) * count
+    if np is not None:
+        return np.frombuffer(mm, dtype=DTYPES[typecode], count=count, offset=offset)
+    if sys.byteorder == "big":
+        values = array(typecode, mm[offset : offset + size])
+        values.byteswap()
+        return values
+    return memoryview(mm)[offset : offset + size].cast(typecode)
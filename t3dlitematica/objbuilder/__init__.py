@@ -1 +1,3 @@
 from .toobj import LitimaticaToObj
+from .texturepack import TexturePackIndex
+from .meshcache import MeshCache
@@ -0,0 +1,236 @@
+import os
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import png
+from .meshbuffer import Box, MeshBuffer
+from .texturepack import TexturePackIndex
+
+# 材質名稱 atlas_0, atlas_1 ...
+PAGE_PREFIX = "atlas/atlas_"
+# 分批交給 writer 的面數
+BATCH_FACES = 1 << 16
+# UV 超出 0-1 (greedy 的重複材質) 的面不能放進 atlas
+UV_EPSILON = 1e-6
+
+
+def next_pow2(n: int) -> int:
+    return 1 << max(0, n - 1).bit_length()
+
+
+class Atlas:
+    """
+    Block textures packed into one or a few RGBA pages of at most ``max_size`` pixels a side.
+
+    Textures are placed on shelves, tallest first, with ``padding`` pixels of repeated edge
+    around each one so filtering does not pick up the neighbours. ``rects`` maps a texture to
+    ``(page, x, y, width, height)``; textures that cannot be read or do not fit are left out.
+    """
+
+    def __init__(self, max_size: int = 4096, padding: int = 1) -> None:
+        self.max_size = max_size
+        self.padding = padding
+        self.pages: List[Tuple[int, int, bytearray]] = []
+        self.rects: Dict[str, Tuple[int, int, int, int, int]] = {}
+
+    def __repr__(self) -> str:
+        return f"<Atlas pages={len(self.pages)} textures={len(self.rects)}>"
+
+    def __contains__(self, texture: Optional[str]) -> bool:
+        return texture in self.rects
+
+    @classmethod
+    def build(cls, images: Dict[str, str], max_size: int = 4096, padding: int = 1) -> "Atlas":
+        """``images``: texture -> png path"""
+        atlas = cls(max_size, padding)
+        loaded = []
+        for texture in sorted(images):
+            try:
+                with open(images[texture], "rb") as f:
+                    width, height, rgba = png.read(f.read())
+            except (OSError, ValueError, zlib.error):
+                continue
+            if width + 2 * padding > max_size or height + 2 * padding > max_size:
+                continue
+            loaded.append((texture, width, height, rgba))
+        if not loaded:
+            return atlas
+
+        loaded.sort(key=lambda i: (-i[2], -i[1], i[0]))
+        area = sum((i[1] + 2 * padding) * (i[2] + 2 * padding) for i in loaded)
+        widest = max(i[1] for i in loaded) + 2 * padding
+        pagewidth = min(max_size, max(next_pow2(int(area**0.5)), next_pow2(widest)))
+
+        # shelf packing, 超過高度就開新的一頁
+        placed: List[List[Tuple[str, int, int, int, int, bytearray]]] = [[]]
+        x = y = shelf = 0
+        for texture, width, height, rgba in loaded:
+            w = width + 2 * padding
+            h = height + 2 * padding
+            if x + w > pagewidth:
+                x, y, shelf = 0, y + shelf, 0
+            if y + h > max_size:
+                placed.append([])
+                x = y = shelf = 0
+            placed[-1].append((texture, x, y, width, height, rgba))
+            x += w
+            shelf = max(shelf, h)
+
+        for items in placed:
+            # 2 的次方, 但不能超過 max_size (max_size 本身不一定是 2 的次方)
+            pageheight = min(max_size, next_pow2(max(i[2] + i[4] + 2 * padding for i in items)))
+            page = bytearray(pagewidth * pageheight * 4)
+            for texture, x, y, width, height, rgba in items:
+                atlas.blit(page, pagewidth, x, y, width, height, rgba)
+                atlas.rects[texture] = (len(atlas.pages), x + padding, y + padding, width, height)
+            atlas.pages.append((pagewidth, pageheight, page))
+        return atlas
+
+    def blit(self, page: bytearray, pagewidth: int, x: int, y: int, width: int, height: int, rgba: bytes) -> None:
+        padding = self.padding
+        stride = width * 4
+        for row in range(-padding, height + padding):
+            source = min(max(row, 0), height - 1) * stride
+            line = rgba[source : source + stride]
+            line = line[:4] * padding + line + line[-4:] * padding
+            start = ((y + padding + row) * pagewidth + x) * 4
+            page[start : start + len(line)] = line
+
+    @staticmethod
+    def page_texture(page: int) -> str:
+        return PAGE_PREFIX + str(page)
+
+    def remap(self, texture: Optional[str], uvs: List[List[float]]) -> Optional[Tuple[str, List[List[float]]]]:
+        """``(page texture, uvs in page space)``, None if the face has to keep its own texture"""
+        rect = self.rects.get(texture)
+        if rect is None:
+            return None
+        for u, v in uvs:
+            if not (-UV_EPSILON <= u <= 1 + UV_EPSILON and -UV_EPSILON <= v <= 1 + UV_EPSILON):
+                return None
+        page, x, y, width, height = rect
+        pagewidth, pageheight, _ = self.pages[page]
+        # vt 的 v 由下往上, 圖片的 y 由上往下
+        return self.page_texture(page), [
+            [(x + u * width) / pagewidth, 1 - (y + (1 - v) * height) / pageheight] for u, v in uvs
+        ]
+
+    def save(self, folder: str) -> Dict[str, str]:
+        """write the pages as png, returns page texture -> path"""
+        os.makedirs(folder, exist_ok=True)
+        paths = {}
+        for i, (width, height, page) in enumerate(self.pages):
+            texture = self.page_texture(i)
+            paths[texture] = os.path.join(folder, texture.split("/")[-1] + ".png")
+            with open(paths[texture], "wb") as f:
+                f.write(png.write(width, height, page))
+        return paths
+
+
+class AtlasSink:
+    """
+    Sink in front of an ``ObjWriter`` / ``GlbWriter`` that collects the whole mesh, packs the
+    textures it uses into an :class:`Atlas` on :meth:`close` and hands the faces to ``writer``
+    grouped by material, with their uvs moved into atlas space. The page pngs are written to
+    ``folder`` and registered in ``images`` (texture -> png path) for the writer to pick up.
+    """
+
+    def __init__(
+        self,
+        writer: Any,
+        texturepack: TexturePackIndex,
+        folder: str,
+        images: Dict[str, str],
+        max_size: int = 4096,
+        padding: int = 1,
+    ) -> None:
+        self.writer = writer
+        self.texturepack = texturepack
+        self.folder = folder
+        self.images = images
+        self.max_size = max_size
+        self.padding = padding
+        self.buffer = MeshBuffer()
+        self.atlas: Optional[Atlas] = None
+        self.closed = False
+
+    def __enter__(self) -> "AtlasSink":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def textures(self) -> List[str]:
+        return self.writer.textures
+
+    @property
+    def bytes_written(self) -> int:
+        return self.writer.bytes_written
+
+    def add(self, objdata: Dict[str, Any]) -> None:
+        self.buffer.add(objdata)
+
+    def add_buffer(self, buffer: MeshBuffer, box: Optional[Box] = None) -> None:
+        # 頂點在 close 時交給 writer 才合併
+        self.buffer.extend(buffer)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        buffer = self.buffer
+        self.atlas = Atlas.build(
+            {texture: self.texturepack.texture_path(texture) for texture in buffer.textures if texture},
+            self.max_size,
+            self.padding,
+        )
+        self.images.update(self.atlas.save(self.folder))
+
+        starts = array("I", [0]) * len(buffer.sizes)
+        start = 0
+        for i, size in enumerate(buffer.sizes):
+            starts[i] = start
+            start += size
+        # 每個面換成 atlas 後的材質與 uv
+        groups: Dict[Optional[str], List[int]] = {}
+        remapped: Dict[int, List[List[float]]] = {}
+        vt = buffer.vt
+        for i, size in enumerate(buffer.sizes):
+            texture = buffer.textures[buffer.material[i]]
+            start = starts[i]
+            uvs = [[vt[2 * j], vt[2 * j + 1]] for j in buffer.ft[start : start + size]]
+            moved = self.atlas.remap(texture, uvs)
+            if moved is not None:
+                texture, remapped[i] = moved
+            groups.setdefault(texture, []).append(i)
+
+        v = buffer.v
+        for texture in sorted(groups, key=lambda i: (i is None, i or "")):
+            faces = groups[texture]
+            for batch in range(0, len(faces), BATCH_FACES):
+                vindex: Dict[int, int] = {}
+                objdata: Dict[str, Any] = {
+                    "blockname": "atlas", "v": [], "vt": [], "f": [], "textures": [], "blocknames": []
+                }
+                for i in faces[batch : batch + BATCH_FACES]:
+                    start = starts[i]
+                    corners = buffer.f[start : start + buffer.sizes[i]]
+                    face = []
+                    for j in corners:
+                        index = vindex.get(j)
+                        if index is None:
+                            index = vindex[j] = len(objdata["v"]) + 1
+                            objdata["v"].append((v[3 * j], v[3 * j + 1], v[3 * j + 2]))
+                        face.append(index)
+                    objdata["f"].append(face)
+                    uvs = remapped.get(i)
+                    if uvs is None:
+                        uvs = [[vt[2 * j], vt[2 * j + 1]] for j in buffer.ft[start : start + buffer.sizes[i]]]
+                    objdata["vt"].append(uvs)
+                    objdata["textures"].append(texture)
+                    objdata["blocknames"].append(buffer.blocknames[buffer.block[i]])
+                self.writer.add(objdata)
+        self.buffer = MeshBuffer()
+        self.writer.close()
@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+# model 面的方向 (x 東, y 上, z 南)
+DIRECTIONS: Dict[str, Tuple[int, int, int]] = {
+    "down": (0, -1, 0),
+    "up": (0, 1, 0),
+    "north": (0, 0, -1),
+    "south": (0, 0, 1),
+    "west": (-1, 0, 0),
+    "east": (1, 0, 0),
+}
+DIRECTION_NAMES: Dict[Tuple[int, int, int], str] = {v: k for k, v in DIRECTIONS.items()}
+DIRECTION_BITS: Dict[str, int] = {name: 1 << i for i, name in enumerate(DIRECTIONS)}
+
+COLORS = (
+    "white", "orange", "magenta", "light_blue", "yellow", "lime", "pink", "gray",
+    "light_gray", "cyan", "purple", "blue", "brown", "green", "red", "black",
+)
+LEAVES = (
+    "oak", "spruce", "birch", "jungle", "acacia", "dark_oak", "mangrove", "cherry", "pale_oak",
+    "azalea", "flowering_azalea",
+)
+OXIDATION = ("", "exposed_", "weathered_", "oxidized_")
+
+# full cubes that still let you see the block behind them
+TRANSPARENT = frozenset(
+    (
+        "glass",
+        "tinted_glass",
+        "ice",
+        "frosted_ice",
+        "slime_block",
+        "honey_block",
+        "spawner",
+        "trial_spawner",
+        "vault",
+        "beacon",
+        "mangrove_roots",
+        "barrier",
+        "structure_void",
+        "powder_snow",
+    )
+    + tuple(color + "_stained_glass" for color in COLORS)
+    + tuple(wood + "_leaves" for wood in LEAVES)
+    + tuple(wax + state + "copper_grate" for wax in ("", "waxed_") for state in OXIDATION)
+)
+
+
+def is_transparent(blockname: str) -> bool:
+    return blockname.replace("minecraft:", "") in TRANSPARENT
+
+
+def is_full_element(element: Dict[str, Any]) -> bool:
+    """a model element filling the whole block (0..16 on every axis) with all six faces, unrotated"""
+    if list(element["from"]) != [0, 0, 0] or list(element["to"]) != [16, 16, 16]:
+        return False
+    if element.get("rotation", {}).get("angle", 0) != 0:
+        return False
+    return set(element.get("faces", ())) >= set(DIRECTIONS)
+
+
+def occlusion_mask(volume, occluders: Sequence[bool], x: int, y: int, z: int, faces: List[str]) -> int:
+    """
+    DIRECTION_BITS of the ``faces`` whose neighbouring voxel in ``volume`` is an opaque full cube.
+    ``occluders[palette index]`` tells whether a palette entry is one. Voxels outside the volume
+    never occlude.
+    """
+    sx, sy, sz = volume.size
+    indices = volume.indices
+    mask = 0
+    for face in faces:
+        dx, dy, dz = DIRECTIONS[face]
+        nx, ny, nz = x + dx, y + dy, z + dz
+        if 0 <= nx < sx and 0 <= ny < sy and 0 <= nz < sz:
+            if occluders[indices[(ny * sz + nz) * sx + nx]]:
+                mask |= DIRECTION_BITS[face]
+    return mask
@@ -0,0 +1,261 @@
+import json
+import os
+import posixpath
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .grid import quantize
+from .meshbuffer import Box, MeshBuffer
+from .output import DirectoryOutput
+from .texturepack import TexturePackIndex
+from .writer import material_name
+
+MISSING_TEXTURE = os.path.join(
+    Path(__file__).parent.parent.parent, "resource", "Minecraft_missing_texture_block.svg.png"
+)
+
+# glTF 常數
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+FLOAT = 5126
+UNSIGNED_INT = 5125
+NEAREST = 9728
+REPEAT = 10497
+
+GLB_MAGIC = 0x46546C67
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+
+def little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def pad4(data: bytes, fill: bytes = b"\x00") -> bytes:
+    return data + fill * (-len(data) % 4)
+
+
+class Primitive:
+    """vertices of one material, OBJ v/vt pairs become one glTF vertex"""
+
+    __slots__ = ("positions", "uvs", "indices", "lookup")
+
+    def __init__(self) -> None:
+        self.positions = array("f")
+        self.uvs = array("f")
+        self.indices = array("I")
+        self.lookup: Dict[Tuple[int, ...], int] = {}
+
+    def vertex(self, v, vt) -> int:
+        key = quantize(v) + quantize(vt)
+        index = self.lookup.get(key)
+        if index is None:
+            index = self.lookup[key] = len(self.positions) // 3
+            self.positions.extend(v[:3])
+            # glTF 的 uv 原點在左上
+            self.uvs.extend((vt[0], 1 - vt[1]))
+        return index
+
+
+class GlbWriter:
+    """
+    Binary glTF 2.0 (``.glb``) writer taking the same blocks as ``ObjWriter.add``.
+
+    Geometry is kept in packed float32 / uint32 arrays, one primitive per material, and written
+    on :meth:`close`. Textures are embedded in the binary chunk, or copied to ``textures/`` next
+    to the file and referenced by uri when ``embed_textures`` is False. With ``output`` (a
+    ``ZipOutput`` / ``DirectoryOutput``) ``path`` is the entry name inside it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        texturepack: TexturePackIndex,
+        embed_textures: bool = True,
+        progress: Optional[Callable[[int], None]] = None,
+        images: Optional[Dict[str, str]] = None,
+        output: Optional[Any] = None,
+    ) -> None:
+        self.path = path
+        self.output = output
+        self.name = name
+        self.texturepack = texturepack
+        self.embed_textures = embed_textures
+        self.progress = progress
+        # 不在材質包裡的圖片 (例如 atlas), texture -> png 路徑
+        self.images = images if images is not None else {}
+        self.primitives: Dict[Optional[str], Primitive] = {}
+        self.textures: List[str] = []
+        self.bytes_written = 0
+        self.closed = False
+
+    def __enter__(self) -> "GlbWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def add(self, objdata: Dict[str, Any]) -> None:
+        textures = objdata.get("textures", [])
+        v = objdata["v"]
+        for ct1, f in enumerate(objdata["f"]):
+            texture = textures[ct1] if ct1 < len(textures) else None
+            primitive = self.primitives.get(texture)
+            if primitive is None:
+                primitive = self.primitives[texture] = Primitive()
+                if texture:
+                    self.textures.append(texture)
+            corners = [primitive.vertex(v[i - 1], objdata["vt"][ct1][ct]) for ct, i in enumerate(f)]
+            for k in range(1, len(corners) - 1):
+                primitive.indices.extend((corners[0], corners[k], corners[k + 1]))
+
+    def add_buffer(self, buffer: MeshBuffer, box: Optional[Box] = None) -> None:
+        """a whole :class:`MeshBuffer`, its vertices are merged per material like in :meth:`add`"""
+        v = buffer.v
+        vt = buffer.vt
+        f = buffer.f
+        ft = buffer.ft
+        start = 0
+        for face, size in enumerate(buffer.sizes):
+            texture = buffer.textures[buffer.material[face]]
+            primitive = self.primitives.get(texture)
+            if primitive is None:
+                primitive = self.primitives[texture] = Primitive()
+                if texture:
+                    self.textures.append(texture)
+            corners = [
+                primitive.vertex((v[3 * f[k]], v[3 * f[k] + 1], v[3 * f[k] + 2]), (vt[2 * ft[k]], vt[2 * ft[k] + 1]))
+                for k in range(start, start + size)
+            ]
+            for k in range(1, len(corners) - 1):
+                primitive.indices.extend((corners[0], corners[k], corners[k + 1]))
+            start += size
+
+    def image_path(self, texture: Optional[str]) -> str:
+        if texture in self.images:
+            return self.images[texture]
+        return self.texturepack.texture_path(texture) if texture else MISSING_TEXTURE
+
+    def image_uri(self, texture: Optional[str]) -> str:
+        return "textures/" + os.path.basename(self.image_path(texture))
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        gltf: Dict[str, Any] = {
+            "asset": {"version": "2.0", "generator": "3dlitematica"},
+            "scene": 0,
+            "scenes": [{"name": self.name, "nodes": [0]}],
+            "nodes": [{"name": self.name, "mesh": 0}],
+            "meshes": [{"name": self.name, "primitives": []}],
+            "samplers": [{"magFilter": NEAREST, "minFilter": NEAREST, "wrapS": REPEAT, "wrapT": REPEAT}],
+            "materials": [],
+            "textures": [],
+            "images": [],
+            "accessors": [],
+            "bufferViews": [],
+            "buffers": [],
+        }
+        binary: List[bytes] = []
+        offset = 0
+        external: Dict[str, str] = {}
+
+        def add_view(data: bytes, target: Optional[int] = None) -> int:
+            nonlocal offset
+            view = {"buffer": 0, "byteOffset": offset, "byteLength": len(data)}
+            if target is not None:
+                view["target"] = target
+            gltf["bufferViews"].append(view)
+            data = pad4(data)
+            binary.append(data)
+            offset += len(data)
+            return len(gltf["bufferViews"]) - 1
+
+        def add_accessor(view: int, componentType: int, count: int, kind: str, **extra) -> int:
+            gltf["accessors"].append(
+                {"bufferView": view, "componentType": componentType, "count": count, "type": kind, **extra}
+            )
+            return len(gltf["accessors"]) - 1
+
+        for texture, primitive in self.primitives.items():
+            if not primitive.indices:
+                continue
+            positions = primitive.positions
+            count = len(positions) // 3
+            low = [min(positions[i::3]) for i in range(3)]
+            high = [max(positions[i::3]) for i in range(3)]
+            position = add_accessor(
+                add_view(little_endian(positions), ARRAY_BUFFER), FLOAT, count, "VEC3", min=low, max=high
+            )
+            uv = add_accessor(add_view(little_endian(primitive.uvs), ARRAY_BUFFER), FLOAT, count, "VEC2")
+            indices = add_accessor(
+                add_view(little_endian(primitive.indices), ELEMENT_ARRAY_BUFFER),
+                UNSIGNED_INT,
+                len(primitive.indices),
+                "SCALAR",
+            )
+            if self.embed_textures:
+                with open(self.image_path(texture), "rb") as f:
+                    image = {"bufferView": add_view(f.read()), "mimeType": "image/png"}
+            else:
+                image = {"uri": self.image_uri(texture)}
+                external[image["uri"]] = self.image_path(texture)
+            gltf["images"].append(image)
+            gltf["textures"].append({"sampler": 0, "source": len(gltf["images"]) - 1})
+            gltf["materials"].append(
+                {
+                    "name": material_name(texture),
+                    "pbrMetallicRoughness": {
+                        "baseColorTexture": {"index": len(gltf["textures"]) - 1},
+                        "metallicFactor": 0,
+                        "roughnessFactor": 1,
+                    },
+                    "alphaMode": "MASK",
+                    "doubleSided": True,
+                }
+            )
+            gltf["meshes"][0]["primitives"].append(
+                {
+                    "attributes": {"POSITION": position, "TEXCOORD_0": uv},
+                    "indices": indices,
+                    "material": len(gltf["materials"]) - 1,
+                }
+            )
+        self.primitives.clear()
+        if offset:
+            # glTF 要求 byteLength >= 1, 空的模型不寫 buffer
+            gltf["buffers"].append({"byteLength": offset})
+        for key in ("materials", "textures", "images", "accessors", "bufferViews", "buffers"):
+            if not gltf[key]:
+                del gltf[key]
+        if not gltf["meshes"][0]["primitives"]:
+            del gltf["meshes"]
+            del gltf["nodes"][0]["mesh"]
+
+        jsonchunk = pad4(json.dumps(gltf, separators=(",", ":")).encode("utf8"), b" ")
+        total = 12 + 8 + len(jsonchunk) + (8 + offset if offset else 0)
+        if self.output is None:
+            output, name = DirectoryOutput(os.path.dirname(self.path) or "."), os.path.basename(self.path)
+        else:
+            output, name = self.output, self.path
+        with output.open(name) as f:
+            f.write(struct.pack("<III", GLB_MAGIC, 2, total))
+            f.write(struct.pack("<II", len(jsonchunk), CHUNK_JSON))
+            f.write(jsonchunk)
+            if offset:
+                f.write(struct.pack("<II", offset, CHUNK_BIN))
+                for data in binary:
+                    f.write(data)
+        for uri, source in external.items():
+            output.copy(source, posixpath.join(posixpath.dirname(name), uri))
+        self.bytes_written = total
+        if self.progress is not None:
+            self.progress(total)
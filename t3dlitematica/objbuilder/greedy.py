@@ -0,0 +1,158 @@
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from .culling import DIRECTIONS
+from .meshcache import BlockMesh
+
+# 1 方塊 = 0.1
+BLOCK = 0.1
+
+# (法線軸, 平面上的兩個軸)
+FACE_AXES: Dict[str, Tuple[int, int, int]] = {
+    name: (normal, *[i for i in range(3) if i != normal])
+    for name, normal in ((name, [abs(i) for i in d].index(1)) for name, d in DIRECTIONS.items())
+}
+
+
+class FacePrototype:
+    """
+    One face of a full cube in block-local coordinates, with its UV as an affine function of the
+    two in-plane axes so a merged rectangle can continue the same (repeating) texture.
+    """
+
+    __slots__ = ("texture", "v", "vt", "axes", "da", "db", "blockname")
+
+    def __init__(self, texture: Optional[str], v, vt, axes, da, db, blockname: str = "greedy") -> None:
+        self.texture = texture
+        self.blockname = blockname
+        self.v = v
+        self.vt = vt
+        self.axes = axes
+        self.da = da
+        self.db = db
+
+    def quad(
+        self, origin: Tuple[float, float, float], width: int, height: int
+    ) -> Tuple[List[Tuple[float, float, float]], List[List[float]]]:
+        """vertices and uvs of a ``width`` x ``height`` blocks rectangle starting at ``origin``"""
+        _, a, b = self.axes
+        v = []
+        vt = []
+        for pos, uv in zip(self.v, self.vt):
+            grow_a = (width - 1) * BLOCK if pos[a] > BLOCK / 2 else 0
+            grow_b = (height - 1) * BLOCK if pos[b] > BLOCK / 2 else 0
+            point = [origin[0] + pos[0], origin[1] + pos[1], origin[2] + pos[2]]
+            point[a] += grow_a
+            point[b] += grow_b
+            v.append(tuple(point))
+            vt.append(
+                [
+                    uv[0] + (grow_a * self.da[0] + grow_b * self.db[0]) / BLOCK,
+                    uv[1] + (grow_a * self.da[1] + grow_b * self.db[1]) / BLOCK,
+                ]
+            )
+        return v, vt
+
+
+def face_prototype(mesh: BlockMesh, j: int) -> Optional[Tuple[Hashable, FacePrototype]]:
+    """(merge key, prototype) of face ``j``, None if its texture would not tile"""
+    axes = FACE_AXES[mesh.cull[j]]
+    _, a, b = axes
+    v = [mesh.v[k - 1] for k in mesh.f[j]]
+    vt = mesh.vt[j]
+    if len(v) != 4:
+        return None
+    da = db = None
+    for p in range(4):
+        for q in range(4):
+            step_a = round((v[q][a] - v[p][a]) / BLOCK)
+            step_b = round((v[q][b] - v[p][b]) / BLOCK)
+            if step_a == 1 and step_b == 0:
+                da = (vt[q][0] - vt[p][0], vt[q][1] - vt[p][1])
+            elif step_a == 0 and step_b == 1:
+                db = (vt[q][0] - vt[p][0], vt[q][1] - vt[p][1])
+    # 只接受 UV 剛好是一整張材質 (每方塊 1) 的面
+    for d in (da, db):
+        if d is None or sorted(abs(round(i, 6)) for i in d) != [0, 1]:
+            return None
+    texture = mesh.textures[j]
+    # uv at the face's local (a, b) = (0, 0), modulo the texture repeat
+    base = [0.0, 0.0]
+    for pos, uv in zip(v, vt):
+        if pos[a] < BLOCK / 2 and pos[b] < BLOCK / 2:
+            base = [round(uv[0], 6) % 1, round(uv[1], 6) % 1]
+    da = tuple(round(i) for i in da)
+    db = tuple(round(i) for i in db)
+    key = (texture, mesh.cull[j], da, db, tuple(base))
+    return key, FacePrototype(texture, v, [list(i) for i in vt], axes, da, db, mesh.blockname)
+
+
+def greedy_faces(mesh: BlockMesh) -> Optional[Dict[str, Tuple[Hashable, FacePrototype]]]:
+    """merge keys of every face of a full cube, None when the block is not eligible"""
+    if not mesh.is_full_cube():
+        return None
+    faces = {}
+    for j in range(len(mesh.f)):
+        prototype = face_prototype(mesh, j)
+        if prototype is None:
+            return None
+        faces[mesh.cull[j]] = prototype
+    return faces
+
+
+class GreedyMesher:
+    """
+    Collects visible full-cube faces per (direction, layer) and merges coplanar neighbours with
+    the same key into rectangles.
+    """
+
+    def __init__(self) -> None:
+        self.layers: Dict[Tuple[str, int], Dict[Tuple[int, int], Hashable]] = defaultdict(dict)
+        self.prototypes: Dict[Hashable, FacePrototype] = {}
+
+    def add(self, face: str, cell: Tuple[int, int, int], key: Hashable, prototype: FacePrototype) -> None:
+        normal, a, b = FACE_AXES[face]
+        self.layers[(face, cell[normal])][(cell[a], cell[b])] = key
+        self.prototypes.setdefault(key, prototype)
+
+    def quads(self) -> Iterator[Dict[str, Any]]:
+        """merged faces as ``Enity.objdata`` like dicts, one quad each"""
+        for (face, layer), cells in self.layers.items():
+            normal, a, b = FACE_AXES[face]
+            for (ca, cb), width, height, key in self.merge(cells):
+                prototype = self.prototypes[key]
+                cell = [0, 0, 0]
+                cell[normal], cell[a], cell[b] = layer, ca, cb
+                # Objhandel 的方塊座標從 1 開始
+                origin = tuple((i + 1) / 10 for i in cell)
+                v, vt = prototype.quad(origin, width, height)
+                yield {
+                    # 合併的面可能跨不同方塊, 名稱取第一個
+                    "blockname": prototype.blockname,
+                    "v": v,
+                    "vt": [vt],
+                    "f": [[1, 2, 3, 4]],
+                    "textures": [prototype.texture],
+                }
+
+    @staticmethod
+    def merge(cells: Dict[Tuple[int, int], Hashable]) -> Iterator[Tuple[Tuple[int, int], int, int, Hashable]]:
+        done = set()
+        for start in sorted(cells, key=lambda i: (i[1], i[0])):
+            if start in done:
+                continue
+            key = cells[start]
+            ca, cb = start
+            width = 1
+            while (ca + width, cb) not in done and cells.get((ca + width, cb)) == key:
+                width += 1
+            height = 1
+            while all(
+                (ca + i, cb + height) not in done and cells.get((ca + i, cb + height)) == key
+                for i in range(width)
+            ):
+                height += 1
+            for i in range(width):
+                for j in range(height):
+                    done.add((ca + i, cb + j))
+            yield start, width, height, key
@@ -0,0 +1,9 @@
+from typing import Sequence, Tuple
+
+# 座標量化的格點: 1 方塊 = 0.1, model 的 1/16 = 0.00625, 旋轉後的座標也遠大於 1e-6
+GRID = 1_000_000
+
+
+def quantize(values: Sequence[float]) -> Tuple[int, ...]:
+    """Snap a vertex / uv to the integer grid so it can be used as an exact dict key"""
+    return tuple(round(i * GRID) for i in values)
@@ -1,7 +1,8 @@
-import json
 import math
-import os
 from typing import Callable, List, Union
+from .texturepack import TexturePackIndex
+from .culling import DIRECTIONS, DIRECTION_NAMES, is_full_element
+from .grid import quantize
 # example:
 #         "cube": {
 #             "parent": "block",
@@ -52,7 +53,7 @@ from typing import Callable, List, Union
 
 
 class Enity:
-    def __init__(self, x:float, y:float, z:float, blockdata:dict,texturepath:str) -> None:
+    def __init__(self, x:float, y:float, z:float, blockdata:dict,texturepath:Union[str,TexturePackIndex]) -> None:
         self.blockdata = blockdata
         self.name = blockdata["Name"].replace("minecraft:", "")
         self.x = x
@@ -65,39 +66,37 @@ class Enity:
         self.rotatemode = []
         self.rotate = []
         self.element = None
-        self.objdata = {"blockname": self.name, "v": [], "vt": [], "f": [], "textures": []}
-        self.texturepath = os.path.join(texturepath, "output.json")
+        self.objdata = {"blockname": self.name, "v": [], "vt": [], "f": [], "textures": [], "cull": []}
+        self.texturepack = TexturePackIndex.of(texturepath)
         self.parse()
         self.merge()
+        # 有填滿整格的 element 才會擋住旁邊方塊的面 (grass_block 的 overlay 另外算)
+        self.objdata["full_cube"] = any(is_full_element(j) for i in self.enitys for j in i.element)
 
     def merge(self) -> None:
         # f要替換為全部v轉換的index
+        vindex = {}
         for i in self.enitys:
-            self.objdata["v"].extend(i.objdata["v"])
-
-        for i in self.enitys:
+            remap = []
+            for v in i.objdata["v"]:
+                key = quantize(v)
+                if key not in vindex:
+                    self.objdata["v"].append(v)
+                    vindex[key] = len(self.objdata["v"])
+                remap.append(vindex[key])
             for j in i.objdata["f"]:
-                temp = []
-                for x in range(len(j)):
-                    temp.append(self.objdata["v"].index(i.objdata["v"][j[x] - 1]) + 1)
-                self.objdata["f"].append(temp)
+                self.objdata["f"].append([remap[x - 1] for x in j])
             self.objdata["vt"].extend(i.objdata["vt"])
             self.objdata["textures"].extend(i.objdata["textures"])
+            self.objdata["cull"].extend(i.objdata["cull"])
 
     def parse(self) -> None:
-        with open(
-            self.texturepath,
-            "r",
-            encoding="utf8",
-        ) as f:
-            self.thisdata = json.load(f)[self.name]
+        self.thisdata = self.texturepack.blockstate(self.name)
         if "variants" in self.thisdata:
-            for i in self.thisdata["variants"]:
+            for i, values, variant in self.texturepack.variants(self.name):
                 if i != "":
                     flag = False
-                    values = i.split(",")
                     for value in values:
-                        value = value.split("=")
                         if value[0] in self.blockdata["Properties"]:
                             if value[1] == self.blockdata["Properties"][value[0]]:
                                 flag = True
@@ -105,15 +104,15 @@ class Enity:
                                 flag = False
                                 break
                     if flag:
-                        if "x" in self.thisdata["variants"][i]:
+                        if "x" in variant:
                             self.rotatemode.append("x")
-                            self.rotate.append(self.thisdata["variants"][i]["x"])
-                        if "y" in self.thisdata["variants"][i]:
+                            self.rotate.append(variant["x"])
+                        if "y" in variant:
                             self.rotatemode.append("y")
-                            self.rotate.append(self.thisdata["variants"][i]["y"])
-                        self.load_model(self.thisdata["variants"][i]["model"])
+                            self.rotate.append(variant["y"])
+                        self.load_model(variant["model"])
                 else:
-                    self.load_model(self.thisdata["variants"][i]["model"])
+                    self.load_model(variant["model"])
         elif "multipart" in self.thisdata:
             code = 0
             for i in self.thisdata["multipart"]:
@@ -165,20 +164,11 @@ class Enity:
                 code += 1
 
     def load_model(self, modelname:str, code=None,isparent=False) -> None:
-        with open(
-            self.texturepath,
-            "r",
-            encoding="utf8",
-        ) as f:
-            model = json.load(f)["models"][modelname]
-            if "parent" in model:
-                self.load_model(model["parent"].split("/")[-1], code,True)
-            # if isparent:
-            #     self.parents[modelname] = model
-            if "textures" in model:
-                self.textures.update(model["textures"])
-            if "elements" in model:
-                self.element = model["elements"]
+        # parent 鏈已在 TexturePackIndex 合併
+        textures, elements = self.texturepack.model(modelname)
+        self.textures.update(textures)
+        if elements is not None:
+            self.element = elements
 
         if not isparent:
             self.enitys.append(Build_enity(self, code,self.element))
@@ -198,7 +188,8 @@ class Build_enity:
         self.parents = {}
         self.textures = mother.textures
         self.element = elements
-        self.objdata = {"v": [], "vt": [], "f": [], "textures": []}
+        self.objdata = {"v": [], "vt": [], "f": [], "textures": [], "cull": []}
+        self.vindex = {}  # 量化座標 -> objdata["v"] index
         self.rotatemode = mother.rotatemode
         self.rotate = mother.rotate
         self.start()
@@ -216,12 +207,14 @@ class Build_enity:
                         self.objdata["v"][j] = self.rotate_y(
                             self.objdata["v"][j], self.rotate[i], self.center
                         )
+                    self.rotate_cull(self.rotate_y, self.rotate[i])
                 elif self.rotatemode[i]["mode"] == "x" and self.rotatemode[i] not in alrrote and self.rotatemode[i]["code"] == self.name:
                     alrrote.append(self.rotatemode[i])
                     for j in range(len(self.objdata["v"])):
                         self.objdata["v"][j] = self.rotate_x(
                             self.objdata["v"][j], self.rotate[i], self.center
                         )
+                    self.rotate_cull(self.rotate_x, self.rotate[i])
             else:
                 if self.rotatemode[i] == "y" and self.rotatemode[i] not in alrrote:
                     alrrote.append(self.rotatemode[i])
@@ -229,22 +222,32 @@ class Build_enity:
                         self.objdata["v"][j] = self.rotate_y(
                             self.objdata["v"][j], self.rotate[i], self.center
                         )
+                    self.rotate_cull(self.rotate_y, self.rotate[i])
                 elif self.rotatemode[i] == "x" and self.rotatemode[i] not in alrrote:
                     alrrote.append(self.rotatemode[i])
                     for j in range(len(self.objdata["v"])):
                         self.objdata["v"][j] = self.rotate_x(
                             self.objdata["v"][j], self.rotate[i], self.center
                         )
+                    self.rotate_cull(self.rotate_x, self.rotate[i])
+
+    def rotate_cull(self, rotate:Callable[[List[float],Union[int,float],List[float]],List[float]], angle:Union[int,float]) -> None:
+        # cullface 跟著方塊旋轉
+        for j, face in enumerate(self.objdata["cull"]):
+            if face is not None:
+                direction = rotate(list(DIRECTIONS[face]), angle, [0, 0, 0])
+                self.objdata["cull"][j] = DIRECTION_NAMES[tuple(round(k) for k in direction)]
 
     def append_pos(self, thelist, item):
         """
-        append 到 list並回傳index
+        append 到 list並回傳index (以量化座標查表)
         """
-        if item not in thelist:
+        key = quantize(item)
+        index = self.vindex.get(key)
+        if index is None:
             thelist.append(item)
-            return len(thelist)
-        else:
-            return thelist.index(item) + 1
+            index = self.vindex[key] = len(thelist)
+        return index
 
     def add_texture(self, texturename):
         if texturename in self.textures:
@@ -255,6 +258,9 @@ class Build_enity:
             else:
                 self.objdata["textures"].append(self.textures[texturename])
                 return
+        else:
+            # 找不到材質時佔位, 讓 textures 與 f 一一對應 (寫出時為 missing)
+            self.objdata["textures"].append(None)
 
     def add_F(self, listV:List[float], rotate:int=0, elerotate:Callable[[List[float]],List[float]]=None) -> None:
         f = []
@@ -275,8 +281,9 @@ class Build_enity:
         # 一個方塊 = 1*1*1
         # 數據給的方塊 = 16*16*16
         # 轉換為 1*1*1
-        pos1 = element["from"]
-        pos2 = element["to"]
+        # model 資料是共用的, 不能直接修改
+        pos1 = list(element["from"])
+        pos2 = list(element["to"])
 
         elerotate = None
 
@@ -284,10 +291,7 @@ class Build_enity:
 
         if "rotation" in element:
             center = []
-            if element["rotation"]["angle"] > 0:
-                element["rotation"]["angle"] = -element["rotation"]["angle"]
-            else:
-                element["rotation"]["angle"] = abs(element["rotation"]["angle"])
+            angle = -element["rotation"]["angle"]
             if "origin" in element["rotation"]:
                 center = [
                     element["rotation"]["origin"][i] / (16 * 10) + [self.x, self.y, self.z][i]
@@ -295,11 +299,11 @@ class Build_enity:
                 ]
             if element["rotation"]["axis"] == "y":
                 elerotate = lambda x: self.rotate_y(  # noqa: E731
-                    x, element["rotation"]["angle"], center if center != [] else self.center
+                    x, angle, center if center != [] else self.center
                 )
             elif element["rotation"]["axis"] == "x":
                 elerotate = lambda x: self.rotate_x(  # noqa: E731
-                    x, element["rotation"]["angle"], center if center != [] else self.center
+                    x, angle, center if center != [] else self.center
                 )
             if "rescale" in element["rotation"] and element["rotation"]["rescale"] and "rail" in self.textures:
                 pos1 = [0,9,-3]
@@ -333,6 +337,7 @@ class Build_enity:
                 else:
                     self.add_texture(i)
                 self.add_vt(element["faces"][i])
+                self.objdata["cull"].append(element["faces"][i].get("cullface"))
             elif i == "down":
                 self.add_F(
                     [
@@ -349,6 +354,7 @@ class Build_enity:
                 else:
                     self.add_texture(i)
                 self.add_vt(element["faces"][i])
+                self.objdata["cull"].append(element["faces"][i].get("cullface"))
             elif i == "north":
                 self.add_F(
                     [
@@ -365,6 +371,7 @@ class Build_enity:
                 else:
                     self.add_texture(i)
                 self.add_vt(element["faces"][i])
+                self.objdata["cull"].append(element["faces"][i].get("cullface"))
             elif i == "south":
                 self.add_F(
                     [
@@ -381,6 +388,7 @@ class Build_enity:
                 else:
                     self.add_texture(i)
                 self.add_vt(element["faces"][i])
+                self.objdata["cull"].append(element["faces"][i].get("cullface"))
             elif i == "west":
                 self.add_F(
                     [
@@ -397,6 +405,7 @@ class Build_enity:
                 else:
                     self.add_texture(i)
                 self.add_vt(element["faces"][i])
+                self.objdata["cull"].append(element["faces"][i].get("cullface"))
             elif i == "east":
                 self.add_F(
                     [
@@ -413,6 +422,7 @@ class Build_enity:
                 else:
                     self.add_texture(i)
                 self.add_vt(element["faces"][i])
+                self.objdata["cull"].append(element["faces"][i].get("cullface"))
 
     def rotate_y(self, point:List[float], angle:Union[int,float], center:List[float]):
         angle = math.radians(angle)
@@ -0,0 +1,107 @@
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from .grid import quantize
+
+# 一個 chunk 在模型座標的 (最小角, 最大角)
+Box = Tuple[Tuple[float, float, float], Tuple[float, float, float]]
+
+
+class MeshBuffer:
+    """
+    Geometry collected away from the writer, e.g. in a worker process.
+
+    Takes the same blocks as ``ObjWriter.add``; vertices and uvs are deduplicated locally and kept
+    in flat typed arrays (0-based indices) so the buffer pickles compactly. :meth:`extend`
+    concatenates another buffer with index offsets; writers take a whole buffer through their
+    ``add_buffer`` and map it onto their global indices.
+    """
+
+    __slots__ = (
+        "v", "vt", "f", "ft", "sizes", "material", "textures", "block", "blocknames",
+        "_vindex", "_vtindex", "_tindex", "_bindex",
+    )
+
+    def __init__(self) -> None:
+        self.v = array("d")
+        self.vt = array("d")
+        # 每個面的頂點 / uv 索引, sizes 是每個面的頂點數
+        self.f = array("I")
+        self.ft = array("I")
+        self.sizes = array("B")
+        self.material = array("I")
+        self.textures: List[Optional[str]] = []
+        # 每個面來自哪種方塊, 給 OBJ 的 g / o 分組
+        self.block = array("I")
+        self.blocknames: List[str] = []
+        self._vindex: Dict[Tuple[int, ...], int] = {}
+        self._vtindex: Dict[Tuple[int, ...], int] = {}
+        self._tindex: Dict[Optional[str], int] = {}
+        self._bindex: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def __getstate__(self):
+        return self.v, self.vt, self.f, self.ft, self.sizes, self.material, self.textures, self.block, self.blocknames
+
+    def __setstate__(self, state) -> None:
+        self.v, self.vt, self.f, self.ft, self.sizes, self.material, self.textures, self.block, self.blocknames = state
+        self._vindex = {}
+        self._vtindex = {}
+        self._tindex = {texture: i for i, texture in enumerate(self.textures)}
+        self._bindex = {name: i for i, name in enumerate(self.blocknames)}
+
+    def texture_id(self, texture: Optional[str]) -> int:
+        index = self._tindex.get(texture)
+        if index is None:
+            index = self._tindex[texture] = len(self.textures)
+            self.textures.append(texture)
+        return index
+
+    def block_id(self, blockname: str) -> int:
+        index = self._bindex.get(blockname)
+        if index is None:
+            index = self._bindex[blockname] = len(self.blocknames)
+            self.blocknames.append(blockname)
+        return index
+
+    def add(self, objdata: Dict[str, Any]) -> None:
+        vindex = []
+        for v in objdata["v"]:
+            key = quantize(v)
+            index = self._vindex.get(key)
+            if index is None:
+                index = self._vindex[key] = len(self.v) // 3
+                self.v.extend(v[:3])
+            vindex.append(index)
+        textures = objdata.get("textures", [])
+        blocknames = objdata.get("blocknames")
+        block = self.block_id(objdata.get("blockname", ""))
+        for ct1, f in enumerate(objdata["f"]):
+            self.material.append(self.texture_id(textures[ct1] if ct1 < len(textures) else None))
+            self.block.append(block if blocknames is None else self.block_id(blocknames[ct1]))
+            self.sizes.append(len(f))
+            for ct, i in enumerate(f):
+                uv = objdata["vt"][ct1][ct]
+                key = quantize(uv)
+                index = self._vtindex.get(key)
+                if index is None:
+                    index = self._vtindex[key] = len(self.vt) // 2
+                    self.vt.extend(uv[:2])
+                self.f.append(vindex[i - 1])
+                self.ft.append(index)
+
+    def extend(self, other: "MeshBuffer") -> None:
+        """append ``other`` shifting its indices, shared vertices are left for the writer to merge"""
+        voffset = len(self.v) // 3
+        vtoffset = len(self.vt) // 2
+        self.v.extend(other.v)
+        self.vt.extend(other.vt)
+        self.f.extend(i + voffset for i in other.f)
+        self.ft.extend(i + vtoffset for i in other.ft)
+        self.sizes.extend(other.sizes)
+        materials = [self.texture_id(texture) for texture in other.textures]
+        self.material.extend(materials[i] for i in other.material)
+        blocks = [self.block_id(name) for name in other.blocknames]
+        self.block.extend(blocks[i] for i in other.block)
@@ -0,0 +1,158 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+from .culling import DIRECTION_BITS, is_transparent
+from .mctoobj import Enity
+from .texturepack import TexturePackIndex
+
+
+class BlockMesh:
+    """
+    Geometry of one blockstate built at the origin (block-local coordinates).
+
+    ``v`` / ``vt`` / ``f`` / ``textures`` / ``cull`` follow ``Enity.objdata``; ``translate`` places a
+    copy at a voxel, sharing everything except the vertex positions. ``occludes`` is True for
+    opaque blocks with a model element filling the whole block (``objdata["full_cube"]``), which
+    hide the neighbouring faces that have a ``cullface`` towards them.
+    """
+
+    __slots__ = ("blockname", "v", "vt", "f", "textures", "cull", "cull_faces", "occludes", "_culled")
+
+    def __init__(self, objdata: Dict[str, Any]) -> None:
+        self.blockname: str = objdata["blockname"]
+        self.v: List[Tuple[float, float, float]] = [tuple(i) for i in objdata["v"]]
+        self.vt: List[List[List[float]]] = objdata["vt"]
+        self.f: List[List[int]] = objdata["f"]
+        self.textures: List[str] = objdata["textures"]
+        self.cull: List[Optional[str]] = objdata.get("cull", [None] * len(self.f))
+        self.cull_faces: List[str] = sorted({i for i in self.cull if i is not None})
+        self.occludes = objdata.get("full_cube", False) and not is_transparent(self.blockname)
+        self._culled: Dict[int, "BlockMesh"] = {}
+
+    def is_full_cube(self) -> bool:
+        """six faces, one per direction, all with a cullface, filling the whole block (greedy meshing)"""
+        if len(self.f) != 6 or sorted(i for i in self.cull if i is not None) != sorted(DIRECTION_BITS):
+            return False
+        for axis in range(3):
+            values = [i[axis] for i in self.v]
+            if abs(min(values)) > 1e-9 or abs(max(values) - 0.1) > 1e-9:
+                return False
+        return True
+
+    def culled(self, mask: int) -> "BlockMesh":
+        """copy without the faces whose cullface bit is set in ``mask``, memoised per mask"""
+        if mask == 0:
+            return self
+        mesh = self._culled.get(mask)
+        if mesh is None:
+            keep = [
+                j for j, face in enumerate(self.cull) if face is None or not DIRECTION_BITS[face] & mask
+            ]
+            used: Dict[int, int] = {}
+            for j in keep:
+                for k in self.f[j]:
+                    used.setdefault(k, len(used) + 1)
+            mesh = BlockMesh.__new__(BlockMesh)
+            mesh.blockname = self.blockname
+            mesh.v = [self.v[k - 1] for k in used]
+            mesh.f = [[used[k] for k in self.f[j]] for j in keep]
+            mesh.vt = [self.vt[j] for j in keep]
+            mesh.textures = [self.textures[j] for j in keep]
+            mesh.cull = [self.cull[j] for j in keep]
+            mesh.cull_faces = []
+            mesh.occludes = False
+            mesh._culled = {}
+            self._culled[mask] = mesh
+        return mesh
+
+    def translate(self, x: float, y: float, z: float) -> Dict[str, Any]:
+        return {
+            "blockname": self.blockname,
+            "v": [(i[0] + x, i[1] + y, i[2] + z) for i in self.v],
+            "vt": self.vt,
+            "f": self.f,
+            "textures": self.textures,
+        }
+
+
+def blockstate_key(blockdata: Dict[str, Any]) -> Tuple[str, frozenset]:
+    return blockdata["Name"], frozenset(blockdata.get("Properties", {}).items())
+
+
+class MeshCache:
+    """
+    Bounded LRU of :class:`BlockMesh` templates keyed by (texture pack, block name, properties).
+    The pack part is the folder and the version of the loaded :class:`TexturePackIndex`, so
+    templates built from an ``output.json`` that was reloaded since are never served again.
+
+    Blocks that fail to build are cached too and re-raise the original error. ``hits``,
+    ``misses`` and ``evictions`` count lookups so the size can be tuned; the cache is thread safe
+    and can be shared by every conversion using the same process.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Union[BlockMesh, _Failure]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def info(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get(self, blockdata: Dict[str, Any], texturepack: TexturePackIndex) -> BlockMesh:
+        key = (texturepack.folder, texturepack.version) + blockstate_key(blockdata)
+        return self.lookup(key, lambda: build_mesh(blockdata, texturepack))
+
+    def lookup(self, key: Hashable, factory: Callable[[], BlockMesh]) -> BlockMesh:
+        with self._lock:
+            mesh = self._data.get(key)
+            if mesh is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+        if mesh is None:
+            try:
+                mesh = factory()
+            except Exception as e:
+                mesh = _Failure(e)
+            with self._lock:
+                self.misses += 1
+                self._data[key] = mesh
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        if isinstance(mesh, _Failure):
+            raise mesh.error.with_traceback(mesh.traceback)
+        return mesh
+
+
+class _Failure:
+    """a cached build error, re-raised with its original traceback"""
+
+    __slots__ = ("error", "traceback")
+
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+        self.traceback = error.__traceback__
+
+
+def build_mesh(blockdata: Dict[str, Any], texturepack: TexturePackIndex) -> BlockMesh:
+    enity = Enity(0, 0, 0, blockdata, texturepack)
+    if enity.objdata["v"] == []:
+        raise Exception('Enity.objdata["v"] is empty')
+    return BlockMesh(enity.objdata)
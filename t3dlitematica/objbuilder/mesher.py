@@ -0,0 +1,130 @@
+import sys
+import traceback
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .culling import occlusion_mask
+from .greedy import GreedyMesher, greedy_faces
+from .meshcache import BlockMesh, MeshCache, blockstate_key
+from .texturepack import TexturePackIndex
+from ..litematicadecoder import BlockVolume
+
+
+class RegionMesher:
+    """
+    Turns a :class:`BlockVolume` into blocks for a sink with an ``add(objdata)`` method
+    (``ObjWriter``, ``GlbWriter`` or ``MeshBuffer``). ``offset`` places the region inside the
+    schematic, in blocks; ``bounds`` limits the output to one chunk of the volume, neighbours
+    outside it are still looked up in the whole volume for culling.
+    """
+
+    def __init__(
+        self,
+        texturepack: TexturePackIndex,
+        meshcache: Optional[MeshCache] = None,
+        cull: bool = True,
+        greedy: bool = False,
+        show_error_block: bool = False,
+    ) -> None:
+        self.texturepack = texturepack
+        self.meshcache = meshcache if meshcache is not None else MeshCache()
+        self.cull = cull
+        self.greedy = greedy
+        self.show_error_block = show_error_block
+        # 建不出來的方塊只印一次
+        self.reported: Set[Tuple[str, frozenset]] = set()
+
+    def mesh(
+        self,
+        data: BlockVolume,
+        sink,
+        offset: Tuple[int, int, int] = (0, 0, 0),
+        bounds: Optional[Tuple[Tuple[int, int, int], Tuple[int, int, int]]] = None,
+    ) -> None:
+        ox, oy, oz = offset
+        # 每種方塊只建一次模型, 之後只做平移
+        meshes = {}
+        occluders = [False] * len(data.palette)
+        if self.cull:
+            for index, blockdata in enumerate(data.palette):
+                if index not in data.air:
+                    meshes[index] = self.load_mesh(blockdata)
+                    occluders[index] = meshes[index] is not None and meshes[index].occludes
+        # 完整方塊的面交給 greedy meshing 合併
+        mesher = GreedyMesher()
+        greedyfaces = {}
+        for x, y, z, index in data.iter_non_air(bounds):
+            i, j, k = x + ox + 1, y + oy + 1, z + oz + 1
+            if index not in meshes:
+                meshes[index] = self.load_mesh(data.palette[index])
+            mesh = meshes[index]
+            if mesh is not None:
+                if self.cull and mesh.cull_faces:
+                    mesh = mesh.culled(occlusion_mask(data, occluders, x, y, z, mesh.cull_faces))
+                    if not mesh.f:
+                        continue
+                if self.greedy:
+                    if index not in greedyfaces:
+                        greedyfaces[index] = greedy_faces(meshes[index])
+                    if greedyfaces[index] is not None:
+                        for face in mesh.cull:
+                            mesher.add(face, (x + ox, y + oy, z + oz), *greedyfaces[index][face])
+                        continue
+                sink.add(mesh.translate(i / 10, j / 10, k / 10))
+            elif self.show_error_block:
+                sink.add(self.error_block(i / 10, j / 10, k / 10, data.palette[index]["Name"]))
+        for quad in mesher.quads():
+            sink.add(quad)
+
+    def load_mesh(self, blockdata: dict) -> Optional[BlockMesh]:
+        """block mesh template from the cache, None (and the error printed once) if it fails"""
+        try:
+            return self.meshcache.get(blockdata, self.texturepack)
+        except Exception as e:
+            key = blockstate_key(blockdata)
+            if key in self.reported:
+                return None
+            self.reported.add(key)
+            error_class = e.__class__.__name__
+            detail = e.args[0]
+            cl, exc, tb = sys.exc_info()
+            lastCallStack = traceback.extract_tb(tb)[-1]
+            fileName = lastCallStack[0]
+            lineNum = lastCallStack[1]
+            funcName = lastCallStack[2]
+            errMsg = 'File "{}", line {}, in {}: [{}] {}'.format(
+                fileName, lineNum, funcName, error_class, detail
+            )
+            print(f"[UserData] | {errMsg}")
+            return None
+
+    @staticmethod
+    def error_block(x: float, y: float, z: float, blockname: str) -> Dict[str, Any]:
+        return {
+            "blockname": blockname,
+            "v": [
+                [x, y, z],
+                [x + 0.1, y, z],
+                [x + 0.1, y, z + 0.1],
+                [x, y, z + 0.1],
+                [x, y + 0.1, z],
+                [x + 0.1, y + 0.1, z],
+                [x + 0.1, y + 0.1, z + 0.1],
+                [x, y + 0.1, z + 0.1],
+            ],
+            "vt": [
+                [[0, 0], [1, 0], [1, 1], [0, 1]],
+                [[0, 0], [1, 0], [1, 1], [0, 1]],
+                [[0, 0], [1, 0], [1, 1], [0, 1]],
+                [[0, 0], [1, 0], [1, 1], [0, 1]],
+                [[0, 0], [1, 0], [1, 1], [0, 1]],
+                [[0, 0], [1, 0], [1, 1], [0, 1]],
+            ],
+            "f": [
+                [1, 2, 3, 4],
+                [8, 7, 6, 5],
+                [5, 6, 2, 1],
+                [6, 7, 3, 2],
+                [7, 8, 4, 3],
+                [8, 5, 1, 4],
+            ],
+        }
@@ -0,0 +1,106 @@
+import os
+import shutil
+import time
+import zipfile
+from typing import BinaryIO, Optional, Set
+
+# copy 時每次讀取的大小
+COPY_BLOCK = 1 << 20
+
+
+class ZipOutput:
+    """
+    Files written straight into the zip at ``path``, one entry at a time (only one entry can be
+    open). ``compresslevel`` 0 stores the entries uncompressed, 1-9 is the deflate level. The zip
+    is built as ``path + ".part"`` and renamed on :meth:`close`, so a failed export leaves no
+    half written zip behind.
+    """
+
+    def __init__(self, path: str, compresslevel: int = 6) -> None:
+        if not 0 <= compresslevel <= 9:
+            raise ValueError(f"compresslevel must be 0-9, got {compresslevel}")
+        self.path = path
+        self.partial = path + ".part"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if compresslevel == 0:
+            self.zip = zipfile.ZipFile(self.partial, "w", zipfile.ZIP_STORED)
+        else:
+            self.zip = zipfile.ZipFile(self.partial, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self.names: Set[str] = set()
+        self.handle: Optional[BinaryIO] = None
+
+    def __repr__(self) -> str:
+        return f"<ZipOutput {self.path}>"
+
+    def open(self, name: str) -> BinaryIO:
+        self.names.add(name)
+        # 只給名稱的話時間會是 1980-01-01
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = self.zip.compression
+        # 3.13 之前只有 _compresslevel (ZipFile.open 自己也是這樣設的)
+        info._compresslevel = self.zip.compresslevel
+        # 大小未知, 超過 2 GiB 時需要 zip64
+        self.handle = self.zip.open(info, "w", force_zip64=True)
+        return self.handle
+
+    def copy(self, source: str, name: str) -> None:
+        """add the file ``source`` as ``name``, a name already written is kept"""
+        if name in self.names:
+            return
+        self.names.add(name)
+        self.zip.write(source, name)
+
+    def close(self) -> None:
+        if self.zip.fp is None:
+            return
+        self.zip.close()
+        os.replace(self.partial, self.path)
+
+    def discard(self) -> None:
+        if self.handle is not None and not self.handle.closed:
+            self.handle.close()
+        self.zip.close()
+        if os.path.exists(self.partial):
+            os.remove(self.partial)
+
+
+class DirectoryOutput:
+    """Files written uncompressed into the folder ``path``, created if missing"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.created = not os.path.isdir(path)
+        os.makedirs(path, exist_ok=True)
+        self.names: Set[str] = set()
+
+    def __repr__(self) -> str:
+        return f"<DirectoryOutput {self.path}>"
+
+    def target(self, name: str) -> str:
+        self.names.add(name)
+        target = os.path.join(self.path, *name.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        return target
+
+    def open(self, name: str) -> BinaryIO:
+        return open(self.target(name), "wb")
+
+    def copy(self, source: str, name: str) -> None:
+        if name in self.names:
+            return
+        with open(source, "rb") as src, open(self.target(name), "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_BLOCK)
+
+    def close(self) -> None:
+        pass
+
+    def discard(self) -> None:
+        """remove what was written, the whole folder if it did not exist before"""
+        if self.created:
+            shutil.rmtree(self.path, ignore_errors=True)
+            return
+        for name in self.names:
+            try:
+                os.remove(os.path.join(self.path, *name.split("/")))
+            except OSError:
+                pass
@@ -0,0 +1,109 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .meshbuffer import Box, MeshBuffer
+from .mesher import RegionMesher
+from .texturepack import TexturePackIndex
+from ..litematicadecoder import BlockVolume
+from ..litematicadecoder.bitstack import np
+
+# chunk 邊長 (方塊)
+CHUNK_SIZE = 32
+
+Bounds = Tuple[Tuple[int, int, int], Tuple[int, int, int]]
+# (shared memory 名稱, typecode, size, palette, region 名稱, position)
+VolumeSpec = Tuple[str, str, Tuple[int, int, int], List[Dict[str, Any]], str, Tuple[int, int, int]]
+
+# 每個 worker process 自己的 RegionMesher (材質包與模型快取) 與已開啟的 shared memory
+_mesher: Optional[RegionMesher] = None
+_attached: Dict[str, Tuple[SharedMemory, BlockVolume]] = {}
+
+
+def init_worker(folder: str, cull: bool, greedy: bool, show_error_block: bool) -> None:
+    global _mesher
+    _mesher = RegionMesher(TexturePackIndex.load(folder), None, cull, greedy, show_error_block)
+
+
+def chunks(size: Tuple[int, int, int], chunk: int = CHUNK_SIZE) -> Iterator[Bounds]:
+    """``((x0, y0, z0), (x1, y1, z1))`` of every ``chunk``³ box covering ``size``, y, z, x order"""
+    sx, sy, sz = size
+    for y in range(0, sy, chunk):
+        for z in range(0, sz, chunk):
+            for x in range(0, sx, chunk):
+                yield (x, y, z), (min(x + chunk, sx), min(y + chunk, sy), min(z + chunk, sz))
+
+
+def chunk_box(offset: Tuple[int, int, int], bounds: Bounds) -> Box:
+    """the corners of the chunk ``bounds`` of a region at ``offset`` in model coordinates"""
+    # 與 RegionMesher 相同: 方塊 x 從 (x + ox + 1) / 10 開始
+    low, high = bounds
+    return (
+        tuple((low[i] + offset[i] + 1) / 10 for i in range(3)),
+        tuple((high[i] + offset[i] + 1) / 10 for i in range(3)),
+    )
+
+
+def share(volume: BlockVolume) -> Tuple[SharedMemory, VolumeSpec]:
+    """copy the palette indices of ``volume`` into a new shared memory block"""
+    indices = np.ascontiguousarray(volume.indices) if np is not None else volume.indices
+    data = memoryview(indices).cast("B")
+    typecode = "H" if indices.itemsize == 2 else "I"
+    shm = SharedMemory(create=True, size=max(len(data), 1))
+    shm.buf[: len(data)] = data
+    return shm, (shm.name, typecode, volume.size, volume.palette, volume.name, volume.position)
+
+
+def attach(spec: VolumeSpec) -> BlockVolume:
+    """the :class:`BlockVolume` of ``spec`` as a view of its shared memory, opened once per worker"""
+    name, typecode, size, palette, regionname, position = spec
+    attached = _attached.get(name)
+    if attached is None:
+        shm = SharedMemory(name=name)
+        count = size[0] * size[1] * size[2]
+        if np is not None:
+            indices = np.frombuffer(shm.buf, dtype=np.uint16 if typecode == "H" else np.uint32, count=count)
+        else:
+            indices = shm.buf.cast(typecode)[:count]
+        attached = _attached[name] = (shm, BlockVolume(size, palette, indices, regionname, position))
+    return attached[1]
+
+
+def mesh_task(task: Tuple[VolumeSpec, Tuple[int, int, int], Bounds]) -> MeshBuffer:
+    spec, offset, bounds = task
+    buffer = MeshBuffer()
+    _mesher.mesh(attach(spec), buffer, offset, bounds)
+    return buffer
+
+
+def mesh_parallel(
+    regions: List[Tuple[BlockVolume, Tuple[int, int, int]]],
+    mesher: RegionMesher,
+    jobs: int,
+    chunk: int = CHUNK_SIZE,
+) -> Iterator[Tuple[MeshBuffer, Box]]:
+    """
+    Mesh every ``(volume, offset)`` in a pool of ``jobs`` processes set up like ``mesher``.
+
+    Each region is split into ``chunk``³ boxes, one task each; the workers read the palette
+    indices from shared memory, so culling at chunk borders sees the real neighbours. Buffers
+    are yielded in region then chunk order, each with its chunk's :func:`chunk_box`.
+    """
+    shared = []
+    try:
+        tasks = []
+        for volume, offset in regions:
+            shm, spec = share(volume)
+            shared.append(shm)
+            tasks.extend((spec, offset, bounds) for bounds in chunks(volume.size, chunk))
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_worker,
+            initargs=(mesher.texturepack.folder, mesher.cull, mesher.greedy, mesher.show_error_block),
+        ) as pool:
+            for task, buffer in zip(tasks, pool.map(mesh_task, tasks)):
+                yield buffer, chunk_box(task[1], task[2])
+    finally:
+        for shm in shared:
+            shm.close()
+            shm.unlink()
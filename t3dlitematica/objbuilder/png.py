@@ -0,0 +1,144 @@
+import struct
+import zlib
+from typing import List, Tuple
+
+# 只用 zlib 讀寫 PNG, 不需要 Pillow
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# color type -> 每個像素的 sample 數
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def read(data: bytes) -> Tuple[int, int, bytearray]:
+    """``(width, height, rgba)`` of a png, 8 bits per channel, ValueError if unsupported"""
+    if data[:8] != SIGNATURE:
+        raise ValueError("not a png file")
+    pos = 8
+    idat: List[bytes] = []
+    palette = b""
+    trns = b""
+    header = None
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos : pos + 8])
+        chunk = data[pos + 8 : pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"PLTE":
+            palette = chunk
+        elif kind == b"tRNS":
+            trns = chunk
+        elif kind == b"IDAT":
+            idat.append(chunk)
+        elif kind == b"IEND":
+            break
+    if header is None:
+        raise ValueError("png without IHDR")
+    width, height, depth, colortype, _, _, interlace = header
+    if colortype not in CHANNELS or depth not in (1, 2, 4, 8, 16):
+        raise ValueError(f"unsupported png color type {colortype} / bit depth {depth}")
+    if interlace:
+        raise ValueError("interlaced png is not supported")
+    channels = CHANNELS[colortype]
+    rowbytes = (width * channels * depth + 7) // 8
+    bpp = max(1, channels * depth // 8)
+    pixels = unfilter(zlib.decompress(b"".join(idat)), rowbytes, height, bpp)
+
+    rgba = bytearray(width * height * 4)
+    for y in range(height):
+        row = pixels[y * rowbytes : (y + 1) * rowbytes]
+        if depth == 16:
+            samples = row[::2]
+        elif depth < 8:
+            mask = (1 << depth) - 1
+            samples = bytearray(
+                (row[i * depth // 8] >> (8 - depth - i * depth % 8)) & mask for i in range(width * channels)
+            )
+            if colortype == 0:
+                # 灰階擴展到 0-255
+                samples = bytearray(i * 255 // mask for i in samples)
+        else:
+            samples = row
+        out = y * width * 4
+        if colortype == 6:
+            rgba[out : out + width * 4] = samples[: width * 4]
+        elif colortype == 2:
+            for x in range(width):
+                rgba[out + 4 * x : out + 4 * x + 3] = samples[3 * x : 3 * x + 3]
+                rgba[out + 4 * x + 3] = 255
+        elif colortype == 4:
+            for x in range(width):
+                rgba[out + 4 * x : out + 4 * x + 3] = bytes((samples[2 * x],)) * 3
+                rgba[out + 4 * x + 3] = samples[2 * x + 1]
+        elif colortype == 0:
+            for x in range(width):
+                rgba[out + 4 * x : out + 4 * x + 3] = bytes((samples[x],)) * 3
+                rgba[out + 4 * x + 3] = 255
+        else:
+            for x in range(width):
+                i = samples[x]
+                if 3 * i + 3 > len(palette):
+                    raise ValueError("png palette index out of range")
+                rgba[out + 4 * x : out + 4 * x + 3] = palette[3 * i : 3 * i + 3]
+                rgba[out + 4 * x + 3] = trns[i] if i < len(trns) else 255
+    if trns and colortype in (0, 2) and depth == 8:
+        # 單一透明色
+        key = bytes(trns[1::2]) * (3 if colortype == 0 else 1)
+        for i in range(0, len(rgba), 4):
+            if rgba[i : i + 3] == key:
+                rgba[i + 3] = 0
+    return width, height, rgba
+
+
+def unfilter(raw: bytes, rowbytes: int, height: int, bpp: int) -> bytearray:
+    out = bytearray(rowbytes * height)
+    prev = bytearray(rowbytes)
+    pos = 0
+    for y in range(height):
+        kind = raw[pos]
+        line = bytearray(raw[pos + 1 : pos + 1 + rowbytes])
+        pos += 1 + rowbytes
+        if kind == 1:
+            for i in range(bpp, rowbytes):
+                line[i] = (line[i] + line[i - bpp]) & 255
+        elif kind == 2:
+            for i in range(rowbytes):
+                line[i] = (line[i] + prev[i]) & 255
+        elif kind == 3:
+            for i in range(rowbytes):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 255
+        elif kind == 4:
+            for i in range(rowbytes):
+                a = line[i - bpp] if i >= bpp else 0
+                b = prev[i]
+                c = prev[i - bpp] if i >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                if pa <= pb and pa <= pc:
+                    line[i] = (line[i] + a) & 255
+                elif pb <= pc:
+                    line[i] = (line[i] + b) & 255
+                else:
+                    line[i] = (line[i] + c) & 255
+        elif kind != 0:
+            raise ValueError(f"unknown png filter {kind}")
+        out[y * rowbytes : (y + 1) * rowbytes] = line
+        prev = line
+    return out
+
+
+def chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def write(width: int, height: int, rgba: bytes, level: int = 6) -> bytes:
+    """8 bit RGBA png, rows are stored unfiltered"""
+    stride = width * 4
+    raw = b"".join(b"\x00" + bytes(rgba[y * stride : (y + 1) * stride]) for y in range(height))
+    return (
+        SIGNATURE
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, level))
+        + chunk(b"IEND", b"")
+    )
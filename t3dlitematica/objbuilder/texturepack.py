@@ -0,0 +1,98 @@
+import itertools
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+class TexturePackIndex:
+    """
+    The ``output.json`` written by ``convert_texturepack``, parsed once.
+
+    Blockstate variant keys are split into property conditions and model parent chains are
+    merged on first use, so building a block is only dictionary lookups. One index can be shared
+    by any number of ``LitimaticaToObj`` calls.
+    """
+
+    _loaded: Dict[str, Tuple[float, "TexturePackIndex"]] = {}
+    _lock = threading.Lock()
+    # 每個 index 一個編號, output.json 重新載入後舊的模型快取就不會再命中
+    _versions = itertools.count()
+
+    def __init__(self, folder: str, data: Optional[Dict[str, Any]] = None) -> None:
+        self.folder = str(folder)
+        self.version = next(TexturePackIndex._versions)
+        if data is None:
+            with open(os.path.join(self.folder, "output.json"), "r", encoding="utf8") as f:
+                data = json.load(f)
+        self.models: Dict[str, dict] = data["models"]
+        self.blockstates: Dict[str, dict] = {i: data[i] for i in data if i != "models"}
+        self._variants: Dict[str, List[Tuple[str, List[Tuple[str, str]], dict]]] = {}
+        self._resolved: Dict[str, Tuple[Dict[str, str], Optional[List[dict]]]] = {}
+
+    def __repr__(self) -> str:
+        return f"<TexturePackIndex {self.folder!r} blocks={len(self.blockstates)}>"
+
+    @classmethod
+    def load(cls, folder: str) -> "TexturePackIndex":
+        """Load ``folder/output.json``, reusing the parsed index while the file is unchanged"""
+        folder = os.path.abspath(str(folder))
+        mtime = os.path.getmtime(os.path.join(folder, "output.json"))
+        with cls._lock:
+            cached = cls._loaded.get(folder)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        index = cls(folder)
+        with cls._lock:
+            cls._loaded[folder] = (mtime, index)
+        return index
+
+    @classmethod
+    def of(cls, texturepack: Union[str, "os.PathLike[str]", "TexturePackIndex"]) -> "TexturePackIndex":
+        if isinstance(texturepack, TexturePackIndex):
+            return texturepack
+        return cls.load(texturepack)
+
+    def blockstate(self, name: str) -> dict:
+        """blockstate json of ``name`` (without ``minecraft:``), KeyError if the pack lacks it"""
+        return self.blockstates[name]
+
+    def variants(self, name: str) -> List[Tuple[str, List[Tuple[str, str]], dict]]:
+        """
+        ``(key, [(property, value), ...], variant)`` for every entry of ``variants``.
+        Weighted variant lists use their first entry.
+        """
+        variants = self._variants.get(name)
+        if variants is None:
+            variants = []
+            for key, variant in self.blockstate(name).get("variants", {}).items():
+                if isinstance(variant, list):
+                    variant = variant[0]
+                conditions = [tuple(i.split("=", 1)) for i in key.split(",")] if key else []
+                variants.append((key, conditions, variant))
+            self._variants[name] = variants
+        return variants
+
+    def model(self, name: str) -> Tuple[Dict[str, str], Optional[List[dict]]]:
+        """
+        ``(textures, elements)`` of a model with its parent chain applied: textures are merged
+        parent first, elements come from the closest model defining them (None if no model does).
+        The returned objects are shared, callers must not modify them.
+        """
+        resolved = self._resolved.get(name)
+        if resolved is None:
+            model = self.models[name]
+            textures: Dict[str, str] = {}
+            elements = None
+            if "parent" in model:
+                parent_textures, elements = self.model(model["parent"].split("/")[-1])
+                textures.update(parent_textures)
+            if "textures" in model:
+                textures.update(model["textures"])
+            if "elements" in model:
+                elements = model["elements"]
+            resolved = self._resolved[name] = (textures, elements)
+        return resolved
+
+    def texture_path(self, texture: str) -> str:
+        return os.path.join(self.folder, "textures", texture + ".png")
@@ -1,79 +1,173 @@
 import json
-import sys
-import traceback
 from .mctoobj import Enity
+from .meshcache import MeshCache
+from .mesher import RegionMesher
+from .parallel import mesh_parallel
+from .texturepack import TexturePackIndex
+from .writer import ObjWriter, material_name
+from .gltf import GlbWriter
+from .atlas import AtlasSink
+from .output import DirectoryOutput, ZipOutput
+from ..litematicadecoder import BlockVolume
 import os
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple, Union
 import tempfile
 import shutil
 from pathlib import Path
 
-def LitimaticaToObj(litematica: dict, TextureFolder: str, output: str = "./") -> None:
+def LitimaticaToObj(
+    litematica: dict,
+    TextureFolder: Union[str, TexturePackIndex],
+    output: str = "./",
+    meshcache: Optional[MeshCache] = None,
+    cull: bool = True,
+    greedy: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+    format: str = "obj",
+    embed_textures: bool = True,
+    jobs: int = 1,
+    atlas: bool = False,
+    atlas_size: int = 4096,
+    groups: Optional[str] = None,
+    compresslevel: int = 6,
+    folder: bool = False,
+) -> None:
+    """
+    TextureFolder: folder made by ``convert_texturepack`` or an already loaded
+    :class:`TexturePackIndex`, which can be reused across calls
+    meshcache: block mesh templates to reuse, a new cache is used for every call by default
+    cull: drop faces hidden by a neighbouring opaque full cube
+    greedy: merge coplanar faces of full cubes sharing a texture into larger tiled quads
+    progress: called with the number of bytes written so far
+    format: ``"obj"`` (OBJ + MTL) or ``"glb"`` (binary glTF 2.0)
+    embed_textures: glb only, pack the textures into the .glb instead of a ``textures`` folder
+    jobs: worker processes meshing the regions in 32³ chunks, 0 for one per cpu; 1 meshes in
+    this process, ``meshcache`` is ignored when ``jobs > 1``
+    atlas: pack the used textures into one or a few atlas images (``atlas_size`` pixels a side at
+    most) so the model needs a handful of materials; faces with tiled uvs keep their own texture
+    groups: obj only, ``"g"`` or ``"o"`` to put the faces of each block type in their own group /
+    object, faces are grouped by material either way
+    compresslevel: deflate level of the zip entries, 0 stores them uncompressed (fastest)
+    folder: write the files uncompressed into ``output/<name>/`` instead of ``output/<name>.zip``
+    """
     size = (
         int(litematica["Metadata"]["EnclosingSize"]["x"]),
         int(litematica["Metadata"]["EnclosingSize"]["y"]),
         int(litematica["Metadata"]["EnclosingSize"]["z"]),
     )
-    regonname = list(litematica["Regions"].keys())[0]
     name = litematica["Metadata"]["Name"]
-    litematica = litematica["Regions"][regonname]["decode_BlockStates"]
-    return Objhandel(name, litematica, size, TextureFolder, output)
+    return Objhandel(name, region_offsets(litematica), size, TextureFolder, output, meshcache=meshcache, cull=cull, greedy=greedy, progress=progress, format=format, embed_textures=embed_textures, jobs=jobs, atlas=atlas, atlas_size=atlas_size, groups=groups, compresslevel=compresslevel, folder=folder)
+
+
+def region_offsets(litematica: dict) -> List[Tuple[BlockVolume, Tuple[int, int, int]]]:
+    """every region with its offset (in blocks) from the lowest corner of the schematic"""
+    volumes = []
+    for regonname, region in litematica["Regions"].items():
+        if "BlockVolume" in region:
+            volumes.append(region["BlockVolume"])
+        else:
+            # 舊格式 decode_BlockStates 是反轉的
+            volumes.append(BlockVolume.from_states(
+                reversed(region["decode_BlockStates"]),
+                tuple(int(region["Size"][i]) for i in "xyz"),
+                regonname,
+                tuple(int(region["Position"][i]) for i in "xyz"),
+            ))
+    low = [min(volume.origin[i] for volume in volumes) for i in range(3)]
+    return [(volume, tuple(volume.origin[i] - low[i] for i in range(3))) for volume in volumes]
 
 class Objhandel:
-    def __init__(self, name:str, data:List[dict], size:tuple[int,int,int],TextureFolder:str,outputfolder:str,show_error_block:bool=False) -> None:
+    def __init__(self, name:str, data:Union[BlockVolume,List[dict],List[Tuple[BlockVolume,Tuple[int,int,int]]]], size:tuple[int,int,int],TextureFolder:Union[str,TexturePackIndex],outputfolder:str,show_error_block:bool=False,meshcache:Optional[MeshCache]=None,cull:bool=True,greedy:bool=False,progress:Optional[Callable[[int],None]]=None,format:str="obj",embed_textures:bool=True,jobs:int=1,atlas:bool=False,atlas_size:int=4096,groups:Optional[str]=None,run:bool=True,compresslevel:int=6,folder:bool=False) -> None:
         self.name = name
-        self.tempfolder = tempfile.mkdtemp()
-        self.objfile = open(os.path.join(self.tempfolder, self.name + ".obj"), "w")
-        self.output = "# generate by 3dlitematica" + "\n" + "g " + name + "\n"
-        self.tmpdata = {}
-        self.vtof = {}  # 對應表
-        self.vtovt = {}
-        self.textures = []
-        self.show_error_block = show_error_block
-        self.TextureFolder = TextureFolder
         self.outputfolder = outputfolder
-        self.main(data, size)
-        shutil.make_archive(os.path.join(self.outputfolder, self.name), "zip", self.tempfolder)
-        shutil.rmtree(self.tempfolder)
+        # 直接寫進 zip (或資料夾), 不再經過暫存資料夾 + make_archive
+        if folder:
+            self.output = DirectoryOutput(os.path.join(outputfolder, name))
+        else:
+            self.output = ZipOutput(os.path.join(outputfolder, name) + ".zip", compresslevel)
+        # archive 之後輸出已完成, discard 不能再刪掉它
+        self.closed = False
+        self.format = format
+        self.texturepack = TexturePackIndex.of(TextureFolder)
+        # 不在材質包裡的圖片, texture -> png 路徑
+        self.images: Dict[str, str] = {}
+        try:
+            if format == "obj":
+                # 邊產生邊寫入, 不保留整個模型
+                self.writer = ObjWriter(self.output.open(self.name + ".obj"), name, progress, groups=groups)
+            elif format == "glb":
+                self.writer = GlbWriter(
+                    self.name + ".glb", name, self.texturepack, embed_textures, progress, self.images, self.output
+                )
+            else:
+                raise ValueError(f"unknown format {format!r}, expected 'obj' or 'glb'")
+        except BaseException:
+            self.output.discard()
+            raise
+        self.atlasfolder = None
+        if atlas:
+            self.atlasfolder = tempfile.mkdtemp()
+            self.writer = AtlasSink(self.writer, self.texturepack, self.atlasfolder, self.images, atlas_size)
+        self.show_error_block = show_error_block
+        self.meshcache = meshcache if meshcache is not None else MeshCache()
+        self.cull = cull
+        self.greedy = greedy
+        self.jobs = jobs or os.cpu_count() or 1
+        self.mesher = RegionMesher(self.texturepack, self.meshcache, cull, greedy, show_error_block)
+        self.TextureFolder = self.texturepack.folder
+        # run=False: 由呼叫者依序呼叫 main / archive (或 discard)
+        if run:
+            try:
+                self.main(data, size)
+            except BaseException:
+                self.discard()
+                raise
+            self.archive()
+
+    def archive(self) -> None:
+        """finish the zip (or folder)"""
+        self.output.close()
+        self.closed = True
+        if self.atlasfolder:
+            shutil.rmtree(self.atlasfolder, ignore_errors=True)
+
+    def discard(self) -> None:
+        """remove everything written so far, the zip is not created; does nothing after ``archive``"""
+        if self.closed:
+            return
+        self.closed = True
+        file = getattr(self.writer, "file", None)
+        if file is not None and not file.closed:
+            try:
+                file.close()
+            except Exception:
+                pass
+        self.output.discard()
+        if self.atlasfolder:
+            shutil.rmtree(self.atlasfolder, ignore_errors=True)
 
     def __str__(self) -> str:
-        return str(os.path.join(self.outputfolder, self.name) + ".zip")
+        return str(self.output.path)
 
     def main(self, data, size):
-        data = list(reversed(data))
-        x = size[0]
-        y = size[1]
-        z = size[2]
-        count = 0
-        for j in range(1, y + 1):
-            for k in range(1, z + 1):
-                for i in range(1, x + 1):
-                    if data[count]["Name"] == "minecraft:air":
-                        pass
-                    else:
-                        try:
-                            self.addEnity(Enity(i / 10, j / 10, k / 10, data[count], self.TextureFolder))
-                        except Exception as e:
-                            error_class = e.__class__.__name__
-                            detail = e.args[0]
-                            cl, exc, tb = sys.exc_info()
-                            lastCallStack = traceback.extract_tb(tb)[-1]
-                            fileName = lastCallStack[0]
-                            lineNum = lastCallStack[1]
-                            funcName = lastCallStack[2]
-                            errMsg = 'File "{}", line {}, in {}: [{}] {}'.format(
-                                fileName, lineNum, funcName, error_class, detail
-                            )
-                            print(f"[UserData] | {errMsg}")
-                            if self.show_error_block:
-                                self.addblock(i / 10, j / 10, k / 10, data[count]["Name"])
-                            else:
-                                pass
-                    count += 1
-
-        # self.objfile.write(self.output)
-        self.writeobj()
-        self.objfile.close()
+        if isinstance(data, BlockVolume):
+            regions = [(data, (0, 0, 0))]
+        elif data and isinstance(data[0], dict):
+            # 舊格式 decode_BlockStates 是反轉的
+            regions = [(BlockVolume.from_states(reversed(data), size), (0, 0, 0))]
+        else:
+            regions = data
+        if self.jobs > 1:
+            # 各 region 切成 chunk 在 worker 裡建成 MeshBuffer, 寫入時只合併 chunk 邊界上的頂點
+            for buffer, box in mesh_parallel(regions, self.mesher, self.jobs):
+                self.writer.add_buffer(buffer, box)
+        else:
+            for volume, offset in regions:
+                self.mesher.mesh(volume, self.writer, offset)
+
+        self.writer.close()
+        if self.format == "obj":
+            self.writeobj()
 
     """
     # List of geometric vertices, with (x, y, z, [w]) coordinates, w is optional and defaults to 1.0.
@@ -95,127 +189,34 @@ class Objhandel:
     def addEnity(self, Enity: Enity) -> None:
         if Enity.objdata["v"] == []:
             raise Exception('Enity.objdata["v"] is empty')
-        self.tmpdata[(Enity.x, Enity.y, Enity.z)] = Enity.objdata
+        self.writer.add(Enity.objdata)
 
     def addblock(self, x:float, y:float, z:float, blockname:str) -> None:
-        self.tmpdata[(x, y, z)] = {
-            "blockname": blockname,
-            "v": [
-                [x, y, z],
-                [x + 0.1, y, z],
-                [x + 0.1, y, z + 0.1],
-                [x, y, z + 0.1],
-                [x, y + 0.1, z],
-                [x + 0.1, y + 0.1, z],
-                [x + 0.1, y + 0.1, z + 0.1],
-                [x, y + 0.1, z + 0.1],
-            ],
-            "vt": [
-                [[0, 0], [1, 0], [1, 1], [0, 1]],
-                [[0, 0], [1, 0], [1, 1], [0, 1]],
-                [[0, 0], [1, 0], [1, 1], [0, 1]],
-                [[0, 0], [1, 0], [1, 1], [0, 1]],
-                [[0, 0], [1, 0], [1, 1], [0, 1]],
-                [[0, 0], [1, 0], [1, 1], [0, 1]],
-            ],
-            "f": [
-                [1, 2, 3, 4],
-                [8, 7, 6, 5],
-                [5, 6, 2, 1],
-                [6, 7, 3, 2],
-                [7, 8, 4, 3],
-                [8, 5, 1, 4],
-            ],
-        }
+        self.writer.add(self.mesher.error_block(x, y, z, blockname))
 
     def writeobj(self) -> None:
-        # TODO: 將方塊加入到group裡面
-        # https://blog.csdn.net/xyh930929/article/details/82260581
-        # 格式 ：f v/vt/vn v/vt/vn v/vt/vn（f 顶点索引 / 纹理坐标索引 / 顶点法向量索引）
+        """MTL 與材質, OBJ 本體已由 ObjWriter 寫入"""
         temp = ""
-        if not os.path.exists(os.path.join(self.tempfolder, "textures")):
-            os.makedirs(os.path.join(self.tempfolder, "textures"))
-        for i in self.tmpdata:
-            if "textures" in self.tmpdata[i]:
-                for j in set(self.tmpdata[i]["textures"]):
-                    if j not in self.textures:
-                        self.textures.append(j)
-                        shutil.copy(
-                            os.path.join(self.TextureFolder,"textures", j + ".png"),
-                            os.path.join(self.tempfolder, "textures"),
-                        )
-                        temp += "newmtl " + j.split("/")[-1] + "\n"
-                        temp += "Ka 1.000 1.000 1.000\n"
-                        temp += "map_Kd " + os.path.join("textures", j.split("/")[-1] + ".png") + "\n"
-                        temp += "\n"
+        for j in self.writer.textures:
+            source = self.images.get(j) or self.texturepack.texture_path(j)
+            self.output.copy(source, "textures/" + os.path.basename(source))
+            temp += "newmtl " + material_name(j) + "\n"
+            temp += "Ka 1.000 1.000 1.000\n"
+            # greedy 合併的面 UV 超過 1, 材質要重複
+            temp += "map_Kd " + ("-clamp off " if self.greedy else "") + os.path.join("textures", j.split("/")[-1] + ".png") + "\n"
+            temp += "\n"
         temp += "newmtl " + "missing" + "\n"
         temp += "Ka 1.000 1.000 1.000\n"
         temp += (
             "map_Kd " + os.path.join("textures", "Minecraft_missing_texture_block.svg.png") + "\n"
         )
         temp += "\n"
-        shutil.copy(
+        self.output.copy(
             os.path.join(Path(__file__).parent.parent.parent, "resource","Minecraft_missing_texture_block.svg.png"),
-            os.path.join(self.tempfolder, "textures", "Minecraft_missing_texture_block.svg.png"),
+            "textures/Minecraft_missing_texture_block.svg.png",
         )
-        with open(os.path.join(self.tempfolder, self.name + ".mtl"), "w") as f:
-            f.write(temp)
-
-        oneblock = ""
-        for blocks in self.tmpdata:
-            for v in self.tmpdata[blocks]["v"]:
-                if self.vtof.get((v[0], v[1], v[2])) == None:
-                    oneblock += "v " + str(v[0]) + " " + str(v[1]) + " " + str(v[2]) + "\n"
-                    self.vtof[(v[0], v[1], v[2])] = len(self.vtof) + 1
-            for vt in self.tmpdata[blocks]["vt"]:
-                for i in vt:
-                    if self.vtovt.get((i[0], i[1])) == None:
-                        self.vtovt[(i[0], i[1])] = len(self.vtovt) + 1
-                        oneblock += "vt " + str(i[0]) + " " + str(i[1]) + "\n"
-
-            ct1 = 0
-            for f in self.tmpdata[blocks]["f"]:
-                if "textures" in self.tmpdata[blocks]:
-                    try:
-                        oneblock += (
-                            "usemtl " + self.tmpdata[blocks]["textures"][ct1].split("/")[-1] + "\n"
-                        )
-                    except:
-                        oneblock += "usemtl " + "missing" + "\n"
-                else:
-                    oneblock += "usemtl " + "missing" + "\n"
-                oneblock += "f "
-                ct = 0
-                for i in f:
-                    oneblock += (
-                        str(
-                            self.vtof[
-                                (
-                                    self.tmpdata[blocks]["v"][i - 1][0],
-                                    self.tmpdata[blocks]["v"][i - 1][1],
-                                    self.tmpdata[blocks]["v"][i - 1][2],
-                                )
-                            ]
-                        )
-                        + "/"
-                        + str(
-                            self.vtovt[
-                                (
-                                    self.tmpdata[blocks]["vt"][ct1][ct][0],
-                                    self.tmpdata[blocks]["vt"][ct1][ct][1],
-                                )
-                            ]
-                        )
-                        + " "
-                    )
-                    ct += 1
-                oneblock += "\n"
-                ct1 += 1
-            oneblock += "#DEBUG \n"
-        self.output += "mtllib " + self.name + ".mtl" + "\n"
-        self.output += oneblock
-        self.objfile.write(self.output)
-
+        with self.output.open(self.name + ".mtl") as f:
+            f.write(temp.encode("utf8"))
 
 if __name__ == "__main__":
     with open("./test.json", "r", encoding="utf8") as f:
@@ -0,0 +1,228 @@
+import io
+import tempfile
+from array import array
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from .grid import quantize
+from .meshbuffer import Box, MeshBuffer
+
+# 進度回報的間隔 (bytes)
+PROGRESS_STEP = 1 << 20
+# 暫存的面超過這個大小就先寫到暫存檔
+SPILL_BYTES = 64 << 20
+# 離 chunk 邊界這麼近的頂點都當成邊界上的, 要跟其他 chunk 合併 (1/16 方塊 = 0.00625)
+SEAM = 1e-4
+
+
+def material_name(texture: Optional[str]) -> str:
+    return texture.split("/")[-1] if texture else "missing"
+
+
+class ObjWriter:
+    """
+    Streaming OBJ writer.
+
+    Vertices and uvs of every block passed to :meth:`add` are written at once through a buffered
+    file handle. Faces are bucketed by material (and by block type when ``groups`` is ``"g"`` or
+    ``"o"``) and written on :meth:`close` as contiguous runs, one ``usemtl`` per material; buckets
+    larger than ``SPILL_BYTES`` in total go to a temporary file meanwhile.
+    ``progress(bytes_written)`` is called roughly every ``PROGRESS_STEP`` bytes. ``path`` can
+    also be a binary file object (e.g. a zip entry), it is closed with the writer.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, BinaryIO],
+        name: str,
+        progress: Optional[Callable[[int], None]] = None,
+        buffering: int = 1 << 20,
+        groups: Optional[str] = None,
+    ) -> None:
+        if groups not in (None, "g", "o"):
+            raise ValueError(f"unknown groups {groups!r}, expected None, 'g' or 'o'")
+        if isinstance(path, str):
+            self.file = open(path, "w", encoding="utf8", buffering=buffering)
+        else:
+            self.file = io.TextIOWrapper(io.BufferedWriter(path, buffering), encoding="utf8")
+        # 對應表, key 為量化後的座標
+        self.vtof: Dict[Tuple[int, ...], int] = {}
+        self.vtovt: Dict[Tuple[int, ...], int] = {}
+        # 已寫出的頂點數, chunk 內部的頂點不進 vtof
+        self.vertices = 0
+        self.textures: List[str] = []
+        self.groups = groups
+        # (方塊名稱, 材質) -> 還沒寫出的 f 行
+        self.faces: Dict[Tuple[str, str], List[str]] = {}
+        self.buffered = 0
+        # 已寫到暫存檔的部分, (方塊名稱, 材質) -> [(位置, 長度)]
+        self.spill = None
+        self.spilled: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        self.progress = progress
+        self.bytes_written = 0
+        self.next_report = PROGRESS_STEP
+        self.write("# generate by 3dlitematica" + "\n" + "g " + name + "\n")
+        self.write("mtllib " + name + ".mtl" + "\n")
+
+    def __enter__(self) -> "ObjWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def write(self, text: str) -> None:
+        self.file.write(text)
+        self.bytes_written += len(text)
+        if self.progress is not None and self.bytes_written >= self.next_report:
+            self.next_report = self.bytes_written + PROGRESS_STEP
+            self.progress(self.bytes_written)
+
+    def add(self, objdata: Dict[str, Any]) -> None:
+        """write one block (``Enity.objdata`` layout)"""
+        # 格式 ：f v/vt/vn v/vt/vn v/vt/vn（f 顶点索引 / 纹理坐标索引 / 顶点法向量索引）
+        lines = []
+        vtof = self.vtof
+        vtovt = self.vtovt
+        vindex = []
+        for v in objdata["v"]:
+            key = quantize(v)
+            index = vtof.get(key)
+            if index is None:
+                self.vertices += 1
+                index = vtof[key] = self.vertices
+                lines.append("v " + str(v[0]) + " " + str(v[1]) + " " + str(v[2]) + "\n")
+            vindex.append(index)
+        vtindex = []
+        for vt in objdata["vt"]:
+            face = []
+            for i in vt:
+                key = quantize(i)
+                index = vtovt.get(key)
+                if index is None:
+                    index = vtovt[key] = len(vtovt) + 1
+                    lines.append("vt " + str(i[0]) + " " + str(i[1]) + "\n")
+                face.append(index)
+            vtindex.append(face)
+
+        self.write("".join(lines))
+
+        textures = objdata.get("textures", [])
+        blocknames = objdata.get("blocknames")
+        for ct1, f in enumerate(objdata["f"]):
+            texture = textures[ct1] if ct1 < len(textures) else None
+            if texture and texture not in self.textures:
+                self.textures.append(texture)
+            if self.groups is None:
+                group = ""
+            else:
+                group = blocknames[ct1] if blocknames is not None else objdata.get("blockname", "")
+            line = "f " + " ".join(str(vindex[i - 1]) + "/" + str(vtindex[ct1][ct]) for ct, i in enumerate(f)) + "\n"
+            self.add_face((group, material_name(texture)), line)
+        if self.buffered > SPILL_BYTES:
+            self.spill_faces()
+
+    def add_face(self, key: Tuple[str, str], line: str) -> None:
+        bucket = self.faces.get(key)
+        if bucket is None:
+            bucket = self.faces[key] = []
+        bucket.append(line)
+        self.buffered += len(line)
+
+    def add_buffer(self, buffer: MeshBuffer, box: Optional[Box] = None) -> None:
+        """
+        Write a whole :class:`MeshBuffer`, e.g. one chunk meshed in a worker, shifting its local
+        indices onto the global ones. With ``box`` (the chunk's ``(low, high)`` corners) only the
+        vertices on or outside its faces are merged with the other chunks; the ones strictly
+        inside cannot be shared and are written without a lookup.
+        """
+        lines = []
+        vtof = self.vtof
+        v = buffer.v
+        vmap = array("I", bytes(4 * (len(v) // 3)))
+        if box is not None:
+            (lx, ly, lz), (hx, hy, hz) = box
+            lx, ly, lz, hx, hy, hz = lx + SEAM, ly + SEAM, lz + SEAM, hx - SEAM, hy - SEAM, hz - SEAM
+        for n in range(len(vmap)):
+            x, y, z = v[3 * n], v[3 * n + 1], v[3 * n + 2]
+            if box is not None and lx < x < hx and ly < y < hy and lz < z < hz:
+                self.vertices += 1
+                index = self.vertices
+            else:
+                key = quantize((x, y, z))
+                index = vtof.get(key)
+                if index is None:
+                    self.vertices += 1
+                    index = vtof[key] = self.vertices
+                else:
+                    vmap[n] = index
+                    continue
+            vmap[n] = index
+            lines.append("v " + str(x) + " " + str(y) + " " + str(z) + "\n")
+        # uv 種類很少, 全部照常合併
+        vtovt = self.vtovt
+        vt = buffer.vt
+        vtmap = array("I", bytes(4 * (len(vt) // 2)))
+        for n in range(len(vtmap)):
+            uv = (vt[2 * n], vt[2 * n + 1])
+            key = quantize(uv)
+            index = vtovt.get(key)
+            if index is None:
+                index = vtovt[key] = len(vtovt) + 1
+                lines.append("vt " + str(uv[0]) + " " + str(uv[1]) + "\n")
+            vtmap[n] = index
+        self.write("".join(lines))
+
+        # 材質照第一次出現的面的順序登記, 與 add 相同
+        materials = [material_name(texture) for texture in buffer.textures]
+        registered = [False] * len(buffer.textures)
+        blocknames = buffer.blocknames
+        f = buffer.f
+        ft = buffer.ft
+        start = 0
+        for face, size in enumerate(buffer.sizes):
+            material = buffer.material[face]
+            if not registered[material]:
+                registered[material] = True
+                texture = buffer.textures[material]
+                if texture and texture not in self.textures:
+                    self.textures.append(texture)
+            group = "" if self.groups is None else blocknames[buffer.block[face]]
+            line = "f " + " ".join(str(vmap[f[k]]) + "/" + str(vtmap[ft[k]]) for k in range(start, start + size)) + "\n"
+            self.add_face((group, materials[material]), line)
+            start += size
+        if self.buffered > SPILL_BYTES:
+            self.spill_faces()
+
+    def spill_faces(self) -> None:
+        if self.spill is None:
+            self.spill = tempfile.TemporaryFile()
+        for key, bucket in self.faces.items():
+            data = "".join(bucket).encode("utf8")
+            self.spilled.setdefault(key, []).append((self.spill.tell(), len(data)))
+            self.spill.write(data)
+        self.faces = {}
+        self.buffered = 0
+
+    def write_faces(self) -> None:
+        """every bucket in order, with its ``g`` / ``o`` and ``usemtl`` line"""
+        group = None
+        for key in sorted(set(self.faces) | set(self.spilled)):
+            if self.groups is not None and key[0] != group:
+                group = key[0]
+                self.write(self.groups + " " + (group.replace(" ", "_") or "unknown") + "\n")
+            self.write("usemtl " + key[1] + "\n")
+            for start, length in self.spilled.get(key, ()):
+                self.spill.seek(start)
+                self.write(self.spill.read(length).decode("utf8"))
+            self.write("".join(self.faces.get(key, ())))
+        self.faces = {}
+        self.spilled = {}
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.write_faces()
+            self.file.close()
+            if self.progress is not None:
+                self.progress(self.bytes_written)
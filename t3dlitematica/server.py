@@ -0,0 +1,346 @@
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .litematicadecoder import Resolve
+from .objbuilder import LitimaticaToObj, MeshCache, TexturePackIndex
+
+# 上傳大小上限
+MAX_UPLOAD = 256 << 20
+# 完成的工作最多保留幾個, 超過就刪掉最舊的
+MAX_FINISHED = 256
+READ_BLOCK = 1 << 16
+
+# 每個行程的模型快取, folder -> MeshCache (output.json 重新載入後 MeshCache 自己不會再用舊模型)
+_packs: Dict[str, MeshCache] = {}
+_packs_lock = threading.Lock()
+
+
+def load_pack(folder: str) -> Tuple[TexturePackIndex, MeshCache]:
+    """the loaded texture pack of ``folder`` and its mesh cache, kept for the process lifetime"""
+    with _packs_lock:
+        meshcache = _packs.get(folder)
+        if meshcache is None:
+            meshcache = _packs[folder] = MeshCache()
+    return TexturePackIndex.load(folder), meshcache
+
+
+def convert(path: str, folder: str, output: str, options: Dict[str, Any]) -> str:
+    """convert one uploaded schematic into ``output``, returns the zip path"""
+    texturepack, meshcache = load_pack(folder)
+    litematica = Resolve(path, blockvolume=True)
+    litematica["Metadata"]["Name"] = "model"
+    return str(LitimaticaToObj(litematica, texturepack, output, meshcache=meshcache, **options))
+
+
+class Job:
+    __slots__ = ("id", "status", "pack", "options", "folder", "result", "error", "created", "started", "finished")
+
+    def __init__(self, pack: str, options: Dict[str, Any], folder: str = "") -> None:
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.pack = pack
+        self.options = options
+        self.folder = folder
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "pack": self.pack,
+            "options": self.options,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ConversionService:
+    """
+    Bounded queue of conversions run by ``workers`` dispatcher threads.
+
+    ``packs`` maps a name to a folder made by ``convert_texturepack``. With ``processes`` each
+    dispatcher hands its job to a process pool whose workers keep every texture pack and mesh
+    cache they loaded in memory; without it the conversion runs in the dispatcher thread and the
+    caches live in this process. At most ``queue_size`` jobs wait, :meth:`submit` raises
+    :class:`QueueFull` beyond that. Uploads and results live in ``workdir`` (a temp folder by
+    default) until the job is deleted or pushed out by ``MAX_FINISHED`` newer finished jobs.
+    """
+
+    def __init__(
+        self,
+        packs: Dict[str, str],
+        workers: int = 2,
+        queue_size: int = 16,
+        workdir: Optional[str] = None,
+        processes: bool = True,
+    ) -> None:
+        if not packs:
+            raise ValueError("at least one texture pack is needed")
+        self.packs = {name: os.path.abspath(folder) for name, folder in packs.items()}
+        self.default_pack = next(iter(self.packs))
+        for folder in self.packs.values():
+            load_pack(folder)
+        self.workers = workers
+        self.ownworkdir = workdir is None
+        self.workdir = workdir or tempfile.mkdtemp(prefix="3dlitematica-serve-")
+        os.makedirs(self.workdir, exist_ok=True)
+        self.queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=queue_size)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool = ProcessPoolExecutor(max_workers=workers) if processes else None
+        self.threads = [threading.Thread(target=self.dispatch, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self) -> "ConversionService":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def submit(self, data: bytes, pack: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Job:
+        pack = pack or self.default_pack
+        if pack not in self.packs:
+            raise KeyError(pack)
+        job = Job(pack, options or {})
+        job.folder = os.path.join(self.workdir, job.id)
+        os.makedirs(job.folder)
+        with open(os.path.join(job.folder, "input.litematic"), "wb") as f:
+            f.write(data)
+        with self.lock:
+            self.jobs[job.id] = job
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            self.delete(job.id)
+            raise QueueFull() from None
+        return job
+
+    def get(self, id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(id)
+
+    def delete(self, id: str) -> bool:
+        with self.lock:
+            job = self.jobs.get(id)
+            if job is None or job.status == "running":
+                return False
+            del self.jobs[id]
+            # 還在排隊的工作被取出時會看到 cancelled
+            job.status = "cancelled"
+        shutil.rmtree(job.folder, ignore_errors=True)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue.maxsize,
+            "jobs": counts,
+            "packs": sorted(self.packs),
+        }
+
+    def dispatch(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started = time.time()
+            args = (os.path.join(job.folder, "input.litematic"), self.packs[job.pack], job.folder, job.options)
+            pool = self.pool
+            try:
+                if pool is not None:
+                    result = pool.submit(convert, *args).result()
+                else:
+                    result = convert(*args)
+                status, error = "done", None
+            except BrokenProcessPool as e:
+                # worker 被砍掉 (例如記憶體不足), 換一個新的 pool 給之後的工作
+                self.replace_pool(pool)
+                result, status = None, "error"
+                error = f"{e.__class__.__name__}: {e}"
+            except Exception as e:
+                result, status = None, "error"
+                error = f"{e.__class__.__name__}: {e}"
+            with self.lock:
+                job.result = result
+                job.error = error
+                job.status = status
+                job.finished = time.time()
+            self.trim()
+
+    def replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        with self.lock:
+            if self.pool is not broken:
+                # 另一個 dispatcher 已經換過了
+                return
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        broken.shutdown(wait=False)
+
+    def trim(self) -> None:
+        with self.lock:
+            finished = [job.id for job in self.jobs.values() if job.finished is not None]
+        for id in finished[: max(0, len(finished) - MAX_FINISHED)]:
+            self.delete(id)
+
+    def close(self) -> None:
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.ownworkdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def parse_options(query: Dict[str, List[str]]) -> Dict[str, Any]:
+    """``LitimaticaToObj`` options from the query string, ValueError for bad values"""
+
+    def flag(name: str, default: bool) -> bool:
+        value = query.get(name, [None])[-1]
+        if value is None:
+            return default
+        if value.lower() in ("1", "true", "yes", "on"):
+            return True
+        if value.lower() in ("0", "false", "no", "off"):
+            return False
+        raise ValueError(f"{name} must be true or false")
+
+    options: Dict[str, Any] = {}
+    format = query.get("format", ["obj"])[-1]
+    if format not in ("obj", "glb"):
+        raise ValueError("format must be obj or glb")
+    options["format"] = format
+    options["cull"] = flag("cull", True)
+    options["greedy"] = flag("greedy", False)
+    options["atlas"] = flag("atlas", False)
+    options["embed_textures"] = flag("embed_textures", True)
+    groups = query.get("groups", [None])[-1]
+    if groups not in (None, "g", "o"):
+        raise ValueError("groups must be g or o")
+    options["groups"] = groups
+    return options
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    ``POST /jobs?pack=&format=&greedy=&atlas=&groups=`` with the .litematic as body,
+    ``GET /jobs/<id>`` for the status, ``GET /jobs/<id>/result`` for the zip,
+    ``DELETE /jobs/<id>``, ``GET /health``.
+    """
+
+    server_version = "3dlitematica"
+    service: ConversionService
+    quiet = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, code: int, data: Dict[str, Any]) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self) -> Tuple[List[str], Dict[str, List[str]]]:
+        url = urlsplit(self.path)
+        return [i for i in url.path.split("/") if i], parse_qs(url.query)
+
+    def do_POST(self) -> None:
+        parts, query = self.route()
+        if parts != ["jobs"]:
+            return self.send_json(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            return self.send_json(411, {"error": "Content-Length required"})
+        if length < 0:
+            return self.send_json(400, {"error": "bad Content-Length"})
+        if length > MAX_UPLOAD:
+            return self.send_json(413, {"error": f"upload larger than {MAX_UPLOAD} bytes"})
+        try:
+            options = parse_options(query)
+        except ValueError as e:
+            return self.send_json(400, {"error": str(e)})
+        data = self.rfile.read(length)
+        try:
+            job = self.service.submit(data, query.get("pack", [None])[-1], options)
+        except KeyError as e:
+            return self.send_json(400, {"error": f"unknown pack {e.args[0]}"})
+        except QueueFull:
+            return self.send_json(503, {"error": "queue is full, retry later"})
+        self.send_json(202, job.info())
+
+    def do_GET(self) -> None:
+        parts, _ = self.route()
+        if parts == ["health"]:
+            return self.send_json(200, self.service.stats())
+        if len(parts) not in (2, 3) or parts[0] != "jobs" or (len(parts) == 3 and parts[2] != "result"):
+            return self.send_json(404, {"error": "not found"})
+        job = self.service.get(parts[1])
+        if job is None:
+            return self.send_json(404, {"error": "unknown job"})
+        if len(parts) == 2:
+            return self.send_json(200, job.info())
+        if job.status != "done" or job.result is None:
+            return self.send_json(409, {"error": f"job is {job.status}"})
+        try:
+            f = open(job.result, "rb")
+        except OSError:
+            return self.send_json(410, {"error": "result is gone"})
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Content-Disposition", f'attachment; filename="{job.id}.zip"')
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile, READ_BLOCK)
+
+    def do_DELETE(self) -> None:
+        parts, _ = self.route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self.send_json(404, {"error": "not found"})
+        if self.service.get(parts[1]) is None:
+            return self.send_json(404, {"error": "unknown job"})
+        if not self.service.delete(parts[1]):
+            return self.send_json(409, {"error": "job is running"})
+        self.send_json(200, {"id": parts[1], "status": "deleted"})
+
+
+def make_server(service: ConversionService, host: str = "127.0.0.1", port: int = 8765, quiet: bool = True) -> ThreadingHTTPServer:
+    """HTTP server for ``service``, port 0 picks a free port (see ``server.server_address``)"""
+    handler = type("BoundHandler", (Handler,), {"service": service, "quiet": quiet})
+    return ThreadingHTTPServer((host, port), handler)
@@ -1,40 +1,88 @@
+import hashlib
 import json
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .vfs import open_pack
+
+# manifest 格式改變時要加一, 舊的 manifest 會被忽略
+MANIFEST_VERSION = 2
+
 
 class convert_texturepack:
+    """
+    Convert a resource pack (folder or ``.zip``) into ``output/output.json`` + ``output/textures``.
+
+    Blockstates, models and texture copies run on a thread pool of ``jobs`` threads. The sources
+    seen are recorded in ``output/manifest.json`` (mtime, size and sha1); converting the same pack
+    again only parses the blockstates / models and copies the textures that changed, unless
+    ``incremental`` is False.
+    """
 
-    def __init__(self, path: str , output: str):
-        self.path = path
-        self.tempfolder = None
-        if path.endswith(".zip"):
-            import zipfile
-            import tempfile
-            self.tempfolder = tempfile.mkdtemp()
-            with zipfile.ZipFile(path, "r") as z:
-                z.extractall(self.tempfolder)
-            self.path = self.tempfolder
-        if "assets" not in os.listdir(self.path):
-            self.path = os.path.join(self.path, os.listdir(self.path)[0])
-            if "assets" not in os.listdir(self.path):
+    def __init__(self, path: str, output: str, jobs: Optional[int] = None, incremental: bool = True):
+        self.path = str(path)
+        # zip 直接讀取成員, 不解壓縮
+        self.pack = open_pack(self.path)
+        self.fs = self.pack
+        if "assets" not in self.fs.listdir():
+            self.fs = self.fs.sub(self.fs.listdir()[0])
+            if "assets" not in self.fs.listdir():
+                self.pack.close()
                 raise FileNotFoundError("找不到assets資料夾")
-        self.mainpath = os.path.join(self.path, "assets", "minecraft")
-        self.output = output
+        self.mainpath = "assets/minecraft"
+        self.output = str(output)
         os.makedirs(self.output, exist_ok=True)
         self.noneedfind = ["armor_trims","mob_effects","shield_patterns","particles"]
         self.blocksdata = {"models":{}}
-        self.start()
-        if self.tempfolder:
-            shutil.rmtree(self.tempfolder)
+        self.jobs = jobs
+        self.old = self.load_manifest() if incremental else None
+        # 這次看到的來源檔案 {相對路徑: [mtime_ns, size, sha1]}
+        self.files: Dict[str, List[Any]] = {}
+        self.changed = self.old is None
+        try:
+            self.start()
+        finally:
+            self.pack.close()
 
+    def load_manifest(self) -> Optional[Dict[str, Any]]:
+        """previous manifest and output.json if they belong to this pack, else None"""
+        try:
+            with open(os.path.join(self.output, "manifest.json"), "r", encoding="utf8") as f:
+                manifest = json.load(f)
+            with open(os.path.join(self.output, "output.json"), "r", encoding="utf8") as f:
+                manifest["output"] = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("source") != os.path.abspath(self.path):
+            return None
+        return manifest
+
+    def check(self, rel: str) -> Optional[bytes]:
+        """
+        None if ``rel`` is unchanged since the last run, else its bytes. A file whose mtime or size
+        moved but whose content hash did not counts as unchanged.
+        """
+        stat = list(self.fs.stat(rel))
+        old = self.old["files"].get(rel) if self.old is not None else None
+        if old is not None and old[:2] == stat:
+            self.files[rel] = old
+            return None
+        data = self.fs.read(rel)
+        digest = hashlib.sha1(data).hexdigest()
+        self.files[rel] = stat + [digest]
+        if old is not None and old[2] == digest:
+            return None
+        self.changed = True
+        return data
 
     def start(self) -> None:
         sources = []
-        for i in os.listdir(os.path.join(self.mainpath, "atlases")):
+        for i in self.fs.listdir(self.mainpath + "/atlases"):
             if i.split(".")[0] in self.noneedfind:
                 continue
-            with open(os.path.join(self.mainpath, "atlases", i), "r", encoding="utf8") as f:
-                blocksdata = json.load(f)
+            blocksdata = json.loads(self.fs.read(self.mainpath + "/atlases/" + i))
             for j in blocksdata["sources"]:
                 if j["type"] == "paletted_permutations":
                     continue
@@ -46,58 +94,131 @@ class convert_texturepack:
             elif i['type'] == "single":
                 needcopy.add(i["resource"].split("/")[0])
 
-        def load_model(path:str) -> None:
-            with open(os.path.join(self.mainpath, "models", path), "r", encoding="utf8") as f:
-                blockmodel = f.read()
-                tempload = json.loads(blockmodel)
-            blockmodel = blockmodel.replace("minecraft:", "")
-            blockmodel:dict = json.loads(blockmodel)
-            if "parent" in blockmodel and blockmodel["parent"]  not in self.blocksdata["models"]:
-                load_model(tempload["parent"].split(":")[-1]+".json")
-            # 強制複寫無法解決問題的UV
-            if path not in self.blocksdata["models"]:
-                if path.split("/")[-1].split(".")[0] == "sculk_sensor":
-                    blockmodel["elements"][0]["faces"]["north"]["uv"] = [0, 0, 16, 8]
-                    blockmodel["elements"][0]["faces"]["east"]["uv"] = [0, 0, 16, 8]
-                    blockmodel["elements"][0]["faces"]["south"]["uv"] = [0, 0, 16, 8]
-                    blockmodel["elements"][0]["faces"]["west"]["uv"] = [0, 0, 16, 8]
-                self.blocksdata["models"][path.split("/")[-1].split(".")[0]] = blockmodel
-
-        for i in os.listdir(os.path.join(self.mainpath, "blockstates")):
-            with open(os.path.join(self.mainpath, "blockstates", i), "r", encoding="utf8") as f:
-                blockstates = json.load(f)
-            if "variants" in blockstates:
-                for variants in blockstates["variants"]:
-                    if isinstance(blockstates["variants"][variants] , dict):
-                        load_model(blockstates["variants"][variants]["model"].split(":")[-1]+".json")
-                        blockstates["variants"][variants]["model"] = blockstates["variants"][variants]["model"].split("/")[-1]
-                    elif isinstance(blockstates["variants"][variants] , list):
-                        for j in blockstates["variants"][variants]:
-                            load_model(j["model"].split(":")[-1]+".json")
-                            j["model"] = j["model"].split("/")[-1]
-            if "multipart" in blockstates:
-                for multipart in blockstates["multipart"]:
-                    if isinstance(multipart["apply"], dict):
-                        load_model(multipart["apply"]["model"].split(":")[-1]+".json")
-                        multipart["apply"]["model"] = multipart["apply"]["model"].split("/")[-1]
-                    elif isinstance(multipart["apply"], list):
-                        for j in multipart["apply"]:
-                            load_model(j["model"].split(":")[-1]+".json")
-                            j["model"] = j["model"].split("/")[-1]
-
-            self.blocksdata[i.split(".")[0]] = blockstates
-
-        with open(self.output+r"\output.json", "w", encoding="utf8") as f:
-            json.dump(self.blocksdata, f, indent=4, ensure_ascii=False)
-
-        if os.path.exists(os.path.join(self.output,"textures")):
-            shutil.rmtree(os.path.join(self.output,"textures"))
-        for i in needcopy:
-            shutil.copytree(os.path.join(self.mainpath, "textures", i), os.path.join(self.output, "textures", i))
+        if self.old is None and os.path.exists(os.path.join(self.output, "textures")):
+            shutil.rmtree(os.path.join(self.output, "textures"))
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            blockstatefiles = self.fs.listdir(self.mainpath + "/blockstates")
+            blockstates = list(pool.map(self.load_blockstate, blockstatefiles))
+            # model 依 parent 一層一層載入, 同一層平行處理
+            models: Dict[str, Optional[str]] = {}
+            wave = sorted({model for _, _, refs in blockstates for model in refs})
+            while wave:
+                for path, (name, blockmodel, parent) in zip(wave, pool.map(self.load_model, wave)):
+                    models[path] = parent
+                    self.blocksdata["models"][name] = blockmodel
+                wave = sorted({parent for parent in models.values() if parent is not None and parent not in models})
+            for name, data, _ in blockstates:
+                self.blocksdata[name] = data
+
+            textures = [
+                rel
+                for i in sorted(needcopy)
+                if self.fs.isdir(self.mainpath + "/textures/" + i)
+                for rel in self.fs.walk(self.mainpath + "/textures/" + i)
+            ]
+            list(pool.map(self.copy_texture, textures))
+
+        # 來源已刪除的 blockstate / model, output.json 要重寫才會拿掉它們
+        if self.old is not None:
+            if set(self.old["blockstates"]) - set(blockstatefiles):
+                self.changed = True
+            if set(self.old["models"]) - set(models):
+                self.changed = True
+
+        # 來源已刪除的材質
+        if self.old is not None:
+            for rel in self.old["files"]:
+                if rel.startswith(self.mainpath + "/textures/") and rel not in self.files:
+                    self.changed = True
+                    try:
+                        os.remove(self.texture_output(rel))
+                    except OSError:
+                        pass
+
+        if self.changed or not os.path.exists(os.path.join(self.output, "output.json")):
+            with open(os.path.join(self.output, "output.json"), "w", encoding="utf8") as f:
+                json.dump(self.blocksdata, f, indent=4, ensure_ascii=False)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "source": os.path.abspath(self.path),
+            "files": self.files,
+            "blockstates": {filename: refs for filename, (_, _, refs) in zip(blockstatefiles, blockstates)},
+            "models": models,
+        }
+        with open(os.path.join(self.output, "manifest.json"), "w", encoding="utf8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+    def load_blockstate(self, filename: str) -> Tuple[str, dict, List[str]]:
+        """``(name, blockstate json, model files it uses)``"""
+        name = filename.split(".")[0]
+        data = self.check(self.mainpath + "/blockstates/" + filename)
+        if data is None and self.old is not None and name in self.old["output"] and filename in self.old["blockstates"]:
+            return name, self.old["output"][name], self.old["blockstates"][filename]
+        if data is None:
+            data = self.fs.read(self.mainpath + "/blockstates/" + filename)
+        blockstates = json.loads(data)
+        refs: List[str] = []
+
+        def apply(model: dict) -> None:
+            refs.append(model["model"].split(":")[-1]+".json")
+            model["model"] = model["model"].split("/")[-1]
+
+        if "variants" in blockstates:
+            for variants in blockstates["variants"]:
+                if isinstance(blockstates["variants"][variants] , dict):
+                    apply(blockstates["variants"][variants])
+                elif isinstance(blockstates["variants"][variants] , list):
+                    for j in blockstates["variants"][variants]:
+                        apply(j)
+        if "multipart" in blockstates:
+            for multipart in blockstates["multipart"]:
+                if isinstance(multipart["apply"], dict):
+                    apply(multipart["apply"])
+                elif isinstance(multipart["apply"], list):
+                    for j in multipart["apply"]:
+                        apply(j)
+        return name, blockstates, sorted(set(refs))
 
+    def load_model(self, path: str) -> Tuple[str, dict, Optional[str]]:
+        """``(name, model json without "minecraft:", parent model file or None)``"""
+        name = path.split("/")[-1].split(".")[0]
+        data = self.check(self.mainpath + "/models/" + path)
+        if (
+            data is None
+            and self.old is not None
+            and path in self.old["models"]
+            and name in self.old["output"]["models"]
+        ):
+            return name, self.old["output"]["models"][name], self.old["models"][path]
+        if data is None:
+            data = self.fs.read(self.mainpath + "/models/" + path)
+        blockmodel = data.decode("utf8")
+        tempload = json.loads(blockmodel)
+        blockmodel = json.loads(blockmodel.replace("minecraft:", ""))
+        # 強制複寫無法解決問題的UV
+        if name == "sculk_sensor":
+            blockmodel["elements"][0]["faces"]["north"]["uv"] = [0, 0, 16, 8]
+            blockmodel["elements"][0]["faces"]["east"]["uv"] = [0, 0, 16, 8]
+            blockmodel["elements"][0]["faces"]["south"]["uv"] = [0, 0, 16, 8]
+            blockmodel["elements"][0]["faces"]["west"]["uv"] = [0, 0, 16, 8]
+        parent = tempload["parent"].split(":")[-1]+".json" if "parent" in tempload else None
+        return name, blockmodel, parent
 
+    def texture_output(self, rel: str) -> str:
+        return os.path.join(self.output, *rel[len(self.mainpath) + 1 :].split("/"))
 
+    def copy_texture(self, rel: str) -> None:
+        target = self.texture_output(rel)
+        data = self.check(rel)
+        if data is None:
+            if os.path.exists(target):
+                return
+            data = self.fs.read(rel)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
 
 
 if __name__ == "__main__":
-    convert_texturepack(r"C:\Users\phill\OneDrive\桌面\codetool\VanillaDefault+1.20", r"C:\Users\phill\OneDrive\Documents\coed_thing\3Dlitematica\temp")
\ No newline at end of file
+    convert_texturepack(r"C:\Users\phill\OneDrive\桌面\codetool\VanillaDefault+1.20", r"C:\Users\phill\OneDrive\Documents\coed_thing\3Dlitematica\temp")
@@ -0,0 +1,135 @@
+import calendar
+import os
+import threading
+import zipfile
+from typing import Dict, List, Set, Tuple, Union
+
+
+class DirectoryFS:
+    """
+    Read access to an unpacked texture pack. Paths are ``/`` separated and relative to ``root``.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = str(root)
+
+    def __repr__(self) -> str:
+        return f"<DirectoryFS {self.root!r}>"
+
+    def close(self) -> None:
+        pass
+
+    def path(self, rel: str) -> str:
+        return os.path.join(self.root, *[i for i in rel.split("/") if i])
+
+    def listdir(self, rel: str = "") -> List[str]:
+        return sorted(os.listdir(self.path(rel)))
+
+    def isdir(self, rel: str) -> bool:
+        return os.path.isdir(self.path(rel))
+
+    def walk(self, rel: str) -> List[str]:
+        """every file below ``rel``, as paths relative to ``root``"""
+        files = []
+        for folder, _, names in os.walk(self.path(rel)):
+            prefix = os.path.relpath(folder, self.root).replace(os.sep, "/")
+            files.extend(prefix + "/" + name for name in names)
+        return sorted(files)
+
+    def read(self, rel: str) -> bytes:
+        with open(self.path(rel), "rb") as f:
+            return f.read()
+
+    def stat(self, rel: str) -> Tuple[int, int]:
+        """``(mtime_ns, size)``, used to skip unchanged files"""
+        stat = os.stat(self.path(rel))
+        return stat.st_mtime_ns, stat.st_size
+
+    def sub(self, rel: str) -> "DirectoryFS":
+        return DirectoryFS(self.path(rel))
+
+
+class ZipFS:
+    """
+    The same read access as :class:`DirectoryFS` over the members of a ``.zip`` pack, nothing is
+    extracted. Folders are derived from the member names since packs often have no folder entries.
+    """
+
+    def __init__(self, zip: Union[str, zipfile.ZipFile], prefix: str = "") -> None:
+        if isinstance(zip, zipfile.ZipFile):
+            self.zip = zip
+            self.owner = False
+        else:
+            self.zip = zipfile.ZipFile(zip, "r")
+            self.owner = True
+        self.prefix = prefix.strip("/")
+        self._lock = threading.Lock()
+        self.members: Dict[str, zipfile.ZipInfo] = {}
+        self.folders: Dict[str, Set[str]] = {"": set()}
+        for info in self.zip.infolist():
+            name = info.filename.replace("\\", "/").strip("/")
+            if self.prefix:
+                if not name.startswith(self.prefix + "/"):
+                    continue
+                name = name[len(self.prefix) + 1 :]
+            if not name:
+                continue
+            if not info.is_dir():
+                self.members[name] = info
+            parts = name.split("/")
+            for i in range(len(parts) if info.is_dir() else len(parts) - 1):
+                self.folders.setdefault("/".join(parts[: i + 1]), set())
+            for i in range(len(parts)):
+                self.folders["/".join(parts[:i])].add(parts[i])
+
+    def __repr__(self) -> str:
+        return f"<ZipFS {self.zip.filename!r} prefix={self.prefix!r}>"
+
+    def close(self) -> None:
+        if self.owner:
+            self.zip.close()
+
+    @staticmethod
+    def key(rel: str) -> str:
+        return "/".join(i for i in rel.split("/") if i)
+
+    def listdir(self, rel: str = "") -> List[str]:
+        try:
+            return sorted(self.folders[self.key(rel)])
+        except KeyError:
+            raise FileNotFoundError(rel) from None
+
+    def isdir(self, rel: str) -> bool:
+        return self.key(rel) in self.folders
+
+    def walk(self, rel: str) -> List[str]:
+        prefix = self.key(rel) + "/"
+        return sorted(i for i in self.members if i.startswith(prefix))
+
+    def info(self, rel: str) -> zipfile.ZipInfo:
+        try:
+            return self.members[self.key(rel)]
+        except KeyError:
+            raise FileNotFoundError(rel) from None
+
+    def read(self, rel: str) -> bytes:
+        info = self.info(rel)
+        with self._lock:
+            return self.zip.read(info)
+
+    def stat(self, rel: str) -> Tuple[int, int]:
+        """``(mtime_ns, size)`` from the member header"""
+        info = self.info(rel)
+        return calendar.timegm(info.date_time + (0, 0, 0)) * 1_000_000_000, info.file_size
+
+    def sub(self, rel: str) -> "ZipFS":
+        fs = ZipFS(self.zip, (self.prefix + "/" + self.key(rel)).strip("/"))
+        fs.owner = False
+        return fs
+
+
+def open_pack(path: str) -> Union[DirectoryFS, ZipFS]:
+    """:class:`ZipFS` for ``.zip`` packs, :class:`DirectoryFS` for unpacked ones"""
+    if str(path).endswith(".zip"):
+        return ZipFS(path)
+    return DirectoryFS(path)